@@ -0,0 +1,272 @@
+"""
+End-to-end benchmark for sync_clients_and_sprints() and sync_time_entries().
+
+Generates a synthetic Monday.com workspace and Clockify workspace at the given
+scale, serves them from local stub servers (stub_servers.py), and runs the real
+sync functions against a local Supabase stack. For each run it reports:
+  - records per second (Monday items + subitems, Clockify entries fetched)
+  - API calls and bytes served, per endpoint
+  - Supabase (PostgREST) calls, per table / RPC
+  - peak Python memory (tracemalloc)
+
+The local stack is the Supabase CLI's (see benchmarks/README.md). The script
+refuses to run against anything but localhost: it creates and deletes rows.
+
+Usage:
+    python benchmarks/bench_sync.py                                  # default scale
+    python benchmarks/bench_sync.py --users 40 --entries 2000 --projects 120
+    python benchmarks/bench_sync.py --server-side --json results.json
+"""
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import tracemalloc
+import contextlib
+from collections import Counter
+from urllib.parse import urlparse
+
+from synthetic import (
+    BENCH_PREFIX, BENCH_ID_BASE, bench_people,
+    generate_clockify_workspace, generate_monday_boards
+)
+from stub_servers import clockify_stub, monday_stub
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+
+LOCAL_HOSTS = {'127.0.0.1', 'localhost', '::1'}
+
+# Supabase CLI default API URL (`supabase start`)
+DEFAULT_SUPABASE_URL = 'http://127.0.0.1:54321'
+
+BENCH_WORKSPACE_ID = f"{BENCH_PREFIX}-ws"
+
+def import_sync_modules(supabase_url, service_key):
+    """
+    Import the sync scripts against the local stack. Environment variables are set
+    first because both modules read their settings at import time and get_supabase()
+    creates the client from them on first use; loading .env (sync_clients.load_env)
+    does not override variables that are already set.
+    """
+    os.environ.update({
+        'SUPABASE_URL': supabase_url,
+        'SUPABASE_SERVICE_ROLE_KEY': service_key,
+        'CLOCKIFY_API_KEY': 'bench',
+        'CLOCKIFY_WORKSPACE_ID': BENCH_WORKSPACE_ID,
+        'MONDAY_API_KEY': 'bench',
+        'MONDAY_AU_BOARD_ID': '',
+        'MONDAY_US_BOARD_ID': '',
+        'MONDAY_UK_BOARD_ID': '',
+    })
+    sys.path.insert(0, SCRIPTS_DIR)
+
+    import sync_clockify_data
+    import sync_monday_data
+    return sync_clockify_data, sync_monday_data
+
+def count_db_calls(client, counter):
+    """Count PostgREST requests made through a supabase-py client, keyed by method and path"""
+    def on_request(request):
+        path = request.url.path.split('/rest/v1/', 1)[-1]
+        counter[f"{request.method} {path}"] += 1
+
+    client.postgrest.session.event_hooks['request'].append(on_request)
+
+def cleanup(client, user_emails):
+    """Delete every row a benchmark run created (identified by the benchmark ID markers)"""
+    users = client.table('users').select('id').in_('email', user_emails).execute().data or []
+    user_ids = [u['id'] for u in users]
+
+    client.table('time_entries').delete().like('clockify_id', f"{BENCH_PREFIX}-%").execute()
+    if user_ids:
+        client.table('time_entries_daily').delete().in_('user_id', user_ids).execute()
+    client.table('sprints').delete().gte('monday_subitem_id', BENCH_ID_BASE).execute()
+    client.table('clockify_projects').delete().like('clockify_id', f"{BENCH_PREFIX}-%").execute()
+    client.table('clients').delete().gte('monday_item_id', BENCH_ID_BASE).execute()
+    if user_ids:
+        client.table('users').delete().in_('id', user_ids).execute()
+
+def count_bench_entries(client):
+    response = client.table('time_entries') \
+        .select('id', count='exact') \
+        .like('clockify_id', f"{BENCH_PREFIX}-%") \
+        .limit(1) \
+        .execute()
+    return response.count or 0
+
+def measure(label, fn, units, db_calls, stubs, trace_memory=True, verbose=False):
+    """Run one sync and collect timing, API/DB call counts and peak memory"""
+    db_calls.clear()
+    for stub in stubs:
+        stub.reset_counters()
+
+    output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with output:
+        ok = fn()
+    seconds = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    if trace_memory:
+        tracemalloc.stop()
+
+    api_calls = Counter()
+    api_bytes = 0
+    for stub in stubs:
+        api_calls.update(stub.calls)
+        api_bytes += sum(stub.bytes_sent.values())
+
+    return {
+        'label': label,
+        'ok': ok,
+        'seconds': round(seconds, 3),
+        'records': units,
+        'records_per_second': round(units / seconds, 1) if seconds else None,
+        'api_calls': sum(api_calls.values()),
+        'api_calls_by_endpoint': dict(api_calls),
+        'api_bytes': api_bytes,
+        'db_calls': sum(db_calls.values()),
+        'db_calls_by_path': dict(db_calls),
+        'peak_memory_mb': round(peak / 1024 / 1024, 1) if peak is not None else None,
+    }
+
+def print_result(result):
+    status = 'ok' if result['ok'] else 'FAILED'
+    memory = f"{result['peak_memory_mb']} MB" if result['peak_memory_mb'] is not None else 'n/a'
+    print(f"\n=== {result['label']} [{status}] ===")
+    print(f"   time:        {result['seconds']:.2f} s")
+    print(f"   throughput:  {result['records_per_second']} records/s ({result['records']} records)")
+    print(f"   API calls:   {result['api_calls']} ({result['api_bytes'] / 1024 / 1024:.1f} MB served)")
+    for endpoint, calls in sorted(result['api_calls_by_endpoint'].items()):
+        print(f"      {calls:7d}  {endpoint}")
+    print(f"   DB calls:    {result['db_calls']}")
+    for path, calls in sorted(result['db_calls_by_path'].items(), key=lambda kv: -kv[1]):
+        print(f"      {calls:7d}  {path}")
+    print(f"   peak memory: {memory}")
+    if 'synced' in result:
+        print(f"   stored:      {result['synced']} bench time entries")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Monday and Clockify syncs against local stand-ins")
+    parser.add_argument('--users', type=int, default=10, help="Clockify users (default 10)")
+    parser.add_argument('--entries', type=int, default=500, help="Time entries per user (default 500)")
+    parser.add_argument('--projects', type=int, default=50, help="Clockify projects (default 50)")
+    parser.add_argument('--regions', default='AU', help="Monday boards, comma separated (default AU)")
+    parser.add_argument('--groups', type=int, default=4, help="Groups per board (default 4)")
+    parser.add_argument('--items', type=int, default=25, help="Items (clients) per group (default 25)")
+    parser.add_argument('--subitems', type=int, default=4, help="Subitems (sprints) per item (default 4)")
+    parser.add_argument('--days', type=int, default=365, help="Days of Clockify history (default 365)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--server-side', action='store_true', help="Also benchmark sync_time_entries(server_side=True)")
+    parser.add_argument('--async', dest='async_engine', action='store_true',
+                        help="Also benchmark the asyncio engine (sync_clockify_async)")
+    parser.add_argument('--processes', type=int,
+                        help="Also benchmark the sharded engine (sync_clockify_sharded) with this many processes")
+    parser.add_argument('--no-resync', action='store_true', help="Skip the second (warm) Clockify run")
+    parser.add_argument('--no-tracemalloc', action='store_true', help="Don't trace memory (tracemalloc slows Python code)")
+    parser.add_argument('--keep', action='store_true', help="Leave the benchmark rows in the database")
+    parser.add_argument('--verbose', action='store_true', help="Show the syncs' own output")
+    parser.add_argument('--json', metavar='PATH', help="Also write results to a JSON file")
+    args = parser.parse_args()
+
+    supabase_url = os.getenv('BENCH_SUPABASE_URL', DEFAULT_SUPABASE_URL)
+    service_key = os.getenv('BENCH_SUPABASE_SERVICE_KEY')
+
+    if urlparse(supabase_url).hostname not in LOCAL_HOSTS:
+        print(f"!! Error: BENCH_SUPABASE_URL must point at a local stack, got {supabase_url}")
+        sys.exit(1)
+    if not service_key:
+        print("!! Error: BENCH_SUPABASE_SERVICE_KEY is required (service_role key from `supabase status`)")
+        sys.exit(1)
+
+    clockify_sync, monday_sync = import_sync_modules(supabase_url, service_key)
+
+    from supabase import create_client
+    from sync_clients import set_supabase
+    client = create_client(supabase_url, service_key)
+    db_calls = Counter()
+    count_db_calls(client, db_calls)
+    set_supabase(client)
+
+    print(">> Generating synthetic workspaces...")
+    people = bench_people(args.users)
+    regions = [r.strip() for r in args.regions.split(',') if r.strip()]
+    clockify = generate_clockify_workspace(
+        users=args.users, entries_per_user=args.entries, projects=args.projects,
+        days=args.days, seed=args.seed
+    )
+    monday = generate_monday_boards(
+        regions=regions, groups_per_board=args.groups, items_per_group=args.items,
+        subitems_per_item=args.subitems, people=people, days=args.days, seed=args.seed
+    )
+    print(f"   Clockify: {len(clockify.users)} users, {len(clockify.projects)} projects, {clockify.entry_count} entries")
+    print(f"   Monday:   {len(monday.boards)} boards, {monday.item_count} items, {monday.subitem_count} subitems")
+
+    user_emails = [p['email'] for p in people]
+    results = []
+
+    with clockify_stub(clockify, BENCH_WORKSPACE_ID) as clockify_api, monday_stub(monday) as monday_api:
+        clockify_sync.CLOCKIFY_API_URL = clockify_api.url
+        clockify_sync.CLOCKIFY_API_KEY = 'bench'
+        clockify_sync.CLOCKIFY_WORKSPACE_ID = BENCH_WORKSPACE_ID
+        monday_sync.MONDAY_API_URL = f"{monday_api.url}/v2"
+        monday_sync.MONDAY_API_KEY = 'bench'
+        monday_sync.MONDAY_BOARD_IDS = {board['region']: board_id for board_id, board in monday.boards.items()}
+
+        try:
+            print(">> Resetting benchmark rows and seeding users...")
+            cleanup(client, user_emails)
+            client.table('users').upsert(people, on_conflict='email').execute()
+
+            measure_args = dict(
+                db_calls=db_calls, trace_memory=not args.no_tracemalloc, verbose=args.verbose
+            )
+
+            print(">> Running Monday sync...")
+            results.append(measure(
+                'sync_clients_and_sprints', monday_sync.sync_clients_and_sprints,
+                monday.item_count + monday.subitem_count, stubs=[monday_api], **measure_args
+            ))
+
+            runs = [('sync_time_entries (cold)', lambda: clockify_sync.sync_time_entries(days_back=args.days))]
+            if not args.no_resync:
+                runs.append(('sync_time_entries (resync)', lambda: clockify_sync.sync_time_entries(days_back=args.days)))
+            if args.server_side:
+                runs.append(('sync_time_entries --server-side (resync)',
+                             lambda: clockify_sync.sync_time_entries(days_back=args.days, server_side=True)))
+            if args.async_engine:
+                from sync_clockify_async import run_sync_time_entries_async
+                runs.append(('sync_time_entries --async (resync)',
+                             lambda: run_sync_time_entries_async(days_back=args.days)))
+            if args.processes:
+                # Worker processes make their own Supabase calls, which DB calls don't include
+                from sync_clockify_sharded import sync_time_entries_sharded
+                runs.append((f'sync_time_entries --processes {args.processes} (resync)',
+                             lambda: sync_time_entries_sharded(days_back=args.days, processes=args.processes)))
+
+            for label, run_sync in runs:
+                print(f">> Running {label}...")
+                clockify_sync._client_sprint_cache.clear()
+                result = measure(label, run_sync, clockify.entry_count, stubs=[clockify_api], **measure_args)
+                result['synced'] = count_bench_entries(client)
+                results.append(result)
+        finally:
+            if not args.keep:
+                print(">> Removing benchmark rows...")
+                cleanup(client, user_emails)
+
+    for result in results:
+        print_result(result)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'scale': vars(args), 'results': results}, f, indent=2)
+        print(f"\n>> Results written to {args.json}")
+
+if __name__ == '__main__':
+    main()
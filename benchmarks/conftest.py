@@ -0,0 +1,60 @@
+"""
+Shared fixtures for the transform micro-benchmarks (test_transforms.py).
+
+The sync modules create their Supabase client and HTTP session on first use
+(sync_clients), so importing them needs no settings; nothing in the
+micro-benchmarks talks to the database or the network. The mirror fixture reads
+a local mirror (scripts/sync_mirror.py) when one has been built.
+"""
+
+import os
+import sys
+import json
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(REPO_DIR, 'scripts'))
+
+@pytest.fixture(scope='session')
+def monday_board():
+    """The AU board snapshot saved by scripts/fetch_monday_data.py"""
+    with open(os.path.join(REPO_DIR, 'monday_board_structure.json')) as f:
+        return json.load(f)['data']['boards'][0]
+
+@pytest.fixture(scope='session')
+def monday_items(monday_board):
+    """(item, group_title) for every item on the board"""
+    return [
+        (item, group['title'])
+        for group in monday_board['groups']
+        for item in group['items_page']['items']
+    ]
+
+@pytest.fixture(scope='session')
+def monday_subitems(monday_items):
+    """(subitem, group_title) for every subitem on the board"""
+    return [
+        (subitem, group_title)
+        for item, group_title in monday_items
+        for subitem in item.get('subitems') or []
+    ]
+
+@pytest.fixture(scope='session')
+def clockify_entries():
+    """One user's year of generated Clockify entries (synthetic.py, fixed seed)"""
+    from synthetic import generate_clockify_workspace
+
+    workspace = generate_clockify_workspace(users=1, entries_per_user=2000, projects=40, seed=1)
+    return next(iter(workspace.entries_by_user.values()))
+
+@pytest.fixture(scope='session')
+def mirror():
+    """The local SQLite mirror of the live reference tables; skips when there is none"""
+    from sync_mirror import SyncMirror, DEFAULT_MIRROR_PATH
+
+    path = os.getenv('SYNC_MIRROR_PATH') or DEFAULT_MIRROR_PATH
+    if not os.path.exists(path):
+        pytest.skip(f"No mirror at {path} (build one with python scripts/sync_mirror.py)")
+    return SyncMirror(path)
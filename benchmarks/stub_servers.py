@@ -0,0 +1,184 @@
+"""
+Local stand-ins for the Clockify REST API and the Monday.com GraphQL API.
+
+Each server runs in a background thread, serves a synthetic workspace from
+synthetic.py, and counts the requests and response bytes per endpoint so the
+benchmark can report API calls without touching the sync code.
+
+Only the endpoints and query shapes the sync scripts use are implemented:
+  Clockify: GET /workspaces/{ws}/users
+            GET /workspaces/{ws}/projects                 (page, page-size)
+            GET /workspaces/{ws}/user/{id}/time-entries   (start, end, page, page-size)
+  Monday:   POST /v2  boards { name groups { id title } }
+            POST /v2  boards { groups(ids) { items_page(limit, cursor) { ... } } }
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+class StubServer:
+    """Threaded HTTP server with per-endpoint request and byte counters"""
+
+    def __init__(self, handler_class, **context):
+        self.calls = Counter()
+        self.bytes_sent = Counter()
+        self._lock = threading.Lock()
+
+        server = self
+
+        class Handler(handler_class):
+            stub = server
+
+            def log_message(self, format, *args):
+                pass
+
+        for name, value in context.items():
+            setattr(Handler, name, value)
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, endpoint, size):
+        with self._lock:
+            self.calls[endpoint] += 1
+            self.bytes_sent[endpoint] += size
+
+    def reset_counters(self):
+        with self._lock:
+            self.calls.clear()
+            self.bytes_sent.clear()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, endpoint, payload, status=200):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.stub.record(endpoint, len(body))
+
+def _page(items, query, default_size):
+    page = int(query.get('page', ['1'])[0])
+    size = int(query.get('page-size', [str(default_size)])[0])
+    return items[(page - 1) * size:page * size]
+
+class ClockifyHandler(_JsonHandler):
+    workspace = None
+    workspace_id = None
+
+    USERS = re.compile(r'^/workspaces/([^/]+)/users$')
+    PROJECTS = re.compile(r'^/workspaces/([^/]+)/projects$')
+    TIME_ENTRIES = re.compile(r'^/workspaces/([^/]+)/user/([^/]+)/time-entries$')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path.removeprefix('/api/v1')
+        query = parse_qs(url.query)
+
+        if self.headers.get('X-Api-Key') is None:
+            return self.send_json('unauthorized', {'message': 'Missing API key'}, 401)
+
+        match = self.USERS.match(path)
+        if match and match.group(1) == self.workspace_id:
+            return self.send_json('users', self.workspace.users)
+
+        match = self.PROJECTS.match(path)
+        if match and match.group(1) == self.workspace_id:
+            return self.send_json('projects', _page(self.workspace.projects, query, 50))
+
+        match = self.TIME_ENTRIES.match(path)
+        if match and match.group(1) == self.workspace_id:
+            entries = self.workspace.entries_by_user.get(match.group(2), [])
+            start = query.get('start', [None])[0]
+            end = query.get('end', [None])[0]
+            if start or end:
+                # ISO timestamps in the same format compare correctly as strings
+                entries = [
+                    e for e in entries
+                    if (not start or e['timeInterval']['start'] >= start)
+                    and (not end or e['timeInterval']['start'] <= end)
+                ]
+            return self.send_json('time-entries', _page(entries, query, 50))
+
+        self.send_json('not_found', {'message': f'No stub for {url.path}'}, 404)
+
+class MondayHandler(_JsonHandler):
+    workspace = None
+    page_limit = 100
+
+    BOARD_IDS = re.compile(r'boards\s*\(\s*ids:\s*\[\s*"?(\d+)"?\s*\]')
+    GROUP_IDS = re.compile(r'groups\s*\(\s*ids:\s*\[\s*"([^"]+)"\s*\]')
+    LIMIT = re.compile(r'items_page\s*\(\s*limit:\s*(\d+)')
+    CURSOR = re.compile(r'cursor:\s*"([^"]+)"')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        query = payload.get('query', '')
+
+        if not self.headers.get('Authorization'):
+            return self.send_json('unauthorized', {'errors': [{'message': 'Not authenticated'}]}, 401)
+
+        board_match = self.BOARD_IDS.search(query)
+        board = self.workspace.boards.get(board_match.group(1)) if board_match else None
+        if board is None:
+            return self.send_json('errors', {'errors': [{'message': 'Board not found'}]})
+
+        if 'items_page' not in query:
+            return self.send_json('boards', {'data': {'boards': [{
+                'name': board['name'],
+                'groups': [{'id': g['id'], 'title': g['title']} for g in board['groups']]
+            }]}})
+
+        group_match = self.GROUP_IDS.search(query)
+        group = next((g for g in board['groups'] if group_match and g['id'] == group_match.group(1)), None)
+        if group is None:
+            return self.send_json('errors', {'errors': [{'message': 'Group not found'}]})
+
+        limit_match = self.LIMIT.search(query)
+        limit = int(limit_match.group(1)) if limit_match else self.page_limit
+        cursor_match = self.CURSOR.search(query)
+        offset = int(cursor_match.group(1)) if cursor_match else 0
+
+        items = group['items'][offset:offset + limit]
+        next_offset = offset + limit
+        cursor = str(next_offset) if next_offset < len(group['items']) else None
+
+        self.send_json('items_page', {'data': {'boards': [{'groups': [{
+            'items_page': {'cursor': cursor, 'items': items}
+        }]}]}})
+
+def clockify_stub(workspace, workspace_id):
+    """Clockify API stand-in; point CLOCKIFY_API_URL at .url"""
+    return StubServer(ClockifyHandler, workspace=workspace, workspace_id=workspace_id)
+
+def monday_stub(workspace):
+    """Monday.com API stand-in; point MONDAY_API_URL at .url"""
+    return StubServer(MondayHandler, workspace=workspace)
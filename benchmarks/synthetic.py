@@ -0,0 +1,277 @@
+"""
+Synthetic Clockify workspaces and Monday.com boards for the sync benchmarks.
+
+Everything is generated from a seed, so two runs at the same scale serve the
+same data. Names and IDs line up across the two sources the way the real ones
+do: each Monday client item has a Clockify project with the same name, Clockify
+users have @studiohawk.com.au emails that match seeded internal users, and the
+users' monday_person_id values are the people referenced by the DPR Lead columns.
+
+All IDs carry a benchmark marker (BENCH_PREFIX / BENCH_ID_BASE) so the rows the
+syncs write can be found and removed afterwards.
+"""
+
+import json
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+# Prefix for Clockify IDs (users, projects, time entries) and user emails
+BENCH_PREFIX = 'bench'
+
+# Monday item/subitem/person IDs start here; real Monday IDs are far below
+BENCH_ID_BASE = 9_000_000_000
+
+BENCH_EMAIL_DOMAIN = 'studiohawk.com.au'
+
+TASK_NAMES = ['Outreach', 'Content Creation', 'Data Analysis', 'Reporting', 'Strategy', 'Client Comms']
+CAMPAIGN_TYPES = ['DPR Campaign', 'SEO & DPR Campaign']
+CONTRACT_LENGTHS = ['3 Months', '6 Months', '12 Months']
+REPORT_STATUSES = ['Ready to Start', 'Working on it', 'Done']
+
+# Group titles per board; the last one is an inactive group like the real boards have
+GROUP_TITLES = ['Active Campaigns', 'Onboarding', 'Paused Campaigns', 'Finished Campaigns']
+
+@dataclass
+class ClockifyWorkspace:
+    """Users, projects and per-user time entries as the Clockify API returns them"""
+    users: list
+    projects: list
+    entries_by_user: dict = field(default_factory=dict)
+
+    @property
+    def entry_count(self):
+        return sum(len(entries) for entries in self.entries_by_user.values())
+
+@dataclass
+class MondayWorkspace:
+    """Boards keyed by board ID, each {'name': ..., 'groups': [{'id', 'title', 'items': [...]}]}"""
+    boards: dict
+    people: list
+
+    @property
+    def item_count(self):
+        return sum(len(g['items']) for b in self.boards.values() for g in b['groups'])
+
+    @property
+    def subitem_count(self):
+        return sum(
+            len(item['subitems'])
+            for b in self.boards.values() for g in b['groups'] for item in g['items']
+        )
+
+def client_name(index):
+    """Shared client/project name; fixed width so no name is a substring of another"""
+    return f"Bench Client {index:05d}"
+
+def bench_user_email(index):
+    return f"{BENCH_PREFIX}.user{index:04d}@{BENCH_EMAIL_DOMAIN}"
+
+def bench_people(user_count):
+    """Internal users to seed before a sync: email, name and Monday person ID"""
+    return [
+        {
+            'email': bench_user_email(i),
+            'name': f"Bench User {i:04d}",
+            'monday_person_id': BENCH_ID_BASE + i,
+            'is_active': True
+        }
+        for i in range(user_count)
+    ]
+
+def _iso(dt):
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _duration(minutes):
+    hours, mins = divmod(minutes, 60)
+    if hours and mins:
+        return f"PT{hours}H{mins}M"
+    if hours:
+        return f"PT{hours}H"
+    return f"PT{mins}M"
+
+def generate_clockify_workspace(users=10, entries_per_user=500, projects=50, client_projects=None,
+                                days=365, seed=1, today=None):
+    """
+    Build a Clockify workspace.
+
+    client_projects of the projects are named after Monday clients (client_name(i)),
+    the rest are internal projects no client matches. About 2% of entries are
+    running timers (no duration) and are skipped by the sync as no_hours.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.now(timezone.utc).date()
+    if client_projects is None:
+        client_projects = int(projects * 0.8)
+    client_projects = min(client_projects, projects)
+
+    clockify_users = [
+        {
+            'id': f"{BENCH_PREFIX}-user-{i:04d}",
+            'name': f"Bench User {i:04d}",
+            'email': bench_user_email(i),
+            'status': 'ACTIVE'
+        }
+        for i in range(users)
+    ]
+
+    clockify_projects = []
+    for i in range(projects):
+        name = client_name(i) if i < client_projects else f"Bench Internal {i:05d}"
+        clockify_projects.append({
+            'id': f"{BENCH_PREFIX}-proj-{i:05d}",
+            'name': name,
+            'clientName': name if i < client_projects else '',
+            'archived': False,
+            'billable': i < client_projects
+        })
+
+    workspace = ClockifyWorkspace(users=clockify_users, projects=clockify_projects)
+
+    for u, user in enumerate(clockify_users):
+        entries = []
+        for n in range(entries_per_user):
+            project = rng.choice(clockify_projects)
+            day = today - timedelta(days=rng.randrange(days))
+            start = datetime(day.year, day.month, day.day, rng.randrange(8, 17), rng.choice([0, 15, 30, 45]),
+                             tzinfo=timezone.utc)
+            minutes = rng.choice([15, 30, 45, 60, 90, 120, 150, 180, 240])
+            running = rng.random() < 0.02
+            task = rng.choice(TASK_NAMES)
+
+            entries.append({
+                'id': f"{BENCH_PREFIX}-te-{u:04d}-{n:07d}",
+                'description': f"{task} for {project['name']}",
+                'userId': user['id'],
+                'billable': project['billable'],
+                'projectId': project['id'],
+                'project': {'id': project['id'], 'name': project['name'], 'clientName': project['clientName']},
+                'taskId': f"{BENCH_PREFIX}-task-{TASK_NAMES.index(task)}",
+                'task': {'id': f"{BENCH_PREFIX}-task-{TASK_NAMES.index(task)}", 'name': task},
+                'tagIds': None,
+                'tags': [],
+                'timeInterval': {
+                    'start': _iso(start),
+                    'end': None if running else _iso(start + timedelta(minutes=minutes)),
+                    'duration': None if running else _duration(minutes)
+                },
+                'workspaceId': f"{BENCH_PREFIX}-ws",
+                'type': 'REGULAR'
+            })
+
+        # Clockify returns newest first
+        entries.sort(key=lambda e: e['timeInterval']['start'], reverse=True)
+        workspace.entries_by_user[user['id']] = entries
+
+    return workspace
+
+def _column(col_id, title, value=None, text=None, col_type='text', display_value=None):
+    column = {
+        'id': col_id,
+        'type': col_type,
+        'column': {'title': title},
+        'value': json.dumps(value) if value is not None else None,
+        'text': text
+    }
+    if display_value is not None:
+        column['display_value'] = display_value
+    return column
+
+def _date_column(col_id, title, day):
+    if not day:
+        return _column(col_id, title, None, '', 'date')
+    return _column(col_id, title, {'date': day.isoformat(), 'changed_at': '2025-01-01T00:00:00.000Z'},
+                   day.isoformat(), 'date')
+
+def _people_column(col_id, title, person_ids, names):
+    if not person_ids:
+        return _column(col_id, title, None, '', 'people')
+    return _column(
+        col_id, title,
+        {'changed_at': '2025-01-01T00:00:00.000Z',
+         'personsAndTeams': [{'id': pid, 'kind': 'person'} for pid in person_ids]},
+        ', '.join(names), 'people'
+    )
+
+def _client_item(rng, index, people, today, days, subitems_per_item):
+    """One client item with its sprint subitems, shaped like the real board"""
+    item_id = BENCH_ID_BASE + index
+    name = client_name(index)
+
+    # Campaigns start somewhere in the Clockify window, so entries land before,
+    # inside, between and after sprints
+    campaign_start = today - timedelta(days=rng.randrange(max(days, 1)))
+    lead = rng.choice(people) if people else None
+    support = rng.sample(people, min(len(people), rng.randrange(3))) if people else []
+    monthly_rate = rng.choice([2500, 3200, 4500, 6000, 8000])
+
+    column_values = [
+        _column('subitems__1', 'Subitems', None, None, 'subtasks'),
+        _column('lookup_agency', 'Agency Value', None, None, 'mirror', display_value=str(monthly_rate * 3)),
+        _column('formula_priority', 'Client Priority', None, rng.choice(['High', 'Medium', 'Low']), 'formula'),
+        _people_column('person', 'DPR Lead',
+                       [lead['monday_person_id']] if lead else [], [lead['name']] if lead else []),
+        _people_column('people__1', 'DPR Support',
+                       [p['monday_person_id'] for p in support], [p['name'] for p in support]),
+        _column('text_seo', 'SEO Lead', 'Bench SEO', 'Bench SEO'),
+        _column('text_niche', 'Niches', 'Retail', 'Retail'),
+        _column('color_type', 'Campaign Type', {'index': 1}, rng.choice(CAMPAIGN_TYPES), 'status'),
+        _column('color_report', 'Report Status', {'index': 5}, rng.choice(REPORT_STATUSES), 'status'),
+        _date_column('date4', 'Campaign Start Date', campaign_start),
+        _date_column('date_invoice', 'Last Invoice Date', None),
+        _date_column('date_report', 'Last Report Date', today - timedelta(days=rng.randrange(30))),
+        _column('monthly_rate', 'Monthly Rate', str(monthly_rate), str(monthly_rate), 'numbers'),
+        _column('status', 'Contract Length', {'index': 3}, rng.choice(CONTRACT_LENGTHS), 'status'),
+    ]
+
+    subitems = []
+    sprint_start = campaign_start + timedelta(days=rng.choice([0, 7, 14, 21]))
+    for s in range(subitems_per_item):
+        # Quarterly sprints; every few clients leave a gap between sprints
+        sprint_end = sprint_start + timedelta(days=89)
+        kpi_target = rng.choice([10, 15, 20, 30])
+        subitems.append({
+            'id': str(item_id * 100 + s),
+            'name': f"{name} - Sprint {s + 1}",
+            'column_values': [
+                _column('sprint_label', 'Sprint', {'index': s}, f"Sprint #{s + 1}", 'status'),
+                _date_column('date_start', 'Start Date', sprint_start),
+                _date_column('date_end', 'End Date', sprint_end),
+                _column('kpi_target', 'Link KPI Per Quarter', str(kpi_target), str(kpi_target), 'numbers'),
+                _column('kpi_achieved', 'Links Achieved Per Quarter', None,
+                        str(rng.randrange(kpi_target + 1)), 'numbers'),
+                _column('monthly_rate_aud', 'Monthly Rate (AUD)', str(monthly_rate), str(monthly_rate), 'numbers'),
+            ]
+        })
+        gap = 14 if index % 5 == 0 else 1
+        sprint_start = sprint_end + timedelta(days=gap)
+
+    return {'id': str(item_id), 'name': name, 'column_values': column_values, 'subitems': subitems}
+
+def generate_monday_boards(regions=('AU',), groups_per_board=4, items_per_group=25, subitems_per_item=4,
+                           people=None, days=365, seed=1, today=None):
+    """
+    Build one board per region. Client indexes run across boards, so with the
+    default Clockify split the first clients are the ones with tracked time.
+    """
+    rng = random.Random(seed)
+    today = today or datetime.now(timezone.utc).date()
+    people = people or []
+
+    boards = {}
+    index = 0
+    for b, region in enumerate(regions):
+        board_id = str(BENCH_ID_BASE + b)
+        groups = []
+        for g in range(groups_per_board):
+            title = f"{GROUP_TITLES[g % len(GROUP_TITLES)]} - {region}"
+            if g >= len(GROUP_TITLES):
+                title += f" {g // len(GROUP_TITLES) + 1}"
+            items = []
+            for _ in range(items_per_group):
+                items.append(_client_item(rng, index, people, today, days, subitems_per_item))
+                index += 1
+            groups.append({'id': f"group_{b}_{g}", 'title': title, 'items': items})
+        boards[board_id] = {'name': f"Bench Clients Board ({region})", 'region': region, 'groups': groups}
+
+    return MondayWorkspace(boards=boards, people=people)
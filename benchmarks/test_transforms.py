@@ -0,0 +1,166 @@
+"""
+Micro-benchmarks for the per-entry and per-item transform functions of the syncs.
+
+Inputs are the real board snapshot in monday_board_structure.json and a year of
+generated Clockify entries (see conftest.py). Each benchmark runs the function
+over the whole input set, the way the sync's loop does, so timings are per batch.
+
+    pytest benchmarks/test_transforms.py
+    pytest benchmarks/test_transforms.py --benchmark-compare --benchmark-compare-fail=mean:20%
+
+See benchmarks/README.md for saving and comparing baselines.
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+import sync_clockify_data
+import sync_monday_data
+
+# Stand-in for the users lookup in parse_client_item; the benchmark measures parsing,
+# not the PostgREST round trip
+BENCH_USER_ID = '00000000-0000-0000-0000-000000000001'
+
+SPRINT_LABELS = [
+    'Sprint #1', 'Sprint #2', 'Sprint 3', 'sprint#4', 'Q1 - Ongoing', 'Q2 - Ongoing',
+    'Q3', 'Q4 - Complete', 'Phase 7', 'Ongoing', '', None,
+]
+
+@pytest.fixture
+def no_person_lookup(monkeypatch):
+    monkeypatch.setattr(sync_monday_data, 'map_monday_person_to_user', lambda person_id: BENCH_USER_ID)
+
+@pytest.fixture(scope='module')
+def client_sprint_data():
+    """Sprint data for a client with 8 quarterly sprints, a gap and a campaign start date"""
+    start = date.today() - timedelta(days=600)
+    sprints = []
+    for n in range(8):
+        # Leave a two-week gap before sprint 5
+        sprint_start = start + timedelta(days=n * 91 + (14 if n >= 4 else 0))
+        sprints.append({
+            'id': f"sprint-{n + 1}",
+            'name': f"Sprint #{n + 1}",
+            'start_date': sprint_start.isoformat(),
+            'end_date': (sprint_start + timedelta(days=90)).isoformat(),
+            'sprint_number': n + 1,
+        })
+    return {
+        'first_sprint': sprints[0],
+        'last_sprint': sprints[-1],
+        'campaign_start_date': start - timedelta(days=7),
+        'all_sprints': sprints,
+    }
+
+def test_parse_duration_to_hours(benchmark, clockify_entries):
+    durations = [e['timeInterval']['duration'] for e in clockify_entries]
+
+    result = benchmark(lambda: [sync_clockify_data.parse_duration_to_hours(d) for d in durations])
+
+    assert len(result) == len(durations)
+
+def test_normalize_name(benchmark, monday_items, clockify_entries):
+    names = [item['name'] for item, _ in monday_items]
+    names += [e['project']['name'] for e in clockify_entries[:500]]
+
+    result = benchmark(lambda: [sync_clockify_data.normalize_name(n) for n in names])
+
+    assert len(result) == len(names)
+
+def test_build_time_entry_row(benchmark, clockify_entries):
+    project_names = {e['projectId']: e['project']['name'] for e in clockify_entries}
+    project_client_map = {pid: f"client-{i}" for i, pid in enumerate(sorted(project_names)) if i % 5}
+
+    def build_rows():
+        return [
+            sync_clockify_data.build_time_entry_row(e, BENCH_USER_ID, project_names, project_client_map)
+            for e in clockify_entries
+        ]
+
+    result = benchmark(build_rows)
+
+    assert len(result) == len(clockify_entries)
+
+def test_match_sprint_for_date(benchmark, client_sprint_data):
+    first_start = date.fromisoformat(client_sprint_data['first_sprint']['start_date'])
+    last_end = date.fromisoformat(client_sprint_data['last_sprint']['end_date'])
+    # Every day from 60 days before the first sprint to 60 days after the last: before the
+    # campaign, pre-sprint, in sprints, in the gap, after
+    days = (last_end - first_start).days + 120
+    entry_dates = [first_start - timedelta(days=60) + timedelta(days=n) for n in range(days)]
+
+    result = benchmark(lambda: [
+        sync_clockify_data.match_sprint_for_date(client_sprint_data, d) for d in entry_dates
+    ])
+
+    tags = {tag for _, tag in result}
+    assert {None, 'pre_sprint_prep', 'before_campaign', 'gap_between_sprints', 'post_sprint_work'} <= tags
+
+def test_match_sprint_for_date_mirror(benchmark, mirror):
+    """match_sprint_for_date over real clients, sprints and entry dates from the local mirror"""
+    from sync_mirror import MirrorCache
+
+    entries = mirror.query(
+        'SELECT client_id, entry_date FROM time_entries WHERE client_id IS NOT NULL ORDER BY entry_date DESC LIMIT 20000'
+    )
+    if not entries:
+        pytest.skip('The mirror has no time entries')
+
+    cache = MirrorCache(mirror)
+    client_data = {}
+    for client_id in {e['client_id'] for e in entries}:
+        client = cache.client(client_id) or {}
+        sprints = cache.client_sprints(client_id)
+        client_data[client_id] = {
+            'first_sprint': sprints[0] if sprints else None,
+            'last_sprint': sprints[-1] if sprints else None,
+            'campaign_start_date': (date.fromisoformat(client['campaign_start_date'])
+                                    if client.get('campaign_start_date') else None),
+            'all_sprints': sprints,
+        }
+    inputs = [(client_data[e['client_id']], date.fromisoformat(e['entry_date'])) for e in entries]
+
+    result = benchmark(lambda: [sync_clockify_data.match_sprint_for_date(data, d) for data, d in inputs])
+
+    assert len(result) == len(inputs)
+
+def test_extract_sprint_number(benchmark, monday_subitems):
+    labels = [
+        next((c['text'] for c in subitem['column_values'] if c['column']['title'] == 'Sprint'), None)
+        for subitem, _ in monday_subitems
+    ]
+    labels += SPRINT_LABELS * 10
+
+    result = benchmark(lambda: [sync_monday_data.extract_sprint_number(label) for label in labels])
+
+    assert len(result) == len(labels)
+
+def test_parse_client_item(benchmark, monday_items, no_person_lookup):
+    result = benchmark(lambda: [
+        sync_monday_data.parse_client_item(item, group_title, 'AU') for item, group_title in monday_items
+    ])
+
+    assert all(client['name'] for client in result)
+
+def test_parse_sprint_subitem(benchmark, monday_subitems, capsys):
+    result = benchmark(lambda: [
+        sync_monday_data.parse_sprint_subitem(subitem, BENCH_USER_ID, group_title)
+        for subitem, group_title in monday_subitems
+    ])
+    # parse_sprint_subitem prints a line for each subitem without dates
+    capsys.readouterr()
+
+    assert len(result) == len(monday_subitems)
+
+def test_determine_sprint_status(benchmark, client_sprint_data):
+    sprints = client_sprint_data['all_sprints'] * 50
+
+    result = benchmark(lambda: [
+        sync_monday_data.determine_sprint_status('Active Campaigns - AU', s['start_date'], s['end_date'])
+        for s in sprints
+    ])
+
+    assert set(result) <= {'active', 'completed', 'upcoming'}
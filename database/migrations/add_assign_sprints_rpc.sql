@@ -0,0 +1,171 @@
+-- Migration: Add set-based sprint assignment functions
+-- Date: 2026-10-19
+--
+-- assign_sprints() is the database-side version of find_sprint_for_date() in
+-- scripts/sync_clockify_data.py. It takes a JSON array of
+-- {clockify_id, client_id, entry_date} rows and returns (clockify_id, sprint_id, tag)
+-- for all of them in one query, using the same rules:
+--   - exact match: start_date <= entry_date <= end_date; on a boundary overlap the
+--     sprint ending on entry_date wins, otherwise the earliest start_date
+--   - no sprints for the client            -> tag 'no_sprints'
+--   - before the first sprint, within the lookback window (clamped to
+--     campaign_start_date)                 -> first sprint, tag 'pre_sprint_prep'
+--   - before the lookback window           -> tag 'before_campaign'
+--   - after the last sprint ends           -> tag 'post_sprint_work'
+--   - otherwise                            -> tag 'gap_between_sprints'
+-- "First" and "last" sprint are ordered by start_date, as in get_client_sprint_data().
+--
+-- reassign_client_sprints() re-runs the assignment for stored time_entries of one
+-- client (optionally within a date range) in a single UPDATE, for use after sprint
+-- dates change in Monday.com.
+
+CREATE OR REPLACE FUNCTION public.assign_sprints(p_entries jsonb, p_lookback_days integer DEFAULT 14)
+ RETURNS TABLE(clockify_id text, sprint_id uuid, tag text)
+ LANGUAGE sql
+ STABLE SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+  WITH entries AS (
+    SELECT e.clockify_id, e.client_id, e.entry_date
+    FROM jsonb_to_recordset(p_entries) AS e(clockify_id text, client_id uuid, entry_date date)
+  ),
+  entry_clients AS (
+    SELECT DISTINCT entries.client_id FROM entries WHERE entries.client_id IS NOT NULL
+  ),
+  first_sprints AS (
+    SELECT DISTINCT ON (s.client_id) s.client_id, s.id, s.start_date
+    FROM sprints s
+    JOIN entry_clients ec ON ec.client_id = s.client_id
+    ORDER BY s.client_id, s.start_date, s.id
+  ),
+  last_sprints AS (
+    SELECT DISTINCT ON (s.client_id) s.client_id, s.end_date
+    FROM sprints s
+    JOIN entry_clients ec ON ec.client_id = s.client_id
+    ORDER BY s.client_id, s.start_date DESC, s.id DESC
+  ),
+  candidates AS (
+    SELECT
+      e.clockify_id,
+      e.client_id,
+      e.entry_date,
+      m.id AS matched_sprint_id,
+      f.id AS first_sprint_id,
+      f.start_date AS first_sprint_start,
+      l.end_date AS last_sprint_end,
+      -- GREATEST ignores NULL, so a missing campaign_start_date leaves the plain lookback
+      GREATEST(f.start_date - p_lookback_days, c.campaign_start_date) AS lookback_start
+    FROM entries e
+    LEFT JOIN clients c ON c.id = e.client_id
+    LEFT JOIN first_sprints f ON f.client_id = e.client_id
+    LEFT JOIN last_sprints l ON l.client_id = e.client_id
+    LEFT JOIN LATERAL (
+      SELECT s.id
+      FROM sprints s
+      WHERE s.client_id = e.client_id
+        AND s.start_date <= e.entry_date
+        AND s.end_date >= e.entry_date
+      ORDER BY (s.end_date = e.entry_date) DESC, s.start_date, s.id
+      LIMIT 1
+    ) m ON e.client_id IS NOT NULL AND e.entry_date IS NOT NULL
+  )
+  SELECT
+    cand.clockify_id,
+    CASE
+      WHEN cand.matched_sprint_id IS NOT NULL THEN cand.matched_sprint_id
+      WHEN cand.entry_date < cand.first_sprint_start
+       AND cand.entry_date >= cand.lookback_start THEN cand.first_sprint_id
+    END AS sprint_id,
+    CASE
+      WHEN cand.client_id IS NULL OR cand.entry_date IS NULL THEN NULL
+      WHEN cand.matched_sprint_id IS NOT NULL THEN NULL
+      WHEN cand.first_sprint_id IS NULL THEN 'no_sprints'
+      WHEN cand.entry_date < cand.first_sprint_start THEN
+        CASE WHEN cand.entry_date >= cand.lookback_start THEN 'pre_sprint_prep' ELSE 'before_campaign' END
+      WHEN cand.entry_date > cand.last_sprint_end THEN 'post_sprint_work'
+      ELSE 'gap_between_sprints'
+    END AS tag
+  FROM candidates cand;
+$function$;
+
+-- Sync (service role) only: SECURITY DEFINER bypasses RLS on sprints and clients.
+REVOKE EXECUTE ON FUNCTION public.assign_sprints(jsonb, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.assign_sprints(jsonb, integer) TO service_role;
+
+-- Recompute sprint_id and sprint tags for a client's stored time entries.
+-- Only rows whose assignment actually changes are updated; the daily rollup is
+-- refreshed for the affected dates. Returns the number of entries updated.
+CREATE OR REPLACE FUNCTION public.reassign_client_sprints(
+    p_client_id uuid,
+    p_start_date date DEFAULT NULL,
+    p_end_date date DEFAULT NULL,
+    p_lookback_days integer DEFAULT 14
+)
+ RETURNS integer
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+DECLARE
+    v_rows INTEGER;
+    v_dates DATE[];
+BEGIN
+    WITH assigned AS (
+        SELECT a.clockify_id, a.sprint_id, a.tag
+        FROM assign_sprints(
+            (
+                SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                    'clockify_id', te.clockify_id,
+                    'client_id', te.client_id,
+                    'entry_date', te.entry_date
+                )), '[]'::jsonb)
+                FROM time_entries te
+                WHERE te.client_id = p_client_id
+                  AND (p_start_date IS NULL OR te.entry_date >= p_start_date)
+                  AND (p_end_date IS NULL OR te.entry_date <= p_end_date)
+            ),
+            p_lookback_days
+        ) a
+    ),
+    target AS (
+        SELECT
+            te.id,
+            a.sprint_id,
+            -- Keep any non-sprint tags, replace the sprint assignment tag
+            ARRAY(
+                SELECT t FROM unnest(te.tags) AS t
+                WHERE t <> ALL (ARRAY['pre_sprint_prep', 'before_campaign', 'post_sprint_work',
+                                      'gap_between_sprints', 'no_sprints'])
+            ) || CASE WHEN a.tag IS NULL THEN '{}'::text[] ELSE ARRAY[a.tag] END AS tags
+        FROM time_entries te
+        JOIN assigned a ON a.clockify_id = te.clockify_id
+    ),
+    updated AS (
+        UPDATE time_entries te
+        SET sprint_id = target.sprint_id,
+            tags = target.tags
+        FROM target
+        WHERE te.id = target.id
+          AND (te.sprint_id IS DISTINCT FROM target.sprint_id OR te.tags IS DISTINCT FROM target.tags)
+        RETURNING te.entry_date
+    )
+    SELECT count(*), array_agg(DISTINCT updated.entry_date)
+    INTO v_rows, v_dates
+    FROM updated;
+
+    IF v_dates IS NOT NULL THEN
+        PERFORM refresh_time_entries_daily(v_dates);
+    END IF;
+
+    RETURN v_rows;
+END;
+$function$;
+
+-- Sync (service role) only: rewrites time_entries.sprint_id and bypasses RLS.
+REVOKE EXECUTE ON FUNCTION public.reassign_client_sprints(uuid, date, date, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.reassign_client_sprints(uuid, date, date, integer) TO service_role;
+
+-- Example: re-assign every stored entry for one client after its sprint dates change
+--   SELECT reassign_client_sprints('<client uuid>');
+-- or only a window around the changed sprint
+--   SELECT reassign_client_sprints('<client uuid>', '2025-06-01', '2025-09-30');
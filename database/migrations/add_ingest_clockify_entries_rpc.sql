@@ -0,0 +1,148 @@
+-- Migration: Server-side ingestion of raw Clockify time entries
+-- Date: 2026-10-19
+--
+-- ingest_clockify_entries(entries, run) takes a JSON array of raw Clockify time
+-- entries (as returned by /user/{id}/time-entries) and does, in one transaction,
+-- everything sync_time_entries() does per entry in Python:
+--   - duration parsing (parse_clockify_duration, same rules as parse_duration_to_hours)
+--   - user mapping: entry.userId -> run.users[].email -> users.email (case-insensitive)
+--   - project -> client via the stored clockify_projects mapping, falling back to the
+--     client_id already stored on the entry
+--   - sprint assignment via assign_sprints()
+--   - upsert via upsert_time_entries() and a daily rollup refresh for touched dates
+--
+-- run metadata: {"users": [{"clockify_user_id": "...", "email": "..."}],
+--                "lookback_days": 14}
+-- Returns: {"synced": n, "skipped": n, "skip_reasons": {...}}
+--
+-- Requires: add_time_entries_daily.sql, add_assign_sprints_rpc.sql,
+--           partition_time_entries_1_upsert_rpc.sql
+
+-- Clockify ISO 8601 duration (PT2H30M) to decimal hours, rounded to 2 places.
+-- Seconds are ignored, as in parse_duration_to_hours().
+CREATE OR REPLACE FUNCTION public.parse_clockify_duration(p_duration text)
+ RETURNS numeric
+ LANGUAGE sql
+ IMMUTABLE PARALLEL SAFE
+AS $function$
+  SELECT round(
+    COALESCE(substring(p_duration FROM 'T(\d+(?:\.\d+)?)H')::numeric, 0)
+    + COALESCE(substring(p_duration FROM '[TH](\d+(?:\.\d+)?)M')::numeric, 0) / 60.0,
+    2
+  );
+$function$;
+
+CREATE OR REPLACE FUNCTION public.ingest_clockify_entries(p_entries jsonb, p_run jsonb DEFAULT '{}'::jsonb)
+ RETURNS jsonb
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+DECLARE
+    v_lookback INTEGER := COALESCE((p_run->>'lookback_days')::integer, 14);
+    v_rows JSONB;
+    v_dates DATE[];
+    v_synced INTEGER := 0;
+    v_no_hours INTEGER;
+    v_unmapped_user INTEGER;
+    v_pre_sprint INTEGER;
+    v_no_sprint INTEGER;
+    v_non_client INTEGER;
+BEGIN
+    DROP TABLE IF EXISTS _ingest;
+
+    -- Shape raw entries; last occurrence of a clockify_id wins, as in the Python sync
+    CREATE TEMP TABLE _ingest ON COMMIT DROP AS
+    SELECT DISTINCT ON (x.e->>'id')
+        x.e->>'id' AS clockify_id,
+        u.id AS user_id,
+        x.e->>'projectId' AS clockify_project_id,
+        COALESCE(cp.name, x.e->'project'->>'name') AS project_name,
+        COALESCE(cp.client_id, existing.client_id) AS client_id,
+        -- Date part of the start timestamp as given, like datetime.fromisoformat(...).date()
+        left(x.e->'timeInterval'->>'start', 10)::date AS entry_date,
+        parse_clockify_duration(x.e->'timeInterval'->>'duration') AS hours,
+        COALESCE(x.e->>'description', '') AS description,
+        x.e->'task'->>'name' AS task_category,
+        NULL::uuid AS sprint_id,
+        NULL::text AS tag
+    FROM jsonb_array_elements(p_entries) WITH ORDINALITY AS x(e, n)
+    LEFT JOIN jsonb_to_recordset(COALESCE(p_run->'users', '[]'::jsonb))
+        AS ru(clockify_user_id text, email text) ON ru.clockify_user_id = x.e->>'userId'
+    LEFT JOIN users u ON lower(u.email) = lower(ru.email)
+    LEFT JOIN clockify_projects cp ON cp.clockify_id = x.e->>'projectId'
+    LEFT JOIN LATERAL (
+        SELECT te.client_id FROM time_entries te
+        WHERE te.clockify_id = x.e->>'id' AND te.client_id IS NOT NULL
+        LIMIT 1
+    ) existing ON cp.client_id IS NULL
+    WHERE x.e->'timeInterval'->>'start' IS NOT NULL
+    ORDER BY x.e->>'id', x.n DESC;
+
+    SELECT count(*) FILTER (WHERE user_id IS NULL),
+           count(*) FILTER (WHERE user_id IS NOT NULL AND hours = 0)
+    INTO v_unmapped_user, v_no_hours
+    FROM _ingest;
+
+    DELETE FROM _ingest WHERE user_id IS NULL OR hours = 0;
+
+    -- Sprint assignment for client work
+    UPDATE _ingest i
+    SET sprint_id = a.sprint_id,
+        tag = a.tag
+    FROM assign_sprints(
+        (SELECT COALESCE(jsonb_agg(jsonb_build_object(
+                    'clockify_id', clockify_id,
+                    'client_id', client_id,
+                    'entry_date', entry_date)), '[]'::jsonb)
+         FROM _ingest WHERE client_id IS NOT NULL),
+        v_lookback
+    ) a
+    WHERE a.clockify_id = i.clockify_id;
+
+    SELECT count(*) FILTER (WHERE client_id IS NOT NULL AND tag IS NOT NULL AND sprint_id IS NOT NULL),
+           count(*) FILTER (WHERE client_id IS NOT NULL AND tag IS NOT NULL AND sprint_id IS NULL),
+           count(*) FILTER (WHERE client_id IS NULL)
+    INTO v_pre_sprint, v_no_sprint, v_non_client
+    FROM _ingest;
+
+    SELECT jsonb_agg(jsonb_build_object(
+               'clockify_id', clockify_id,
+               'sprint_id', sprint_id,
+               'client_id', client_id,
+               'user_id', user_id,
+               'entry_date', entry_date,
+               'hours', hours,
+               'description', description,
+               'task_category', task_category,
+               'project_name', project_name,
+               'tags', CASE WHEN tag IS NULL THEN '[]'::jsonb ELSE jsonb_build_array(tag) END,
+               'updated_at', now())),
+           array_agg(DISTINCT entry_date)
+    INTO v_rows, v_dates
+    FROM _ingest;
+
+    IF v_rows IS NOT NULL THEN
+        v_synced := upsert_time_entries(v_rows);
+        PERFORM refresh_time_entries_daily(v_dates);
+    END IF;
+
+    DROP TABLE _ingest;
+
+    RETURN jsonb_build_object(
+        'synced', v_synced,
+        'skipped', v_no_hours,
+        'skip_reasons', jsonb_build_object(
+            'no_hours', v_no_hours,
+            'no_sprint', v_no_sprint,
+            'pre_sprint_prep', v_pre_sprint,
+            'non_client_work', v_non_client,
+            'unmapped_user', v_unmapped_user
+        )
+    );
+END;
+$function$;
+
+-- Sync (service role) only: SECURITY DEFINER writes time_entries and the daily rollup past RLS.
+REVOKE EXECUTE ON FUNCTION public.ingest_clockify_entries(jsonb, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.ingest_clockify_entries(jsonb, jsonb) TO service_role;
@@ -0,0 +1,25 @@
+-- Migration: Composite and trigram indexes for sync lookups
+-- Date: 2026-10-19
+--
+-- The sync's hot lookups are:
+--   - sprints for client X where start_date <= d <= end_date (find_sprint_for_date,
+--     assign_sprints)
+--   - clients by name with ILIKE (map_project_to_client: manual mappings and
+--     exact, case-insensitive matches)
+-- The existing single-column indexes (idx_sprints_client, idx_sprints_dates,
+-- idx_clients_name) don't match these shapes.
+--
+-- Users are looked up with email = the lower-cased Clockify email, which the
+-- unique index on email already serves. The partial/normalized name matching
+-- in map_project_to_client runs in Python over all clients, so no index helps it.
+--
+-- Compare plans before/after with: python scripts/benchmark_lookup_indexes.py
+
+-- Sprints: client + date range in one index. Replaces idx_sprints_client, which is
+-- a prefix of this one.
+CREATE INDEX IF NOT EXISTS idx_sprints_client_dates ON public.sprints USING btree (client_id, start_date, end_date);
+DROP INDEX IF EXISTS public.idx_sprints_client;
+
+-- Clients: ILIKE on name (PostgREST .ilike()) can only use a trigram index
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+CREATE INDEX IF NOT EXISTS idx_clients_name_trgm ON public.clients USING gin (name extensions.gin_trgm_ops);
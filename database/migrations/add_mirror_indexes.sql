@@ -0,0 +1,17 @@
+-- Migration: updated_at indexes for the local mirror's incremental refresh
+-- Date: 2026-10-19
+--
+-- scripts/sync_mirror.py keeps a SQLite copy of users, clients, sprints,
+-- clockify_projects and an index of time_entries. Each refresh asks for the rows
+-- with updated_at at or after the last one it saw, keyset-paged on
+-- (updated_at, key). Without these indexes every refresh of time_entries is a
+-- full scan of every partition.
+--
+-- updated_at is kept current by the update_*_updated_at triggers
+-- (update_updated_at_column()) and, for time entries, by the Clockify sync.
+
+CREATE INDEX IF NOT EXISTS idx_users_updated_at ON public.users USING btree (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_clients_updated_at ON public.clients USING btree (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_sprints_updated_at ON public.sprints USING btree (updated_at, id);
+CREATE INDEX IF NOT EXISTS idx_clockify_projects_updated_at ON public.clockify_projects USING btree (updated_at, clockify_id);
+CREATE INDEX IF NOT EXISTS idx_time_entries_updated_at ON public.time_entries USING btree (updated_at, clockify_id);
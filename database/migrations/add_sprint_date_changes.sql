@@ -0,0 +1,46 @@
+-- Migration: Record sprint date changes for targeted re-assignment
+-- Date: 2026-10-19
+--
+-- Time entries get their sprint when they are written, so when a sprint's dates
+-- change in Monday.com, entries that now fall in (or out of) it keep the old
+-- assignment until the whole Clockify history is synced again.
+--
+-- The Monday sync compares each sprint with its stored dates and records new
+-- sprints and date changes here before upserting them, with the date range whose
+-- entries can change sprint or tag: the earlier start minus the pre-sprint
+-- lookback to the later end, widened to the end of the client's previous sprint
+-- and the start of its next one (the gaps around a sprint change tag too).
+-- After the boards are synced, the pending rows of each client
+-- are merged into one range and re-assigned from the stored time_entries with
+-- reassign_client_sprints (migrations/add_assign_sprints_rpc.sql); no Clockify
+-- calls. reassigned_at marks a row as done.
+
+CREATE TABLE IF NOT EXISTS public.sprint_date_changes (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  client_id uuid NOT NULL REFERENCES public.clients(id) ON DELETE CASCADE,
+  monday_subitem_id bigint NOT NULL,
+  sprint_name text,
+  -- NULL old dates: the sprint is new
+  old_start_date date,
+  old_end_date date,
+  new_start_date date NOT NULL,
+  new_end_date date NOT NULL,
+  -- Entry dates whose assignment can change
+  reassign_start date NOT NULL,
+  reassign_end date NOT NULL,
+  detected_at timestamp with time zone NOT NULL DEFAULT now(),
+  reassigned_at timestamp with time zone,
+  entries_reassigned integer
+);
+
+COMMENT ON TABLE public.sprint_date_changes IS 'Sprint date changes seen by the Monday sync, re-assigned from stored time entries';
+
+CREATE INDEX IF NOT EXISTS idx_sprint_date_changes_pending
+  ON public.sprint_date_changes (client_id) WHERE reassigned_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_sprint_date_changes_detected
+  ON public.sprint_date_changes (detected_at DESC);
+
+ALTER TABLE public.sprint_date_changes ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY sprint_date_changes_select_admin ON public.sprint_date_changes
+  FOR SELECT USING (is_current_user_admin());
@@ -0,0 +1,69 @@
+-- Migration: Change versions for the sync daemon's warm caches
+-- Date: 2026-10-19
+--
+-- scripts/sync_daemon.py keeps users, clients, sprints and clockify_projects in
+-- memory between runs. Before each run it calls get_sync_cache_versions() and
+-- reloads only the tables whose version moved. Every INSERT, UPDATE, DELETE or
+-- TRUNCATE statement on those tables bumps the table's version, so edits made
+-- outside the syncs (dashboard, SQL editor) invalidate the caches too.
+--
+-- The bump is per statement, not per row, and an upsert that changes nothing
+-- still counts as a change; a Monday sync therefore always invalidates clients
+-- and sprints, which is what the Clockify run after it needs.
+
+CREATE TABLE IF NOT EXISTS public.sync_cache_versions (
+  table_name text PRIMARY KEY,
+  version bigint NOT NULL DEFAULT 1,
+  changed_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+COMMENT ON TABLE public.sync_cache_versions IS 'Change counter per reference table, for invalidating the sync daemon''s in-memory caches';
+
+CREATE OR REPLACE FUNCTION public.bump_sync_cache_version()
+ RETURNS trigger
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+BEGIN
+    INSERT INTO sync_cache_versions (table_name, version, changed_at)
+    VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = sync_cache_versions.version + 1,
+        changed_at = now();
+    RETURN NULL;
+END;
+$function$;
+
+DO $$
+DECLARE
+    v_table text;
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['users', 'clients', 'sprints', 'clockify_projects'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON public.%I', 'bump_sync_cache_version_' || v_table, v_table);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.%I
+             FOR EACH STATEMENT EXECUTE FUNCTION bump_sync_cache_version()',
+            'bump_sync_cache_version_' || v_table, v_table
+        );
+        INSERT INTO sync_cache_versions (table_name) VALUES (v_table) ON CONFLICT DO NOTHING;
+    END LOOP;
+END;
+$$;
+
+-- {"users": 12, "clients": 431, "sprints": 2270, "clockify_projects": 95}
+CREATE OR REPLACE FUNCTION public.get_sync_cache_versions()
+ RETURNS jsonb
+ LANGUAGE sql
+ STABLE
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+  SELECT COALESCE(jsonb_object_agg(table_name, version), '{}'::jsonb)
+  FROM sync_cache_versions;
+$function$;
+
+ALTER TABLE public.sync_cache_versions ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY sync_cache_versions_select_admin ON public.sync_cache_versions
+  FOR SELECT USING (is_current_user_admin());
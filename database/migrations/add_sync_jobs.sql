@@ -0,0 +1,206 @@
+-- Migration: Job queue for distributed sync workers
+-- Date: 2026-10-19
+--
+-- scripts/sync_jobs.py splits sync work into jobs (one per Clockify user and
+-- date window, one per Monday board) and any number of workers, on any number
+-- of machines, drain them:
+--
+--   claim_sync_jobs      takes up to p_limit runnable jobs with FOR UPDATE SKIP
+--                        LOCKED, so concurrent workers never get the same job,
+--                        and leases them for p_lease_seconds
+--   extend_sync_job_lease  keeps a long job's lease alive (worker heartbeat)
+--   complete_sync_job    marks a job done with its result
+--   fail_sync_job        puts a job back with exponential backoff, or dead-letters
+--                        it (status 'dead') after max_attempts
+--
+-- A job whose worker crashed keeps status 'running' until its lease runs out;
+-- claim_sync_jobs then hands it to another worker (or dead-letters it when it
+-- has used up its attempts). The lease holder is checked on extend, complete
+-- and fail, so a worker that lost its lease can't overwrite the new holder's
+-- outcome.
+
+CREATE TABLE IF NOT EXISTS public.sync_jobs (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  kind text NOT NULL CHECK (kind IN ('clockify_user_window', 'monday_board')),
+  payload jsonb NOT NULL DEFAULT '{}'::jsonb,
+  -- Same key while queued or running = same job; enqueueing it again is a no-op
+  dedupe_key text NOT NULL,
+  batch text,
+  status text NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'done', 'dead')),
+  attempts integer NOT NULL DEFAULT 0,
+  max_attempts integer NOT NULL DEFAULT 5,
+  run_after timestamp with time zone NOT NULL DEFAULT now(),
+  locked_by text,
+  lease_until timestamp with time zone,
+  last_error text,
+  result jsonb,
+  created_at timestamp with time zone NOT NULL DEFAULT now(),
+  updated_at timestamp with time zone NOT NULL DEFAULT now(),
+  finished_at timestamp with time zone
+);
+
+COMMENT ON TABLE public.sync_jobs IS 'Sync work queue drained by scripts/sync_jobs.py workers';
+
+-- Claim order for queued jobs, and expired leases
+CREATE INDEX IF NOT EXISTS idx_sync_jobs_queued
+  ON public.sync_jobs (run_after, id) WHERE status = 'queued';
+CREATE INDEX IF NOT EXISTS idx_sync_jobs_running_lease
+  ON public.sync_jobs (lease_until) WHERE status = 'running';
+CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_jobs_dedupe_active
+  ON public.sync_jobs (dedupe_key) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_sync_jobs_batch
+  ON public.sync_jobs (batch, status);
+
+-- Enqueue jobs: [{"kind": "...", "payload": {...}, "dedupe_key": "...", "max_attempts": 5}, ...]
+-- Returns how many were inserted (jobs already queued or running are skipped)
+CREATE OR REPLACE FUNCTION public.enqueue_sync_jobs(p_jobs jsonb, p_batch text DEFAULT NULL)
+ RETURNS integer
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+DECLARE
+    v_inserted integer;
+BEGIN
+    INSERT INTO sync_jobs (kind, payload, dedupe_key, batch, max_attempts)
+    SELECT j->>'kind',
+           COALESCE(j->'payload', '{}'::jsonb),
+           j->>'dedupe_key',
+           p_batch,
+           COALESCE((j->>'max_attempts')::integer, 5)
+    FROM jsonb_array_elements(p_jobs) AS j
+    ON CONFLICT (dedupe_key) WHERE status IN ('queued', 'running') DO NOTHING;
+
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+    RETURN v_inserted;
+END;
+$function$;
+
+-- The queue functions bypass RLS on sync_jobs; only sync_jobs.py (service role) calls them.
+REVOKE EXECUTE ON FUNCTION public.enqueue_sync_jobs(jsonb, text) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.enqueue_sync_jobs(jsonb, text) TO service_role;
+
+CREATE OR REPLACE FUNCTION public.claim_sync_jobs(
+    p_worker text,
+    p_limit integer DEFAULT 1,
+    p_lease_seconds integer DEFAULT 300,
+    p_kinds text[] DEFAULT NULL
+)
+ RETURNS SETOF public.sync_jobs
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+BEGIN
+    -- Expired leases on the last attempt: the worker died holding it, don't retry forever
+    UPDATE sync_jobs
+    SET status = 'dead',
+        last_error = COALESCE(last_error || E'\n', '') || 'Lease expired (worker ' || COALESCE(locked_by, '?') || ' stopped)',
+        locked_by = NULL,
+        lease_until = NULL,
+        updated_at = now(),
+        finished_at = now()
+    WHERE id IN (
+        SELECT id FROM sync_jobs
+        WHERE status = 'running' AND lease_until < now() AND attempts >= max_attempts
+        FOR UPDATE SKIP LOCKED
+    );
+
+    RETURN QUERY
+    UPDATE sync_jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_by = p_worker,
+        lease_until = now() + make_interval(secs => p_lease_seconds),
+        updated_at = now()
+    WHERE j.id IN (
+        SELECT id FROM sync_jobs
+        WHERE ((status = 'queued' AND run_after <= now())
+               OR (status = 'running' AND lease_until < now()))
+          AND (p_kinds IS NULL OR kind = ANY(p_kinds))
+        ORDER BY run_after, id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING j.*;
+END;
+$function$;
+
+REVOKE EXECUTE ON FUNCTION public.claim_sync_jobs(text, integer, integer, text[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.claim_sync_jobs(text, integer, integer, text[]) TO service_role;
+
+-- False when the worker no longer holds the job (lease expired and re-claimed)
+CREATE OR REPLACE FUNCTION public.extend_sync_job_lease(p_id bigint, p_worker text, p_lease_seconds integer DEFAULT 300)
+ RETURNS boolean
+ LANGUAGE sql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+  WITH extended AS (
+    UPDATE sync_jobs
+    SET lease_until = now() + make_interval(secs => p_lease_seconds),
+        updated_at = now()
+    WHERE id = p_id AND locked_by = p_worker AND status = 'running'
+    RETURNING 1
+  )
+  SELECT EXISTS (SELECT 1 FROM extended);
+$function$;
+
+REVOKE EXECUTE ON FUNCTION public.extend_sync_job_lease(bigint, text, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.extend_sync_job_lease(bigint, text, integer) TO service_role;
+
+CREATE OR REPLACE FUNCTION public.complete_sync_job(p_id bigint, p_worker text, p_result jsonb DEFAULT NULL)
+ RETURNS boolean
+ LANGUAGE sql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+  WITH completed AS (
+    UPDATE sync_jobs
+    SET status = 'done',
+        result = p_result,
+        locked_by = NULL,
+        lease_until = NULL,
+        updated_at = now(),
+        finished_at = now()
+    WHERE id = p_id AND locked_by = p_worker AND status = 'running'
+    RETURNING 1
+  )
+  SELECT EXISTS (SELECT 1 FROM completed);
+$function$;
+
+REVOKE EXECUTE ON FUNCTION public.complete_sync_job(bigint, text, jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.complete_sync_job(bigint, text, jsonb) TO service_role;
+
+-- Retry after p_base_seconds * 2^(attempts - 1) (capped at an hour), or dead-letter.
+-- Returns the job's new status, or NULL when the worker no longer holds it.
+CREATE OR REPLACE FUNCTION public.fail_sync_job(
+    p_id bigint,
+    p_worker text,
+    p_error text,
+    p_base_seconds integer DEFAULT 30
+)
+ RETURNS text
+ LANGUAGE sql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+  UPDATE sync_jobs
+  SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+      run_after = now() + make_interval(secs => LEAST(3600, p_base_seconds * power(2, GREATEST(attempts - 1, 0)))),
+      last_error = p_error,
+      locked_by = NULL,
+      lease_until = NULL,
+      updated_at = now(),
+      finished_at = CASE WHEN attempts >= max_attempts THEN now() END
+  WHERE id = p_id AND locked_by = p_worker AND status = 'running'
+  RETURNING status;
+$function$;
+
+REVOKE EXECUTE ON FUNCTION public.fail_sync_job(bigint, text, text, integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.fail_sync_job(bigint, text, text, integer) TO service_role;
+
+ALTER TABLE public.sync_jobs ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY sync_jobs_select_admin ON public.sync_jobs
+  FOR SELECT USING (is_current_user_admin());
@@ -0,0 +1,14 @@
+-- Migration: Add per-run metrics to sync_logs
+-- Date: 2026-10-19
+--
+-- The Python syncs (scripts/sync_metrics.py) store timing and call counts per run:
+--   {"duration_seconds": 312.4,
+--    "phases": {"fetch_users": 0.4, "fetch_entries": 201.3, "write": 64.0, ...},
+--    "api_calls": 412, "api_bytes": 48213311, "api_errors": 0,
+--    "db_calls": 951, "db_bytes": 1203312}
+-- sync_start/sync_end now hold the real start and end of the run.
+
+ALTER TABLE public.sync_logs
+ADD COLUMN IF NOT EXISTS metrics jsonb;
+
+COMMENT ON COLUMN public.sync_logs.metrics IS 'Per-run timing (total and per phase, seconds), API/DB call counts and bytes received';
@@ -0,0 +1,21 @@
+-- Migration: Live progress for running syncs
+-- Date: 2026-10-19
+--
+-- The Python syncs insert their sync_logs row with status 'running' when they start,
+-- update progress/heartbeat_at while they run (at most every 15 seconds), and set
+-- status to 'success' or 'error' on the same row at the end. A 'running' row whose
+-- heartbeat_at stops moving is a stuck or killed run.
+--
+-- progress: {"users_total": 42, "users_done": 17, "current_user": "...",
+--            "pages_fetched": 31, "entries_fetched": 18200, "rows_written": 17650,
+--            "elapsed_seconds": 95.2, "rows_per_second": 185.4, "eta_seconds": 134.4}
+-- (Monday runs report boards_total/boards_done instead of users_*)
+--
+-- Requires: add_sync_logs_metrics.sql
+
+ALTER TABLE public.sync_logs
+ADD COLUMN IF NOT EXISTS progress jsonb,
+ADD COLUMN IF NOT EXISTS heartbeat_at timestamp with time zone;
+
+COMMENT ON COLUMN public.sync_logs.progress IS 'Progress of the run (users/boards done, pages fetched, rows written, throughput, ETA), updated while status is running';
+COMMENT ON COLUMN public.sync_logs.heartbeat_at IS 'Last progress update; a running row with an old heartbeat is stuck or was killed';
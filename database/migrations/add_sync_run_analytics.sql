@@ -0,0 +1,175 @@
+-- Migration: Sync run analytics RPC
+-- Date: 2026-10-19
+--
+-- sync_run_analytics() summarises sync_logs in one query for
+-- `python scripts/check_sync_logs.py --analytics`:
+--   per source: run counts, success rate, p50/p95/max duration of successful runs,
+--               records/s (average and trend), time since the last success, and a
+--               daily series of runs and records/s
+--   anomalies:  successful runs in the window whose duration or records/s is far
+--               off the trailing baseline of the same source's previous successful
+--               runs (more than p_threshold standard deviations and 1.5x off the
+--               baseline mean, with at least 5 baseline runs)
+--
+-- Only rows from the window (plus 30 days before it, for the first runs' baselines)
+-- are read, through idx_sync_logs_source_created, so the cost stays flat as
+-- sync_logs grows.
+--
+-- Durations are sync_end - sync_start, which are the real run times from
+-- add_sync_logs_metrics.sql on.
+
+CREATE INDEX IF NOT EXISTS idx_sync_logs_source_created
+  ON public.sync_logs USING btree (source, created_at DESC);
+
+CREATE OR REPLACE FUNCTION public.sync_run_analytics(
+    p_days integer DEFAULT 30,
+    p_source text DEFAULT NULL,
+    p_baseline_runs integer DEFAULT 10,
+    p_threshold numeric DEFAULT 3
+)
+ RETURNS jsonb
+ LANGUAGE sql
+ STABLE
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+WITH runs AS (
+    SELECT
+        id,
+        source,
+        status,
+        created_at,
+        records_synced,
+        EXTRACT(EPOCH FROM (sync_end - sync_start))::numeric AS duration
+    FROM sync_logs
+    WHERE created_at >= now() - make_interval(days => p_days + 30)
+      AND (p_source IS NULL OR source = p_source)
+),
+scored AS (
+    SELECT
+        runs.*,
+        CASE WHEN duration > 0 THEN COALESCE(records_synced, 0) / duration END AS records_per_second
+    FROM runs
+),
+in_window AS (
+    SELECT * FROM scored
+    WHERE created_at >= now() - make_interval(days => p_days)
+),
+-- Baseline for each successful run: the same source's previous successful runs
+baselined AS (
+    SELECT
+        scored.*,
+        COUNT(*) OVER baseline AS baseline_runs,
+        AVG(duration) OVER baseline AS baseline_duration,
+        STDDEV_SAMP(duration) OVER baseline AS duration_stddev,
+        AVG(records_per_second) OVER baseline AS baseline_rps,
+        STDDEV_SAMP(records_per_second) OVER baseline AS rps_stddev
+    FROM scored
+    WHERE status = 'success' AND duration IS NOT NULL
+    WINDOW baseline AS (
+        PARTITION BY source ORDER BY created_at
+        ROWS BETWEEN p_baseline_runs PRECEDING AND 1 PRECEDING
+    )
+),
+flagged AS (
+    SELECT
+        baselined.*,
+        (duration > baseline_duration * 1.5
+         AND duration > baseline_duration + p_threshold * COALESCE(duration_stddev, 0)) AS slow,
+        (records_per_second < baseline_rps / 1.5
+         AND records_per_second < baseline_rps - p_threshold * COALESCE(rps_stddev, 0)) AS low_throughput
+    FROM baselined
+    WHERE created_at >= now() - make_interval(days => p_days)
+      AND baseline_runs >= 5
+),
+per_source AS (
+    SELECT
+        source,
+        COUNT(*) AS runs,
+        COUNT(*) FILTER (WHERE status = 'success') AS successes,
+        COUNT(*) FILTER (WHERE status = 'error') AS errors,
+        COUNT(*) FILTER (WHERE status = 'running') AS running,
+        PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY duration) FILTER (WHERE status = 'success') AS p50_duration,
+        PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY duration) FILTER (WHERE status = 'success') AS p95_duration,
+        MAX(duration) FILTER (WHERE status = 'success') AS max_duration,
+        AVG(records_per_second) FILTER (WHERE status = 'success') AS avg_records_per_second,
+        -- Change in records/s per day over the window (least squares)
+        REGR_SLOPE(records_per_second, EXTRACT(EPOCH FROM created_at) / 86400)
+            FILTER (WHERE status = 'success') AS records_per_second_trend
+    FROM in_window
+    GROUP BY source
+),
+daily AS (
+    SELECT
+        source,
+        jsonb_agg(jsonb_build_object(
+            'day', day,
+            'runs', runs,
+            'records_per_second', records_per_second
+        ) ORDER BY day) AS days
+    FROM (
+        SELECT
+            source,
+            created_at::date AS day,
+            COUNT(*) AS runs,
+            ROUND(AVG(records_per_second) FILTER (WHERE status = 'success'), 1) AS records_per_second
+        FROM in_window
+        GROUP BY source, created_at::date
+    ) by_day
+    GROUP BY source
+)
+SELECT jsonb_build_object(
+    'generated_at', now(),
+    'days', p_days,
+    'sources', COALESCE((
+        SELECT jsonb_agg(jsonb_build_object(
+            'source', s.source,
+            'runs', s.runs,
+            'successes', s.successes,
+            'errors', s.errors,
+            'running', s.running,
+            'success_rate', ROUND(100.0 * s.successes / NULLIF(s.successes + s.errors, 0), 1),
+            'p50_duration_seconds', ROUND(s.p50_duration::numeric, 1),
+            'p95_duration_seconds', ROUND(s.p95_duration::numeric, 1),
+            'max_duration_seconds', ROUND(s.max_duration, 1),
+            'avg_records_per_second', ROUND(s.avg_records_per_second, 1),
+            'records_per_second_trend', ROUND(s.records_per_second_trend::numeric, 2),
+            'last_success_at', last_success.sync_end,
+            'seconds_since_success', ROUND(EXTRACT(EPOCH FROM (now() - last_success.sync_end))),
+            'daily', d.days
+        ) ORDER BY s.source)
+        FROM per_source s
+        LEFT JOIN daily d ON d.source = s.source
+        -- May be older than the window; newest-first walk of idx_sync_logs_source_created
+        LEFT JOIN LATERAL (
+            SELECT sl.sync_end
+            FROM sync_logs sl
+            WHERE sl.source = s.source AND sl.status = 'success'
+            ORDER BY sl.created_at DESC
+            LIMIT 1
+        ) last_success ON true
+    ), '[]'::jsonb),
+    'anomalies', COALESCE((
+        SELECT jsonb_agg(jsonb_build_object(
+            'id', f.id,
+            'source', f.source,
+            'created_at', f.created_at,
+            'duration_seconds', ROUND(f.duration, 1),
+            'baseline_duration_seconds', ROUND(f.baseline_duration, 1),
+            'records_per_second', ROUND(f.records_per_second, 1),
+            'baseline_records_per_second', ROUND(f.baseline_rps, 1),
+            'slow', f.slow,
+            'low_throughput', COALESCE(f.low_throughput, false)
+        ) ORDER BY f.created_at DESC)
+        FROM flagged f
+        WHERE f.slow OR f.low_throughput
+    ), '[]'::jsonb)
+);
+$function$;
+
+COMMENT ON FUNCTION public.sync_run_analytics(integer, text, integer, numeric) IS 'Per-source sync run statistics and anomalous runs for check_sync_logs.py --analytics';
+
+-- check_sync_logs.py calls this with the service role key. SECURITY DEFINER reads
+-- sync_logs past its admin-only RLS, so it is not exposed to anon or authenticated.
+REVOKE EXECUTE ON FUNCTION public.sync_run_analytics(integer, text, integer, numeric) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.sync_run_analytics(integer, text, integer, numeric) TO service_role;
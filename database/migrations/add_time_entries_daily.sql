@@ -0,0 +1,92 @@
+-- Migration: Add time_entries_daily rollup table
+-- Date: 2026-10-19
+--
+-- One row per (client, sprint, user, task_category, entry_date) with summed hours
+-- and entry count. Range reports (hours per client per day/week, per user, per task)
+-- read this table instead of scanning raw time_entries.
+--
+-- The Clockify sync keeps it current by calling refresh_time_entries_daily() with
+-- the entry dates it wrote, so only those days are recomputed.
+
+CREATE TABLE public.time_entries_daily (
+  client_id uuid,
+  sprint_id uuid,
+  user_id uuid NOT NULL,
+  task_category text,
+  entry_date date NOT NULL,
+  hours numeric NOT NULL DEFAULT 0,
+  entry_count integer NOT NULL DEFAULT 0,
+  refreshed_at timestamp with time zone DEFAULT now(),
+  CONSTRAINT time_entries_daily_key
+    UNIQUE NULLS NOT DISTINCT (entry_date, client_id, sprint_id, user_id, task_category)
+);
+
+CREATE INDEX idx_time_entries_daily_client_date ON public.time_entries_daily USING btree (client_id, entry_date);
+CREATE INDEX idx_time_entries_daily_user_date ON public.time_entries_daily USING btree (user_id, entry_date);
+CREATE INDEX idx_time_entries_daily_sprint ON public.time_entries_daily USING btree (sprint_id);
+
+COMMENT ON TABLE public.time_entries_daily IS 'Daily rollup of time_entries, refreshed per entry_date by the Clockify sync';
+
+-- Recompute the rollup for the given dates from time_entries
+CREATE OR REPLACE FUNCTION public.refresh_time_entries_daily(p_dates date[])
+ RETURNS integer
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+DECLARE
+    v_rows INTEGER;
+BEGIN
+    -- One refresh at a time: sync_jobs workers, webhook batches and sprint reassignments
+    -- can refresh the same date concurrently, and both would delete, then the second
+    -- insert would hit the unique key. After waiting, this transaction's statements see
+    -- what the previous refresh committed.
+    PERFORM pg_advisory_xact_lock(hashtext('refresh_time_entries_daily'));
+
+    DELETE FROM time_entries_daily
+    WHERE entry_date = ANY(p_dates);
+
+    INSERT INTO time_entries_daily (
+        client_id, sprint_id, user_id, task_category, entry_date, hours, entry_count
+    )
+    SELECT
+        te.client_id,
+        te.sprint_id,
+        te.user_id,
+        te.task_category,
+        te.entry_date,
+        SUM(te.hours),
+        COUNT(*)
+    FROM time_entries te
+    WHERE te.entry_date = ANY(p_dates)
+    GROUP BY te.client_id, te.sprint_id, te.user_id, te.task_category, te.entry_date;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    RETURN v_rows;
+END;
+$function$;
+
+-- Only the sync (service role) refreshes the rollup. Functions are executable by PUBLIC
+-- by default, which PostgREST would expose to the public anon key.
+REVOKE EXECUTE ON FUNCTION public.refresh_time_entries_daily(date[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_time_entries_daily(date[]) TO service_role;
+
+-- Same access rules as time_entries
+ALTER TABLE public.time_entries_daily ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY time_entries_daily_select_admin ON public.time_entries_daily
+  FOR SELECT USING (is_current_user_admin());
+
+CREATE POLICY time_entries_daily_select_assigned ON public.time_entries_daily
+  FOR SELECT USING (
+    client_id IN (
+      SELECT clients.id FROM clients
+      WHERE clients.dpr_lead_id IN (SELECT users.id FROM users WHERE users.email = auth_email())
+    )
+  );
+
+CREATE POLICY time_entries_daily_select_own ON public.time_entries_daily
+  FOR SELECT USING (user_id IN (SELECT users.id FROM users WHERE users.email = auth_email()));
+
+-- Initial backfill from existing time entries
+SELECT public.refresh_time_entries_daily(ARRAY(SELECT DISTINCT entry_date FROM public.time_entries));
@@ -0,0 +1,143 @@
+-- Migration: Reconcile time entries deleted in Clockify
+-- Date: 2026-10-19
+--
+-- The Clockify sync only upserts, so an entry deleted in Clockify (or moved out
+-- of the synced window) stays in time_entries and keeps counting in
+-- sprint_metrics. After a user's window was fetched completely, the sync calls
+-- reconcile_time_entries with every clockify_id Clockify returned; stored
+-- entries of that user and window that aren't among them are orphans.
+--
+--   p_dry_run => true      only report the orphans
+--   p_archive => true      move them to time_entries_deleted (soft delete)
+--   p_archive => false     delete them
+--
+-- Rows written after p_fetched_at (when the fetch started), e.g. by the webhook
+-- receiver, are newer than what the sync saw and are never orphans.
+--
+-- Orphans are found and removed with one statement each, scoped by user_id and
+-- entry_date (idx_time_entries_user_date, and partition pruning on entry_date),
+-- so no run scans the whole table. time_entries_daily is refreshed for the
+-- dates that lost entries.
+--
+-- As a guard against a truncated fetch, nothing is removed when the orphans are
+-- more than 10 entries and more than p_max_fraction of the user's stored entries
+-- in the window; the result says refused.
+
+CREATE TABLE IF NOT EXISTS public.time_entries_deleted (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  clockify_id text NOT NULL,
+  sprint_id uuid,
+  client_id uuid,
+  user_id uuid NOT NULL,
+  project_id uuid,
+  entry_date date NOT NULL,
+  hours numeric NOT NULL,
+  description text,
+  task_category text,
+  project_name text,
+  tags text[],
+  created_at timestamp with time zone,
+  updated_at timestamp with time zone,
+  deleted_at timestamp with time zone NOT NULL DEFAULT now()
+);
+
+COMMENT ON TABLE public.time_entries_deleted IS 'Time entries removed by reconcile_time_entries because Clockify no longer returns them';
+
+CREATE INDEX IF NOT EXISTS idx_time_entries_deleted_clockify_id
+  ON public.time_entries_deleted (clockify_id);
+CREATE INDEX IF NOT EXISTS idx_time_entries_deleted_user_date
+  ON public.time_entries_deleted (user_id, entry_date);
+
+-- One user's entries over a date window (created on every partition)
+CREATE INDEX IF NOT EXISTS idx_time_entries_user_date
+  ON public.time_entries USING btree (user_id, entry_date);
+
+-- Returns {"stored", "orphans", "hours", "dates", "clockify_ids", "removed", "refused"}
+CREATE OR REPLACE FUNCTION public.reconcile_time_entries(
+    p_user_id uuid,
+    p_start_date date,
+    p_end_date date,
+    p_clockify_ids text[],
+    p_fetched_at timestamp with time zone DEFAULT NULL,
+    p_dry_run boolean DEFAULT true,
+    p_archive boolean DEFAULT true,
+    p_max_fraction numeric DEFAULT 0.5
+)
+ RETURNS jsonb
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+DECLARE
+    v_stored integer;
+    v_orphans integer;
+    v_hours numeric;
+    v_ids text[];
+    v_dates date[];
+    v_refused boolean;
+    v_removed integer := 0;
+BEGIN
+    SELECT count(*),
+           count(*) FILTER (WHERE orphan),
+           COALESCE(sum(hours) FILTER (WHERE orphan), 0),
+           COALESCE(array_agg(clockify_id) FILTER (WHERE orphan), '{}'),
+           COALESCE(array_agg(DISTINCT entry_date) FILTER (WHERE orphan), '{}')
+    INTO v_stored, v_orphans, v_hours, v_ids, v_dates
+    FROM (
+        SELECT te.clockify_id, te.entry_date, te.hours,
+               f.id IS NULL AND (p_fetched_at IS NULL OR te.updated_at < p_fetched_at) AS orphan
+        FROM time_entries te
+        LEFT JOIN (SELECT DISTINCT unnest(p_clockify_ids) AS id) f ON f.id = te.clockify_id
+        WHERE te.user_id = p_user_id
+          AND te.entry_date BETWEEN p_start_date AND p_end_date
+    ) scoped;
+
+    v_refused := p_max_fraction IS NOT NULL AND v_orphans > GREATEST(10, p_max_fraction * v_stored);
+
+    IF NOT p_dry_run AND NOT v_refused AND v_orphans > 0 THEN
+        IF p_archive THEN
+            WITH removed AS (
+                DELETE FROM time_entries
+                WHERE user_id = p_user_id
+                  AND entry_date BETWEEN p_start_date AND p_end_date
+                  AND clockify_id = ANY(v_ids)
+                RETURNING *
+            )
+            INSERT INTO time_entries_deleted (
+                clockify_id, sprint_id, client_id, user_id, project_id, entry_date, hours,
+                description, task_category, project_name, tags, created_at, updated_at
+            )
+            SELECT clockify_id, sprint_id, client_id, user_id, project_id, entry_date, hours,
+                   description, task_category, project_name, tags, created_at, updated_at
+            FROM removed;
+        ELSE
+            DELETE FROM time_entries
+            WHERE user_id = p_user_id
+              AND entry_date BETWEEN p_start_date AND p_end_date
+              AND clockify_id = ANY(v_ids);
+        END IF;
+
+        GET DIAGNOSTICS v_removed = ROW_COUNT;
+        PERFORM refresh_time_entries_daily(v_dates);
+    END IF;
+
+    RETURN jsonb_build_object(
+        'stored', v_stored,
+        'orphans', v_orphans,
+        'hours', v_hours,
+        'dates', to_jsonb(v_dates),
+        'clockify_ids', to_jsonb(v_ids[1:100]),
+        'removed', v_removed,
+        'refused', v_refused
+    );
+END;
+$function$;
+
+-- Sync (service role) only: SECURITY DEFINER deletes and archives time_entries past RLS.
+REVOKE EXECUTE ON FUNCTION public.reconcile_time_entries(uuid, date, date, text[], timestamp with time zone, boolean, boolean, numeric) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.reconcile_time_entries(uuid, date, date, text[], timestamp with time zone, boolean, boolean, numeric) TO service_role;
+
+ALTER TABLE public.time_entries_deleted ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY time_entries_deleted_select_admin ON public.time_entries_deleted
+  FOR SELECT USING (is_current_user_admin());
@@ -0,0 +1,77 @@
+-- Migration: time_entries partitioning, step 1 of 2 - upsert RPC
+-- Date: 2026-10-19
+--
+-- A table partitioned by entry_date can only enforce uniqueness on keys that include
+-- entry_date, so the PostgREST upsert with on_conflict=clockify_id stops working once
+-- time_entries is partitioned (step 2). This step is safe to apply on the current,
+-- unpartitioned table:
+--   1. adds a unique index on (clockify_id, entry_date) so ON CONFLICT can use it
+--   2. adds upsert_time_entries(jsonb), which the Python sync and the sync-clockify
+--      edge function call instead of .upsert(on_conflict='clockify_id')
+--
+-- clockify_id stays unique: upsert_time_entries() first deletes any stored copy of an
+-- entry whose entry_date changed (it may live in another partition), then upserts on
+-- (clockify_id, entry_date). The daily rollup is refreshed for the dates moved away from.
+--
+-- Deploy the sync changes after this step and before step 2.
+
+CREATE UNIQUE INDEX IF NOT EXISTS time_entries_clockify_id_entry_date_key
+  ON public.time_entries USING btree (clockify_id, entry_date);
+
+CREATE OR REPLACE FUNCTION public.upsert_time_entries(p_rows jsonb)
+ RETURNS integer
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+DECLARE
+    v_rows INTEGER;
+    v_moved_dates DATE[];
+BEGIN
+    -- Entries whose date changed in Clockify: drop the copy stored under the old date
+    WITH moved AS (
+        DELETE FROM time_entries te
+        USING jsonb_to_recordset(p_rows) AS r(clockify_id text, entry_date date)
+        WHERE te.clockify_id = r.clockify_id
+          AND te.entry_date <> r.entry_date
+        RETURNING te.entry_date
+    )
+    SELECT array_agg(DISTINCT moved.entry_date) INTO v_moved_dates FROM moved;
+
+    INSERT INTO time_entries (
+        clockify_id, sprint_id, client_id, user_id, entry_date, hours,
+        description, task_category, project_name, tags, updated_at
+    )
+    SELECT
+        r.clockify_id, r.sprint_id, r.client_id, r.user_id, r.entry_date, r.hours,
+        r.description, r.task_category, r.project_name,
+        COALESCE(r.tags, '{}'::text[]), COALESCE(r.updated_at, now())
+    FROM jsonb_to_recordset(p_rows) AS r(
+        clockify_id text, sprint_id uuid, client_id uuid, user_id uuid, entry_date date,
+        hours numeric, description text, task_category text, project_name text,
+        tags text[], updated_at timestamptz
+    )
+    ON CONFLICT (clockify_id, entry_date) DO UPDATE SET
+        sprint_id = EXCLUDED.sprint_id,
+        client_id = EXCLUDED.client_id,
+        user_id = EXCLUDED.user_id,
+        hours = EXCLUDED.hours,
+        description = EXCLUDED.description,
+        task_category = EXCLUDED.task_category,
+        project_name = EXCLUDED.project_name,
+        tags = EXCLUDED.tags,
+        updated_at = EXCLUDED.updated_at;
+
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+    IF v_moved_dates IS NOT NULL THEN
+        PERFORM refresh_time_entries_daily(v_moved_dates);
+    END IF;
+
+    RETURN v_rows;
+END;
+$function$;
+
+-- Sync (service role) only: SECURITY DEFINER writes time_entries past RLS.
+REVOKE EXECUTE ON FUNCTION public.upsert_time_entries(jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.upsert_time_entries(jsonb) TO service_role;
@@ -0,0 +1,230 @@
+-- Migration: time_entries partitioning, step 2 of 2 - month partitions
+-- Date: 2026-10-19
+--
+-- Replaces time_entries with a table range-partitioned by entry_date month.
+-- Requires step 1 (partition_time_entries_1_upsert_rpc.sql) and a sync that writes
+-- through upsert_time_entries().
+--
+-- What it does, in one transaction:
+--   1. renames the current table to time_entries_legacy (kept for rollback)
+--   2. creates the partitioned time_entries with the same columns, constraints,
+--      indexes, trigger and RLS policies; primary key becomes (id, entry_date)
+--   3. creates a partition per month covering existing data plus 3 months ahead,
+--      and a default partition for anything outside that
+--   4. copies the data and re-points the views that read time_entries
+--
+-- Helpers:
+--   create_time_entries_partition(month)      - one month, idempotent
+--   ensure_time_entries_partitions(ahead)     - current month + N ahead
+--   detach_time_entries_partition(month)      - detach a month for archiving
+--
+-- Once verified: DROP TABLE public.time_entries_legacy;
+
+BEGIN;
+
+LOCK TABLE public.time_entries IN ACCESS EXCLUSIVE MODE;
+
+-- Remember view definitions that read time_entries; they are bound to the old table
+CREATE TEMP TABLE _time_entries_views ON COMMIT DROP AS
+SELECT DISTINCT v.oid::regclass::text AS view_name, pg_get_viewdef(v.oid) AS definition
+FROM pg_depend d
+JOIN pg_rewrite r ON r.oid = d.objid
+JOIN pg_class v ON v.oid = r.ev_class
+WHERE d.refobjid = 'public.time_entries'::regclass
+  AND v.relkind = 'v';
+
+-- 1. Move the current table aside (constraint names are reused by the new table)
+ALTER TABLE public.time_entries RENAME TO time_entries_legacy;
+ALTER TABLE public.time_entries_legacy RENAME CONSTRAINT time_entries_pkey TO time_entries_legacy_pkey;
+ALTER TABLE public.time_entries_legacy RENAME CONSTRAINT time_entries_clockify_id_key TO time_entries_legacy_clockify_id_key;
+ALTER TABLE public.time_entries_legacy RENAME CONSTRAINT time_entries_sprint_id_fkey TO time_entries_legacy_sprint_id_fkey;
+ALTER TABLE public.time_entries_legacy RENAME CONSTRAINT time_entries_client_id_fkey TO time_entries_legacy_client_id_fkey;
+ALTER TABLE public.time_entries_legacy RENAME CONSTRAINT time_entries_user_id_fkey TO time_entries_legacy_user_id_fkey;
+ALTER TABLE public.time_entries_legacy RENAME CONSTRAINT time_entries_project_id_fkey TO time_entries_legacy_project_id_fkey;
+ALTER INDEX public.time_entries_clockify_id_entry_date_key RENAME TO time_entries_legacy_clockify_id_entry_date_key;
+DROP INDEX IF EXISTS public.idx_time_entries_client;
+DROP INDEX IF EXISTS public.idx_time_entries_clockify_id;
+DROP INDEX IF EXISTS public.idx_time_entries_date;
+DROP INDEX IF EXISTS public.idx_time_entries_project;
+DROP INDEX IF EXISTS public.idx_time_entries_sprint;
+DROP INDEX IF EXISTS public.idx_time_entries_tags;
+DROP INDEX IF EXISTS public.idx_time_entries_user;
+
+-- 2. Partitioned table
+CREATE TABLE public.time_entries (
+    id uuid NOT NULL DEFAULT uuid_generate_v4(),
+    clockify_id text NOT NULL,
+    sprint_id uuid,
+    client_id uuid,
+    user_id uuid NOT NULL,
+    project_id uuid,
+    entry_date date NOT NULL,
+    hours numeric NOT NULL,
+    description text,
+    task_category text,
+    project_name text,
+    tags text[] DEFAULT '{}'::text[],
+    created_at timestamp with time zone DEFAULT now(),
+    updated_at timestamp with time zone DEFAULT now(),
+    CONSTRAINT time_entries_pkey PRIMARY KEY (id, entry_date),
+    CONSTRAINT time_entries_clockify_id_entry_date_key UNIQUE (clockify_id, entry_date),
+    CONSTRAINT time_entries_sprint_id_fkey FOREIGN KEY (sprint_id) REFERENCES public.sprints(id) ON DELETE SET NULL,
+    CONSTRAINT time_entries_client_id_fkey FOREIGN KEY (client_id) REFERENCES public.clients(id) ON DELETE SET NULL,
+    CONSTRAINT time_entries_user_id_fkey FOREIGN KEY (user_id) REFERENCES public.users(id),
+    CONSTRAINT time_entries_project_id_fkey FOREIGN KEY (project_id) REFERENCES public.clockify_projects(id),
+    CONSTRAINT valid_hours CHECK (hours >= 0 AND hours <= 24)
+) PARTITION BY RANGE (entry_date);
+
+CREATE INDEX idx_time_entries_clockify_id ON public.time_entries USING btree (clockify_id);
+CREATE INDEX idx_time_entries_client ON public.time_entries USING btree (client_id);
+CREATE INDEX idx_time_entries_sprint ON public.time_entries USING btree (sprint_id);
+CREATE INDEX idx_time_entries_user ON public.time_entries USING btree (user_id);
+CREATE INDEX idx_time_entries_project ON public.time_entries USING btree (project_id);
+CREATE INDEX idx_time_entries_date ON public.time_entries USING btree (entry_date);
+CREATE INDEX idx_time_entries_tags ON public.time_entries USING gin (tags);
+
+CREATE TRIGGER update_time_entries_updated_at BEFORE UPDATE ON public.time_entries
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+ALTER TABLE public.time_entries ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY time_entries_select_admin ON public.time_entries
+  FOR SELECT USING (is_current_user_admin());
+
+CREATE POLICY time_entries_select_assigned ON public.time_entries
+  FOR SELECT USING (
+    EXISTS (
+      SELECT 1 FROM sprints JOIN clients ON clients.id = sprints.client_id
+      WHERE sprints.id = time_entries.sprint_id
+        AND clients.dpr_lead_id IN (SELECT users.id FROM users WHERE users.email = auth_email())
+    )
+  );
+
+CREATE POLICY time_entries_select_own ON public.time_entries
+  FOR SELECT USING (user_id IN (SELECT users.id FROM users WHERE users.email = auth_email()));
+
+-- Catches rows outside the monthly partitions; create_time_entries_partition() moves
+-- them into the right month when that partition is created
+CREATE TABLE public.time_entries_default PARTITION OF public.time_entries DEFAULT;
+-- Partitions are reachable through PostgREST too; RLS with no policies keeps them closed
+ALTER TABLE public.time_entries_default ENABLE ROW LEVEL SECURITY;
+
+-- 3. Partition helpers
+CREATE OR REPLACE FUNCTION public.create_time_entries_partition(p_month date)
+ RETURNS text
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::date;
+    v_end DATE := (date_trunc('month', p_month) + interval '1 month')::date;
+    v_name TEXT := format('time_entries_%s', to_char(p_month, 'YYYY_MM'));
+BEGIN
+    IF to_regclass('public.' || v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+
+    -- A new partition can't be attached while the default partition holds rows for
+    -- its range, so park those rows, create the partition, and put them back
+    CREATE TEMP TABLE _time_entries_parked (LIKE time_entries) ON COMMIT DROP;
+
+    WITH parked AS (
+        DELETE FROM time_entries_default
+        WHERE entry_date >= v_start AND entry_date < v_end
+        RETURNING *
+    )
+    INSERT INTO _time_entries_parked SELECT * FROM parked;
+
+    EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.time_entries FOR VALUES FROM (%L) TO (%L)',
+        v_name, v_start, v_end
+    );
+    EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', v_name);
+
+    INSERT INTO time_entries SELECT * FROM _time_entries_parked;
+    DROP TABLE _time_entries_parked;
+
+    RETURN v_name;
+END;
+$function$;
+
+-- Partition maintenance is DDL run as the owner: service role only.
+REVOKE EXECUTE ON FUNCTION public.create_time_entries_partition(date) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_time_entries_partition(date) TO service_role;
+
+CREATE OR REPLACE FUNCTION public.ensure_time_entries_partitions(p_months_ahead integer DEFAULT 3)
+ RETURNS SETOF text
+ LANGUAGE sql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+  SELECT create_time_entries_partition(month::date)
+  FROM generate_series(
+    date_trunc('month', CURRENT_DATE),
+    date_trunc('month', CURRENT_DATE) + make_interval(months => p_months_ahead),
+    interval '1 month'
+  ) AS month;
+$function$;
+
+REVOKE EXECUTE ON FUNCTION public.ensure_time_entries_partitions(integer) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.ensure_time_entries_partitions(integer) TO service_role;
+
+-- Detach one month so it can be dumped/archived and dropped. The detached table keeps
+-- its data; date-bounded reports simply stop seeing it.
+CREATE OR REPLACE FUNCTION public.detach_time_entries_partition(p_month date)
+ RETURNS text
+ LANGUAGE plpgsql
+ SECURITY DEFINER
+ SET search_path TO 'public'
+AS $function$
+DECLARE
+    v_name TEXT := format('time_entries_%s', to_char(p_month, 'YYYY_MM'));
+BEGIN
+    IF to_regclass('public.' || v_name) IS NULL THEN
+        RAISE EXCEPTION 'Partition % does not exist', v_name;
+    END IF;
+
+    EXECUTE format('ALTER TABLE public.time_entries DETACH PARTITION public.%I', v_name);
+    RETURN v_name;
+END;
+$function$;
+
+REVOKE EXECUTE ON FUNCTION public.detach_time_entries_partition(date) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.detach_time_entries_partition(date) TO service_role;
+
+SELECT public.create_time_entries_partition(month::date)
+FROM generate_series(
+    date_trunc('month', COALESCE((SELECT min(entry_date) FROM public.time_entries_legacy), CURRENT_DATE)),
+    date_trunc('month', CURRENT_DATE) + interval '3 months',
+    interval '1 month'
+) AS month;
+
+-- 4. Copy data and re-point dependent views at the new table
+INSERT INTO public.time_entries (
+    id, clockify_id, sprint_id, client_id, user_id, project_id, entry_date, hours,
+    description, task_category, project_name, tags, created_at, updated_at
+)
+SELECT
+    id, clockify_id, sprint_id, client_id, user_id, project_id, entry_date, hours,
+    description, task_category, project_name, tags, created_at, updated_at
+FROM public.time_entries_legacy;
+
+DO $$
+DECLARE
+    v RECORD;
+BEGIN
+    FOR v IN SELECT view_name, definition FROM _time_entries_views LOOP
+        EXECUTE format('CREATE OR REPLACE VIEW %s AS %s', v.view_name, v.definition);
+    END LOOP;
+END $$;
+
+COMMIT;
+
+-- Keep partitions ahead of the calendar (Supabase pg_cron), e.g. on the 1st of each month:
+--   SELECT cron.schedule('time-entries-partitions', '0 3 1 * *',
+--                        'SELECT public.ensure_time_entries_partitions(3)');
+--
+-- Archive an old month:
+--   SELECT public.detach_time_entries_partition('2024-01-01');
+--   -- pg_dump -t public.time_entries_2024_01 ... then DROP TABLE public.time_entries_2024_01;
@@ -51,12 +51,12 @@ if result.data:
     print(f"\nTotal Sprint Value (sum of all sprint revenues): ${total_sprint_value}")
     print(f"Agency Value from field: ${client.get('agency_value')}")
     
-    # Get time entries
-    time_result = supabase.table('time_entries').select(
+    # Get hours from the daily rollup (a few hundred rows instead of every entry)
+    time_result = supabase.table('time_entries_daily').select(
         'hours'
     ).eq('client_id', client['id']).execute()
     
-    total_hours = sum(entry.get('hours', 0) for entry in time_result.data)
+    total_hours = sum(float(row.get('hours') or 0) for row in time_result.data)
     print(f"\nTotal Hours Logged: {total_hours:.2f}")
     
     if total_hours > 0 and client.get('agency_value'):
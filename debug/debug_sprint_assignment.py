@@ -1,19 +1,22 @@
 """
 Debug script to find time entries that fall within sprint dates but aren't assigned to sprints.
 This helps identify issues with the sprint assignment logic.
+
+    python debug/debug_sprint_assignment.py            # query Supabase
+    python debug/debug_sprint_assignment.py --mirror   # read the local mirror (scripts/sync_mirror.py)
 """
 
-from supabase import create_client
 import os
+import sys
+import argparse
 from datetime import datetime
 from dotenv import load_dotenv
 
 load_dotenv()
 
-supabase = create_client(
-    os.getenv('SUPABASE_URL'),
-    os.getenv('SUPABASE_SERVICE_ROLE_KEY')
-)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from sync_clients import get_supabase
 
 def check_sprint_assignment_issues():
     """Find time entries that should be in sprints but aren't assigned."""
@@ -21,6 +24,7 @@ def check_sprint_assignment_issues():
     print("\n=== Checking Sprint Assignment Issues ===\n")
     
     # Get all clients with sprints
+    supabase = get_supabase()
     clients_response = supabase.table('clients').select('id, name').execute()
     
     for client in clients_response.data:
@@ -85,6 +89,51 @@ def check_sprint_assignment_issues():
                 print(f"  Description: {entry.get('description', 'N/A')[:60]}...")
                 print(f"  Entry ID: {entry['id']}")
 
+def check_sprint_assignment_issues_mirror(path=None):
+    """Same check against the local mirror, in one query; no network access"""
+    from sync_mirror import SyncMirror
+
+    mirror = SyncMirror(path)
+    print(f"\n=== Checking Sprint Assignment Issues (mirror: {mirror.path}) ===\n")
+
+    rows = mirror.query("""
+        SELECT c.name AS client_name, e.clockify_id, e.entry_date, e.hours, u.name AS user_name,
+               s.name AS sprint_name, s.start_date, s.end_date
+        FROM time_entries e
+        JOIN clients c ON c.id = e.client_id
+        JOIN sprints s ON s.id = (
+            SELECT id FROM sprints
+            WHERE client_id = e.client_id AND start_date <= e.entry_date AND e.entry_date <= end_date
+            ORDER BY start_date LIMIT 1
+        )
+        LEFT JOIN users u ON u.id = e.user_id
+        WHERE e.sprint_id IS NULL
+        ORDER BY c.name, e.entry_date
+    """)
+
+    by_client = {}
+    for row in rows:
+        by_client.setdefault(row['client_name'], []).append(row)
+
+    for client_name, entries in by_client.items():
+        print(f"\n🔴 {client_name} ({len(entries)} misassigned entries)")
+        print("=" * 80)
+
+        for entry in entries:
+            print(f"\n  Entry Date: {entry['entry_date']}")
+            print(f"  Should be in: {entry['sprint_name']} ({entry['start_date']} to {entry['end_date']})")
+            print(f"  User: {entry['user_name'] or 'Unknown'}")
+            print(f"  Hours: {entry['hours']}")
+            print(f"  Clockify ID: {entry['clockify_id']}")
+
 if __name__ == '__main__':
-    check_sprint_assignment_issues()
+    parser = argparse.ArgumentParser(description='Find time entries inside a sprint\'s dates but not assigned to it')
+    parser.add_argument('--mirror', nargs='?', const=True, default=None, metavar='PATH',
+                        help='Read the local mirror as last refreshed instead of querying Supabase')
+    args = parser.parse_args()
+
+    if args.mirror:
+        check_sprint_assignment_issues_mirror(args.mirror if isinstance(args.mirror, str) else None)
+    else:
+        check_sprint_assignment_issues()
     print("\n✅ Check complete!\n")
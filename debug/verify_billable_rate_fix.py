@@ -35,12 +35,12 @@ for sprint in sprints_result.data:
 print(f"\nTotal Contract Value (calculated): ${total_contract_value:,.0f}")
 print(f"Agency Value (from field): ${client.get('agency_value') or 0:,.0f}")
 
-# Get time entries
-time_result = supabase.table('time_entries').select(
+# Get hours from the daily rollup (a few hundred rows instead of every entry)
+time_result = supabase.table('time_entries_daily').select(
     'hours'
 ).eq('client_id', client['id']).execute()
 
-total_hours = sum(entry.get('hours', 0) for entry in time_result.data)
+total_hours = sum(float(row.get('hours') or 0) for row in time_result.data)
 print(f"\nTotal Hours Logged: {total_hours:.2f}")
 
 print("\n" + "="*60)
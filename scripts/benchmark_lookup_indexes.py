@@ -0,0 +1,190 @@
+"""
+Show query plans for the lookups the sync scripts issue, before and after the
+indexes in database/migrations/add_lookup_indexes.sql.
+
+"Before" plans are produced inside a transaction that drops the new indexes
+(and recreates idx_sprints_client) and is then rolled back, so nothing changes
+in the database. Dropping an index takes a brief exclusive lock on its table;
+lock_timeout keeps this from queueing behind a running sync.
+
+Usage:
+    python scripts/benchmark_lookup_indexes.py            # before and after
+    python scripts/benchmark_lookup_indexes.py --after    # current plans only
+"""
+
+import os
+import sys
+import json
+import argparse
+
+try:
+    import psycopg2
+except ImportError:
+    print("❌ psycopg2 is required: pip install psycopg2-binary")
+    sys.exit(1)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+SUPABASE_URL = os.getenv('SUPABASE_URL')
+SUPABASE_PW = os.getenv('SUPABASE_PW')
+
+# Indexes added by add_lookup_indexes.sql
+NEW_INDEXES = [
+    'idx_sprints_client_dates',
+    'idx_clients_name_trgm',
+]
+
+def connect():
+    """Connect directly to the Supabase Postgres database"""
+    project_ref = SUPABASE_URL.replace('https://', '').replace('.supabase.co', '')
+    return psycopg2.connect(
+        host=f"db.{project_ref}.supabase.co",
+        user='postgres',
+        dbname='postgres',
+        password=SUPABASE_PW,
+        port=5432,
+        sslmode='require'
+    )
+
+def sample_params(cursor):
+    """Pick real values to plug into the benchmark queries"""
+    cursor.execute("""
+        SELECT s.client_id, s.start_date + ((s.end_date - s.start_date) / 2), c.name
+        FROM sprints s JOIN clients c ON c.id = s.client_id
+        ORDER BY s.start_date DESC
+        LIMIT 1
+    """)
+    client_id, entry_date, client_name = cursor.fetchone()
+
+    cursor.execute("SELECT email FROM users LIMIT 1")
+    email = cursor.fetchone()[0]
+
+    cursor.execute("SELECT clockify_id FROM time_entries ORDER BY entry_date DESC LIMIT 200")
+    clockify_ids = [row[0] for row in cursor.fetchall()]
+
+    return {
+        'client_id': client_id,
+        'entry_date': entry_date,
+        'client_name': client_name,
+        'email': email,
+        'clockify_ids': clockify_ids,
+    }
+
+def benchmark_queries(params):
+    """The queries the sync scripts send, as (label, sql, args)"""
+    batch = json.dumps([
+        {'clockify_id': str(i), 'client_id': str(params['client_id']), 'entry_date': params['entry_date'].isoformat()}
+        for i in range(200)
+    ])
+
+    return [
+        ("sprints: exact date match for a client",
+         "SELECT id, name, start_date, end_date FROM sprints "
+         "WHERE client_id = %s AND start_date <= %s AND end_date >= %s ORDER BY start_date",
+         (params['client_id'], params['entry_date'], params['entry_date'])),
+        ("get_client_sprint_data: all sprints for client",
+         "SELECT id, name, start_date, end_date, sprint_number FROM sprints "
+         "WHERE client_id = %s ORDER BY start_date",
+         (params['client_id'],)),
+        ("assign_sprints: batch of 200 entries",
+         "SELECT * FROM assign_sprints(%s::jsonb)",
+         (batch,)),
+        ("map_clockify_user_to_internal: email (lower-cased in Python)",
+         "SELECT id FROM users WHERE email = %s",
+         (params['email'].lower(),)),
+        ("map_project_to_client: ilike on name",
+         "SELECT id, name FROM clients WHERE name ILIKE %s",
+         (params['client_name'],)),
+        ("fill_existing_client_ids: clockify_id IN batch",
+         "SELECT clockify_id, client_id FROM time_entries WHERE clockify_id = ANY(%s)",
+         (params['clockify_ids'],)),
+    ]
+
+def explain(cursor, sql, args):
+    """Return the EXPLAIN ANALYZE plan lines and execution time for a query"""
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", args)
+    plan = cursor.fetchone()[0][0]
+
+    def walk(node, depth=0):
+        label = node['Node Type']
+        if node.get('Index Name'):
+            label += f" using {node['Index Name']}"
+        if node.get('Relation Name'):
+            label += f" on {node['Relation Name']}"
+        lines = [f"{'  ' * depth}-> {label} (rows={node.get('Actual Rows')}, {node.get('Actual Total Time')} ms)"]
+        for child in node.get('Plans', []):
+            lines.extend(walk(child, depth + 1))
+        return lines
+
+    return walk(plan['Plan']), plan['Execution Time']
+
+def run_plans(conn, params, before):
+    """Explain every benchmark query, optionally with the new indexes dropped"""
+    results = {}
+    cursor = conn.cursor()
+
+    try:
+        if before:
+            cursor.execute("SET LOCAL lock_timeout = '2s'")
+            for index_name in NEW_INDEXES:
+                cursor.execute(f"DROP INDEX IF EXISTS public.{index_name}")
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sprints_client ON public.sprints USING btree (client_id)"
+            )
+
+        for label, sql, args in benchmark_queries(params):
+            try:
+                cursor.execute("SAVEPOINT q")
+                results[label] = explain(cursor, sql, args)
+                cursor.execute("RELEASE SAVEPOINT q")
+            except psycopg2.Error as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT q")
+                results[label] = ([f"-> not available: {e.pgerror or e}".strip()], None)
+    finally:
+        conn.rollback()
+
+    return results
+
+def print_results(title, results):
+    print(f"\n=== {title} ===")
+    for label, (lines, exec_ms) in results.items():
+        timing = f"{exec_ms:.3f} ms" if exec_ms is not None else "n/a"
+        print(f"\n{label}  [{timing}]")
+        for line in lines:
+            print(f"   {line}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync lookup plans before/after lookup indexes")
+    parser.add_argument('--after', action='store_true', help="Only show plans with the current indexes")
+    args = parser.parse_args()
+
+    if not SUPABASE_URL or not SUPABASE_PW:
+        print("!! Error: SUPABASE_URL and SUPABASE_PW are required")
+        sys.exit(1)
+
+    conn = connect()
+    try:
+        params = sample_params(conn.cursor())
+        conn.rollback()
+
+        after = run_plans(conn, params, before=False)
+
+        if not args.after:
+            before = run_plans(conn, params, before=True)
+            print_results("BEFORE (new indexes dropped in a rolled-back transaction)", before)
+
+        print_results("AFTER (current indexes)", after)
+
+        if not args.after:
+            print("\n=== Summary (execution ms: before -> after) ===")
+            for label in after:
+                before_ms = before[label][1]
+                after_ms = after[label][1]
+                if before_ms is not None and after_ms is not None:
+                    print(f"   {before_ms:9.3f} -> {after_ms:9.3f}  {label}")
+    finally:
+        conn.close()
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,16 @@
 """
 Check recent sync logs to see if cron jobs are running and what they're doing.
+
+    python scripts/check_sync_logs.py                 # recent runs and time entries
+    python scripts/check_sync_logs.py --chart         # run durations by phase
+    python scripts/check_sync_logs.py --chart --days 30 --source clockify
+    python scripts/check_sync_logs.py --analytics --days 30   # success rate, percentiles, anomalies
 """
 
 from supabase import create_client
 import os
-from datetime import datetime, timedelta
+import argparse
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -57,9 +63,51 @@ def check_sync_logs():
         
         if log.get('error_message'):
             print(f"   Error: {log['error_message']}")
+
+        if status == 'running':
+            print_progress(log)
+
+        checkpoint = (log.get('progress') or {}).get('checkpoint')
+        if checkpoint and status != 'success':
+            print_checkpoint(checkpoint)
         
         print()
 
+# A running sync heartbeats at least every 15 seconds while it makes progress
+STALE_HEARTBEAT_MINUTES = 10
+
+def print_progress(log):
+    """Progress of a running sync from its last heartbeat"""
+    progress = log.get('progress') or {}
+
+    if log.get('heartbeat_at'):
+        heartbeat = datetime.fromisoformat(log['heartbeat_at'].replace('Z', '+00:00'))
+        age = datetime.now(timezone.utc) - heartbeat
+        stale = age > timedelta(minutes=STALE_HEARTBEAT_MINUTES)
+        print(f"   Last heartbeat: {int(age.total_seconds())}s ago{'  ⚠️  STALE - stuck or killed?' if stale else ''}")
+
+    if 'users_total' in progress:
+        current = f" (now: {progress['current_user']})" if progress.get('current_user') else ''
+        print(f"   Users: {progress.get('users_done', 0)}/{progress['users_total']}{current}")
+    if 'boards_total' in progress:
+        print(f"   Boards: {progress.get('boards_done', 0)}/{progress['boards_total']}")
+    if progress.get('pages_fetched'):
+        print(f"   Pages fetched: {progress['pages_fetched']}")
+    if progress.get('rows_written'):
+        rate = f" ({progress['rows_per_second']} rows/s)" if progress.get('rows_per_second') else ''
+        print(f"   Rows written: {progress['rows_written']}{rate}")
+    if progress.get('eta_seconds') is not None:
+        print(f"   Estimated time left: {progress['eta_seconds'] / 60:.1f} min")
+
+def print_checkpoint(checkpoint):
+    """Where a Clockify run had got to (sync_checkpoint), for runs that may be resumed"""
+    current = checkpoint.get('current')
+    at_page = f", next page {current['next_page']} of the current user" if current else ''
+    print(f"   Checkpoint: {len(checkpoint.get('users_done', []))} users done{at_page}, "
+          f"window {checkpoint['window']['start']} to {checkpoint['window']['end']}")
+    if checkpoint.get('resumed_from'):
+        print(f"   Resumed from: {checkpoint['resumed_from']}")
+
 def check_recent_time_entries():
     """Check when recent time entries were created/updated."""
     
@@ -79,7 +127,7 @@ def check_recent_time_entries():
         print("No recent time entries found")
         return
     
-    print(f"Last 20 entries created/updated:\n")
+    print("Last 20 entries created/updated:\n")
     
     for entry in response.data:
         created = datetime.fromisoformat(entry['created_at'].replace('Z', '+00:00'))
@@ -90,7 +138,177 @@ def check_recent_time_entries():
         print(f"  Client: {client_name} | {sprint_status} | Hours: {entry['hours']}")
         print()
 
+# One character per phase in --chart bars; unknown phases use '#'
+PHASE_SYMBOLS = {
+    'fetch_users': 'u',
+    'fetch_projects': 'p',
+    'map_projects': 'm',
+    'map_users': 'e',
+    'fetch_entries': 'f',
+    'assign_sprints': 'a',
+    'write': 'w',
+    'ingest': 'i',
+    'refresh_rollup': 'r',
+    'fetch_board': 'b',
+    'parse_clients': 'c',
+    'write_clients': 'C',
+    'parse_sprints': 's',
+    'write_sprints': 'S',
+}
+
+CHART_WIDTH = 50
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+def chart_sync_runs(days=7, source=None):
+    """Draw run durations split by phase, from sync_logs.metrics"""
+
+    print(f"\n=== Sync Run Timing (Last {days} Days) ===\n")
+
+    since = (datetime.now() - timedelta(days=days)).isoformat()
+
+    query = supabase.table('sync_logs') \
+        .select('source, status, sync_start, sync_end, records_synced, metrics, created_at') \
+        .gte('created_at', since) \
+        .not_.is_('metrics', 'null') \
+        .order('created_at')
+    if source:
+        query = query.eq('source', source)
+    response = query.execute()
+
+    runs = response.data or []
+    if not runs:
+        print("No sync runs with metrics found (metrics are recorded from add_sync_logs_metrics.sql on)")
+        return
+
+    longest = max(run['metrics'].get('duration_seconds') or 0 for run in runs) or 1
+    used_phases = set()
+
+    for run in runs:
+        metrics = run['metrics']
+        duration = metrics.get('duration_seconds') or 0
+        started = datetime.fromisoformat(run['sync_start'].replace('Z', '+00:00'))
+
+        # Each phase gets a share of the bar proportional to its time; the rest is '.'
+        bar = ''
+        for name, seconds in sorted(metrics.get('phases', {}).items(), key=lambda kv: -kv[1]):
+            width = round(seconds / longest * CHART_WIDTH)
+            if width:
+                bar += PHASE_SYMBOLS.get(name, '#') * width
+                used_phases.add(name)
+        total_width = round(duration / longest * CHART_WIDTH)
+        bar = bar[:total_width].ljust(total_width, '.')
+
+        icon = "✅" if run['status'] == 'success' else ("🏃" if run['status'] == 'running' else "❌")
+        print(f"{icon} {started.strftime('%m-%d %H:%M')} {run['source']:<9} {duration:8.1f}s |{bar:<{CHART_WIDTH}}|"
+              f" {run.get('records_synced') or 0} rec,"
+              f" {metrics.get('api_calls', 0)} api ({format_bytes(metrics.get('api_bytes', 0))}),"
+              f" {metrics.get('db_calls', 0)} db")
+
+    print("\nLegend: " + ", ".join(
+        f"{PHASE_SYMBOLS.get(name, '#')}={name}" for name in sorted(used_phases)
+    ) + ", .=other")
+
+SPARK_CHARS = '▁▂▃▄▅▆▇█'
+
+def sparkline(values):
+    """One character per value, scaled between the smallest and largest; gaps for None"""
+    known = [v for v in values if v is not None]
+    if not known:
+        return ''
+    low, high = min(known), max(known)
+    span = (high - low) or 1
+    return ''.join(
+        ' ' if v is None else SPARK_CHARS[round((v - low) / span * (len(SPARK_CHARS) - 1))]
+        for v in values
+    )
+
+def format_duration(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 120:
+        return f"{seconds:.0f}s"
+    if seconds < 7200:
+        return f"{seconds / 60:.1f}m"
+    if seconds < 172800:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+def analyze_sync_runs(days=30, source=None):
+    """Per-source run statistics and anomalous runs, from the sync_run_analytics RPC"""
+
+    print(f"\n=== Sync Run Analytics (Last {days} Days) ===\n")
+
+    # One aggregate query server-side (database/migrations/add_sync_run_analytics.sql)
+    response = supabase.rpc('sync_run_analytics', {
+        'p_days': days,
+        'p_source': source
+    }).execute()
+    analytics = response.data or {}
+
+    sources = analytics.get('sources') or []
+    if not sources:
+        print("No sync runs found")
+        return
+
+    for stats in sources:
+        success_rate = stats.get('success_rate')
+        icon = "✅" if success_rate == 100 else ("⚠️ " if success_rate and success_rate >= 80 else "❌")
+
+        print(f"{icon} {stats['source'].upper()}")
+        print(f"   Runs: {stats['runs']} ({stats['successes']} ok, {stats['errors']} failed, {stats['running']} running)"
+              f" - success rate {success_rate if success_rate is not None else '-'}%")
+        print(f"   Duration: p50 {format_duration(stats.get('p50_duration_seconds'))},"
+              f" p95 {format_duration(stats.get('p95_duration_seconds'))},"
+              f" max {format_duration(stats.get('max_duration_seconds'))}")
+
+        if stats.get('avg_records_per_second') is not None:
+            trend = stats.get('records_per_second_trend')
+            trend_text = f", trend {trend:+.2f}/day" if trend is not None else ''
+            daily = stats.get('daily') or []
+            spark = sparkline([day.get('records_per_second') for day in daily])
+            print(f"   Records/s: avg {stats['avg_records_per_second']}{trend_text}  {spark}")
+
+        if stats.get('seconds_since_success') is not None:
+            print(f"   Last success: {format_duration(stats['seconds_since_success'])} ago")
+        else:
+            print("   Last success: never")
+        print()
+
+    anomalies = analytics.get('anomalies') or []
+    if not anomalies:
+        print("No anomalous runs (vs. each source's trailing baseline)")
+        return
+
+    print(f"⚠️  {len(anomalies)} anomalous run(s) vs. trailing baseline:\n")
+    for run in anomalies:
+        created = datetime.fromisoformat(run['created_at'].replace('Z', '+00:00'))
+        reasons = []
+        if run.get('slow'):
+            reasons.append(f"duration {format_duration(run['duration_seconds'])}"
+                           f" vs {format_duration(run['baseline_duration_seconds'])}")
+        if run.get('low_throughput'):
+            reasons.append(f"{run['records_per_second']} rec/s vs {run['baseline_records_per_second']}")
+        print(f"   {created.strftime('%Y-%m-%d %H:%M')} {run['source']:<9} {'; '.join(reasons)}")
+
 if __name__ == '__main__':
-    check_sync_logs()
-    check_recent_time_entries()
+    parser = argparse.ArgumentParser(description='Check recent sync runs')
+    parser.add_argument('--chart', action='store_true', help='Chart run durations by phase')
+    parser.add_argument('--analytics', action='store_true',
+                        help='Success rate, duration percentiles, throughput trend and anomalous runs per source')
+    parser.add_argument('--days', type=int, default=7, help='Days of history for --chart/--analytics (default: 7)')
+    parser.add_argument('--source', choices=['clockify', 'monday'], help='Only show one source')
+    args = parser.parse_args()
+
+    if args.analytics:
+        analyze_sync_runs(args.days, args.source)
+    elif args.chart:
+        chart_sync_runs(args.days, args.source)
+    else:
+        check_sync_logs()
+        check_recent_time_entries()
     print("✅ Check complete!\n")
@@ -0,0 +1,161 @@
+"""
+Warm in-memory copies of the reference tables the syncs look things up in, for
+long-running processes (sync_daemon.py).
+
+While a WarmCache is enabled, the lookups in the sync modules read it instead
+of querying Supabase per user, project, client or person:
+    users              map_clockify_user_to_internal, map_monday_person_to_user
+    clients            map_project_to_client, get_client_sprint_data
+    sprints            get_client_sprint_data
+    clockify_projects  load_stored_project_mappings
+
+Tables are loaded on first use and kept until their change version moves
+(get_sync_cache_versions RPC, database/migrations/add_sync_cache_versions.sql).
+check_versions() is called before each run. One-off runs (cron, CLI) never
+enable the cache and query the database as before, unless they're given --mirror:
+sync_mirror.MirrorCache loads the same tables from a local SQLite mirror and
+also answers time_entry_index() lookups.
+"""
+
+import threading
+from collections import Counter
+
+from sync_clients import get_supabase
+
+# PostgREST returns at most this many rows per request
+PAGE_SIZE = 1000
+
+TABLE_COLUMNS = {
+    'users': 'id, email, monday_person_id',
+    'clients': 'id, name, campaign_start_date',
+    'sprints': 'id, client_id, name, start_date, end_date, sprint_number',
+    'clockify_projects': 'clockify_id, client_id',
+}
+
+_active_cache = None
+
+def active_cache():
+    """The enabled WarmCache, or None (lookups go to the database)"""
+    return _active_cache
+
+def enable_cache(cache=None):
+    """Make the lookups read cache (a new WarmCache if none is given and none is enabled)"""
+    global _active_cache
+    if cache is not None:
+        _active_cache = cache
+    elif _active_cache is None:
+        _active_cache = WarmCache()
+    return _active_cache
+
+def disable_cache():
+    global _active_cache
+    _active_cache = None
+
+def fetch_all_rows(table, columns, order=('id',)):
+    """Every row of a table, paged past PostgREST's row limit (order must be unique for stable pages)"""
+    rows = []
+    while True:
+        query = get_supabase().table(table).select(columns)
+        for column in order:
+            query = query.order(column)
+        page = query.range(len(rows), len(rows) + PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+
+class WarmCache:
+    """Reference tables held in memory and reloaded when their version changes"""
+
+    def __init__(self):
+        self.versions = {}
+        self.loads = Counter()
+        self.invalidations = Counter()
+        self._tables = {}
+        self._lock = threading.Lock()
+
+        # Projects and project -> client map last written to clockify_projects (build_project_client_map)
+        self.stored_project_map = None
+
+    def check_versions(self):
+        """Drop tables whose version moved since they were loaded; returns their names"""
+        versions = get_supabase().rpc('get_sync_cache_versions').execute().data or {}
+
+        changed = set()
+        with self._lock:
+            for table in TABLE_COLUMNS:
+                if versions.get(table) != self.versions.get(table):
+                    changed.add(table)
+                    if table in self._tables:
+                        self.invalidations[table] += 1
+                    self._tables.pop(table, None)
+            self.versions = versions
+        return changed
+
+    def _table(self, name):
+        with self._lock:
+            if name not in self._tables:
+                self._tables[name] = self._index(name, self._fetch(name))
+                self.loads[name] += 1
+            return self._tables[name]
+
+    @classmethod
+    def from_rows(cls, rows_by_table):
+        """A cache holding the given rows (load_rows() of another cache) instead of fetching them"""
+        cache = cls()
+        cache._tables = {name: cls._index(name, rows) for name, rows in rows_by_table.items()}
+        return cache
+
+    def load_rows(self):
+        """Current rows of every reference table, to hand to from_rows() in another process"""
+        return {name: self._fetch(name) for name in TABLE_COLUMNS}
+
+    def _fetch(self, name):
+        order = ('start_date', 'id') if name == 'sprints' else ('id',)
+        return fetch_all_rows(name, TABLE_COLUMNS[name], order)
+
+    @staticmethod
+    def _index(name, rows):
+        if name == 'users':
+            return {
+                'by_email': {u['email'].lower(): u['id'] for u in rows if u.get('email')},
+                'by_monday_id': {str(u['monday_person_id']): u['id'] for u in rows if u.get('monday_person_id')},
+            }
+        if name == 'clients':
+            return {'rows': rows, 'by_id': {c['id']: c for c in rows}}
+        if name == 'sprints':
+            by_client = {}
+            for sprint in rows:
+                by_client.setdefault(sprint['client_id'], []).append(sprint)
+            return {'by_client': by_client}
+        return {'mappings': {p['clockify_id']: p['client_id'] for p in rows if p.get('client_id')}}
+
+    def user_id_for_email(self, email):
+        return self._table('users')['by_email'].get(email.lower())
+
+    def user_id_for_monday_person(self, monday_person_id):
+        return self._table('users')['by_monday_id'].get(str(monday_person_id))
+
+    def clients(self):
+        return self._table('clients')['rows']
+
+    def client(self, client_id):
+        return self._table('clients')['by_id'].get(client_id)
+
+    def client_sprints(self, client_id):
+        """The client's sprints, ordered by start_date"""
+        return self._table('sprints')['by_client'].get(client_id, [])
+
+    def stored_project_mappings(self):
+        return dict(self._table('clockify_projects')['mappings'])
+
+    def time_entry_index(self, clockify_ids):
+        """Stored client_id, sprint_id and fingerprint per time entry; None when not kept (only the mirror has them)"""
+        return None
+
+    def status(self):
+        return {
+            'versions': self.versions,
+            'loaded': sorted(self._tables),
+            'loads': dict(self.loads),
+            'invalidations': dict(self.invalidations),
+        }
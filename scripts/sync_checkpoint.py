@@ -0,0 +1,161 @@
+"""
+Resume points for the Clockify sync, so an interrupted backfill can carry on
+where it stopped:
+
+    python scripts/sync_clockify_data.py --days 365 --resume
+
+While it runs, the sync saves a checkpoint into its sync_logs row's progress
+(progress.checkpoint) after every page of entries it has written and after
+every user it has finished:
+    {"mode": "client", "days_back": 365,
+     "window": {"start": "2025-10-19", "end": "2026-10-19"},
+     "users_done": ["<clockify user id>", ...],
+     "current": {"user_id": "<clockify user id>", "next_page": 4},
+     "stats": {"synced": 18200, "unchanged": 0, "skipped": 31, "skip_reasons": {...},
+               "touched_dates": ["2025-10-20", ...]}}
+
+With --resume, the run looks at the latest Clockify run in sync_logs. If that run
+failed, or is still 'running' with a stale heartbeat (killed), and saved a
+checkpoint for the same mode and --days within RESUME_MAX_AGE_HOURS, the new
+run reuses its date window and counters, skips the users it finished, and
+restarts the user it was on at the saved page. Otherwise it starts from the
+beginning, so cron jobs can always pass --resume.
+
+In --server-side mode entries are buffered across users, so a user only
+counts as done once the batch holding their entries has been ingested; there
+are no page checkpoints.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from sync_metrics import save_checkpoint
+from sync_logging import get_logger
+
+log = get_logger('clockify')
+
+# A 'running' row whose heartbeat is older than this was killed (as in check_sync_logs.py)
+STALE_HEARTBEAT_MINUTES = 10
+
+# Checkpoints older than this aren't resumed; their window is too far behind
+RESUME_MAX_AGE_HOURS = 24
+
+class SyncCheckpoint:
+    """Progress of one Clockify run through its users and pages"""
+
+    def __init__(self, mode, days_back, start_date, end_date, users_done=(), current=None, resumed_from=None):
+        self.mode = mode
+        self.days_back = days_back
+        self.start_date = start_date
+        self.end_date = end_date
+        self.users_done = set(users_done)
+        self.current = current
+        self.resumed_from = resumed_from
+
+    def first_page(self, user_id):
+        """Page to start this user at (after the last page written before the interruption)"""
+        if self.current and self.current['user_id'] == user_id:
+            return self.current['next_page']
+        return 1
+
+    def page_done(self, user_id, page, stats):
+        self.current = {'user_id': user_id, 'next_page': page + 1}
+        self.save(stats)
+
+    def user_done(self, user_id, stats):
+        self.users_done.add(user_id)
+        self.current = None
+        self.save(stats)
+
+    def to_dict(self, stats):
+        return {
+            'mode': self.mode,
+            'days_back': self.days_back,
+            'window': {'start': self.start_date.date().isoformat(), 'end': self.end_date.date().isoformat()},
+            'users_done': sorted(self.users_done),
+            'current': self.current,
+            'resumed_from': self.resumed_from,
+            'stats': dict(stats, touched_dates=sorted(stats['touched_dates'])),
+        }
+
+    def save(self, stats):
+        save_checkpoint(self.to_dict(stats))
+
+def start_checkpoint(mode, days_back, stats, client=None):
+    """
+    Checkpoint for a new run, called before its sync_logs row is created. With a
+    client (--resume), continue the latest resumable run's checkpoint if there is
+    one: its counters are added to stats.
+    """
+    if client is not None:
+        row = find_resumable_run(client, mode, days_back)
+        if row:
+            log_id, saved = row['id'], row['progress']['checkpoint']
+            if row['status'] == 'running':
+                # Killed without finalizing its row; close it so it doesn't show as running forever
+                try:
+                    client.table('sync_logs').update({
+                        'status': 'error',
+                        'error_message': 'Interrupted (heartbeat stopped); resumed by a later run',
+                        'sync_end': row.get('heartbeat_at'),
+                    }).eq('id', log_id).execute()
+                except Exception as e:
+                    log.warning(f"Could not close interrupted run {log_id}: {e}", log_id=log_id, error=str(e))
+            for name in ('synced', 'unchanged', 'skipped', 'orphaned', 'deleted'):
+                stats[name] += saved['stats'].get(name, 0)
+            for reason, count in saved['stats'].get('skip_reasons', {}).items():
+                stats['skip_reasons'][reason] = stats['skip_reasons'].get(reason, 0) + count
+            stats['touched_dates'].update(saved['stats'].get('touched_dates', []))
+
+            checkpoint = SyncCheckpoint(
+                mode, days_back,
+                datetime.combine(date.fromisoformat(saved['window']['start']), datetime.min.time(), timezone.utc),
+                datetime.combine(date.fromisoformat(saved['window']['end']), datetime.min.time(), timezone.utc),
+                users_done=saved.get('users_done', []), current=saved.get('current'), resumed_from=log_id
+            )
+            log.info(f">> Resuming run {log_id}: {len(checkpoint.users_done)} users done, "
+                     f"window {saved['window']['start']} to {saved['window']['end']}",
+                     resumed_from=log_id, users_done=len(checkpoint.users_done), current=checkpoint.current)
+            return checkpoint
+
+    end_date = datetime.now(timezone.utc)
+    return SyncCheckpoint(mode, days_back, end_date - timedelta(days=days_back), end_date)
+
+def find_resumable_run(client, mode, days_back):
+    """The latest Clockify sync_logs row if its checkpoint can be resumed, else None"""
+    try:
+        rows = client.table('sync_logs') \
+            .select('id, status, progress, heartbeat_at, created_at') \
+            .eq('source', 'clockify') \
+            .order('created_at', desc=True) \
+            .limit(1) \
+            .execute().data or []
+    except Exception as e:
+        log.warning(f"Could not look up a checkpoint to resume, starting from the beginning: {e}", error=str(e))
+        return None
+
+    if not rows:
+        return None
+    row = rows[0]
+    checkpoint = (row.get('progress') or {}).get('checkpoint')
+    if not checkpoint:
+        return None
+
+    now = datetime.now(timezone.utc)
+    if row['status'] == 'running':
+        heartbeat = row.get('heartbeat_at')
+        if heartbeat and now - datetime.fromisoformat(heartbeat) < timedelta(minutes=STALE_HEARTBEAT_MINUTES):
+            log.warning(f"Clockify run {row['id']} is still running; not resuming it", log_id=row['id'])
+            return None
+    elif row['status'] != 'error':
+        return None
+
+    if checkpoint.get('mode') != mode or checkpoint.get('days_back') != days_back:
+        log.info(f">> Checkpoint of run {row['id']} is for a different mode or --days; starting from the beginning",
+                 log_id=row['id'])
+        return None
+    if now - datetime.fromisoformat(row['created_at']) > timedelta(hours=RESUME_MAX_AGE_HOURS):
+        log.info(f">> Checkpoint of run {row['id']} is older than {RESUME_MAX_AGE_HOURS}h; starting from the beginning",
+                 log_id=row['id'])
+        return None
+
+    return row
@@ -0,0 +1,71 @@
+"""
+Supabase client and HTTP session shared by the sync scripts, created on first use.
+
+Importing a sync module (for its parsing/mapping helpers, from the debug scripts or
+the benchmarks) doesn't import supabase-py or requests, load .env, connect, or
+require the Supabase environment variables. The first get_supabase() / get_http()
+call does; entry points call load_env() (through the sync modules' load_settings())
+before reading their own settings.
+
+Tests and benchmarks can put their own client in place before running a sync:
+
+    set_supabase(local_client)
+    set_http(stub_session)
+    set_supabase(None)   # back to creating from SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY
+"""
+
+import os
+import threading
+
+_supabase = None
+_http = None
+_env_loaded = False
+_lock = threading.Lock()
+
+def load_env():
+    """Load .env into the environment once; variables that are already set win"""
+    global _env_loaded
+
+    if not _env_loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
+
+def get_supabase():
+    """The shared Supabase client (service role key, bypasses RLS)"""
+    global _supabase
+
+    if _supabase is None:
+        with _lock:
+            if _supabase is None:
+                load_env()
+                url = os.getenv('SUPABASE_URL')
+                key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+                if not url or not key:
+                    raise RuntimeError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+
+                from supabase import create_client
+                _supabase = create_client(url, key)
+    return _supabase
+
+def set_supabase(client):
+    """Use client for all later get_supabase() calls; None resets to lazy creation"""
+    global _supabase
+    _supabase = client
+
+def get_http():
+    """The shared requests.Session (connection reuse; sync_metrics counts calls through it)"""
+    global _http
+
+    if _http is None:
+        with _lock:
+            if _http is None:
+                load_env()
+                import requests
+                _http = requests.Session()
+    return _http
+
+def set_http(session):
+    """Use session for all later get_http() calls; None resets to lazy creation"""
+    global _http
+    _http = session
@@ -0,0 +1,301 @@
+"""
+asyncio engine for the Clockify sync:
+
+    python scripts/sync_clockify_data.py --async [--concurrency 8] [--rate-limit 20]
+
+It runs the same steps with the same helpers as sync_time_entries() in client-side
+mapping mode, so it writes identical rows and reports identical statistics. Only
+the scheduling differs:
+- Time entry pages are fetched with httpx.AsyncClient for up to `concurrency`
+  users at once. At most `concurrency` requests are in flight, under a token-bucket
+  rate limit (Clockify allows 50 requests/s per workspace; the default stays well
+  under that). A 429 is retried after Retry-After.
+- Each user's entries are shaped and written by the existing batch functions
+  (build rows, assign_sprints, upsert_time_entries) in worker threads, at most
+  `write_concurrency` users at a time, while other users' pages are still
+  downloading.
+
+Each user's counters are collected separately and merged, so the totals don't
+depend on the order users finish in. Phase timings add up the time of concurrent
+tasks, so their sum can exceed the run's duration. --server-side mode has no async
+variant; it is one RPC per 5000 entries already.
+
+With --clients, only the given clients' projects are synced: their Clockify
+project ids come from the project -> client map the run builds (and stores in
+clockify_projects), and each user's entries are fetched once per project with
+Clockify's project filter, all users concurrently. One client's history takes
+seconds instead of a full sync:
+
+    python scripts/sync_clockify_data.py --clients "Grace Loves Lace" Sovereign [--days 365]
+"""
+
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+import sync_clockify_data as clockify
+from sync_clients import get_supabase, get_http
+from sync_metrics import start_run, finish_run, phase, update_progress, increment_progress, record_api_response
+from sync_exporter import export_run
+from sync_logging import get_logger, reset_diagnostic_counts
+
+log = get_logger('clockify')
+
+# Requests in flight, and users being fetched/written at once
+DEFAULT_CONCURRENCY = 8
+
+# Clockify requests per second
+DEFAULT_RATE_LIMIT = 20
+
+# Users whose entries are being written to Supabase at once
+DEFAULT_WRITE_CONCURRENCY = 4
+
+# Retries of a rate-limited (429) request
+MAX_RETRIES = 3
+
+class RateLimiter:
+    """Token bucket: `rate` requests per second on average, bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class ClockifyAsyncClient:
+    """httpx.AsyncClient with the global concurrency limit and rate limiter"""
+
+    def __init__(self, concurrency, rate_limit):
+        self.http = httpx.AsyncClient(
+            headers={'X-Api-Key': clockify.CLOCKIFY_API_KEY},
+            timeout=60,
+            limits=httpx.Limits(max_connections=concurrency)
+        )
+        self.slots = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+
+    async def get(self, url, params=None):
+        for attempt in range(MAX_RETRIES + 1):
+            if self.limiter:
+                await self.limiter.acquire()
+            async with self.slots:
+                response = await self.http.get(url, params=params)
+            record_api_response(response)
+
+            if response.status_code != 429 or attempt == MAX_RETRIES:
+                return response
+
+            try:
+                delay = float(response.headers.get('Retry-After', ''))
+            except ValueError:
+                delay = 2 ** attempt
+            log.warning(f"Clockify rate limit hit, retrying in {delay:.0f}s", url=url, attempt=attempt + 1)
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+async def fetch_clockify_time_entries(api, user_id, start_date, end_date, project_id=None):
+    """
+    fetch_clockify_time_entries() over the async client; same paging, limits and warnings.
+    project_id limits it to one Clockify project's entries (Clockify's project filter).
+    """
+    start_str = start_date.strftime('%Y-%m-%dT00:00:00Z')
+    end_str = end_date.strftime('%Y-%m-%dT23:59:59Z')
+    url = f'{clockify.CLOCKIFY_API_URL}/workspaces/{clockify.CLOCKIFY_WORKSPACE_ID}/user/{user_id}/time-entries'
+
+    all_entries = []
+    page = 1
+    page_size = 1000
+
+    while True:
+        params = {
+            'start': start_str,
+            'end': end_str,
+            'page': page,
+            'page-size': page_size,
+            'hydrated': 'true'
+        }
+        if project_id:
+            params['project'] = project_id
+        response = await api.get(url, params=params)
+
+        if response.status_code != 200:
+            log.warning(f"Error fetching time entries for user {user_id} page {page}: {response.status_code}",
+                        user_id=user_id, page=page, status=response.status_code)
+            break
+
+        entries = response.json()
+
+        if not entries:
+            break
+
+        all_entries.extend(entries)
+        increment_progress(pages_fetched=1, entries_fetched=len(entries))
+        page += 1
+
+        if page > 100:
+            log.warning(f"Reached page limit for user {user_id}", user_id=user_id)
+            break
+
+    return all_entries
+
+async def sync_user(api, clockify_user, start_date, end_date, project_names, project_client_map, write_slots,
+                    project_ids=None):
+    """
+    Fetch and write one user's entries (only those of project_ids, if given, one
+    request per project); returns the user's counters, or None if skipped
+    """
+    user_email = clockify_user.get('email')
+    user_name = clockify_user.get('name', 'Unknown')
+
+    if not user_email:
+        return None
+
+    with phase('map_users'):
+        internal_user_id = await asyncio.to_thread(clockify.map_clockify_user_to_internal, user_email)
+
+    if internal_user_id is None:
+        log.info(f"Skipping user {user_name} ({user_email}) - not found in system", user=user_name, email=user_email)
+        return None
+
+    log.info(f"\nProcessing user: {user_name}", user=user_name)
+
+    with phase('fetch_entries'):
+        if project_ids:
+            per_project = await asyncio.gather(*(
+                fetch_clockify_time_entries(api, clockify_user['id'], start_date, end_date, project_id)
+                for project_id in project_ids
+            ))
+            time_entries = [entry for entries in per_project for entry in entries]
+        else:
+            time_entries = await fetch_clockify_time_entries(api, clockify_user['id'], start_date, end_date)
+
+    log.info(f"   Found {len(time_entries)} time entries", user=user_name, entries=len(time_entries))
+
+    stats = clockify.new_sync_stats()
+    async with write_slots:
+        await asyncio.to_thread(
+            clockify.process_time_entries, time_entries, internal_user_id, project_names, project_client_map, stats
+        )
+
+    log.info(f"   >> Synced {stats['synced']} entries (skipped {stats['skipped']})",
+             user=user_name, synced=stats['synced'], skipped=stats['skipped'])
+    return stats
+
+async def sync_time_entries_async(days_back=365, concurrency=DEFAULT_CONCURRENCY, rate_limit=DEFAULT_RATE_LIMIT,
+                                  write_concurrency=DEFAULT_WRITE_CONCURRENCY, client_ids=None):
+    """
+    sync_time_entries() with concurrent fetches and writes.
+
+    client_ids limits the run to those clients' Clockify projects (--clients): every
+    user's entries are fetched with Clockify's project filter. Such targeted runs
+    don't write a sync_logs row, so they don't skew the run history.
+    """
+    targeted = client_ids is not None
+    mode = f"{len(client_ids)} clients" if targeted else "all entries"
+    log.info(f">> Starting Clockify sync (last {days_back} days, async, {mode}, {concurrency} concurrent requests)...",
+             days_back=days_back, mode='async', clients=client_ids, concurrency=concurrency, rate_limit=rate_limit)
+
+    reset_diagnostic_counts()
+    metrics = start_run('clockify', get_supabase(), get_http(), log_running=not targeted)
+    stats = clockify.new_sync_stats()
+    api = None
+
+    try:
+        log.info(">> Fetching Clockify users...")
+        with phase('fetch_users'):
+            clockify_users = await asyncio.to_thread(clockify.fetch_clockify_users)
+        log.info(f"   Found {len(clockify_users)} users", users=len(clockify_users))
+
+        log.info(">> Fetching Clockify projects...")
+        with phase('fetch_projects'):
+            clockify_projects = await asyncio.to_thread(clockify.fetch_clockify_projects)
+        log.info(f"   Found {len(clockify_projects)} projects", projects=len(clockify_projects))
+
+        project_names = {project['id']: project['name'] for project in clockify_projects}
+        with phase('map_projects'):
+            project_client_map = await asyncio.to_thread(clockify.build_project_client_map, clockify_projects)
+
+        project_ids = None
+        if targeted:
+            project_ids = sorted(pid for pid, client_id in project_client_map.items() if client_id in client_ids)
+            log.info(f"   {len(project_ids)} Clockify projects map to the clients: "
+                     + ", ".join(project_names[pid] for pid in project_ids), projects=project_ids)
+            if not project_ids:
+                raise ValueError("No Clockify project maps to the given clients")
+
+        end_date = datetime.now(timezone.utc)
+        start_date = end_date - timedelta(days=days_back)
+
+        api = ClockifyAsyncClient(concurrency, rate_limit)
+        user_slots = asyncio.Semaphore(concurrency)
+        write_slots = asyncio.Semaphore(write_concurrency)
+        users_done = 0
+
+        async def run_user(clockify_user):
+            nonlocal users_done
+            async with user_slots:
+                update_progress(current_user=clockify_user.get('name', 'Unknown'))
+                user_stats = await sync_user(
+                    api, clockify_user, start_date, end_date, project_names, project_client_map, write_slots,
+                    project_ids
+                )
+            # Merged as each user finishes, so a failed run still reports what it wrote
+            if user_stats:
+                clockify.merge_sync_stats(stats, user_stats)
+            users_done += 1
+            update_progress(users_done=users_done)
+
+        update_progress(users_total=len(clockify_users), users_done=0)
+        await asyncio.gather(*(run_user(user) for user in clockify_users))
+        update_progress(users_done=len(clockify_users), current_user=None)
+
+        if stats['touched_dates']:
+            log.info(f"\n>> Refreshing daily rollup for {len(stats['touched_dates'])} dates...",
+                     dates=len(stats['touched_dates']))
+            with phase('refresh_rollup'):
+                await asyncio.to_thread(clockify.refresh_daily_rollup, stats['touched_dates'])
+
+        finish_run()
+        if not targeted:
+            clockify.log_sync('clockify', 'success', stats['synced'], metrics=metrics)
+            export_run('clockify', 'success', stats['synced'], metrics, stats)
+        clockify.log_sync_summary(stats, metrics)
+
+        return True
+
+    except Exception as e:
+        error_msg = str(e)
+        log.error(f"\nSync failed: {error_msg}", exc_info=True, error=error_msg)
+        # Refresh the rollup for what the finished users wrote; a rerun skips unchanged rows and wouldn't
+        if stats['touched_dates']:
+            await asyncio.to_thread(clockify.refresh_daily_rollup, stats['touched_dates'])
+        finish_run()
+        if not targeted:
+            clockify.log_sync('clockify', 'error', stats['synced'], error_msg, metrics=metrics)
+            export_run('clockify', 'error', stats['synced'], metrics)
+        return False
+
+    finally:
+        if api is not None:
+            await api.aclose()
+
+def run_sync_time_entries_async(days_back=365, concurrency=DEFAULT_CONCURRENCY, rate_limit=DEFAULT_RATE_LIMIT,
+                                write_concurrency=DEFAULT_WRITE_CONCURRENCY, client_ids=None):
+    """Blocking entry point for sync_time_entries_async()"""
+    return asyncio.run(sync_time_entries_async(days_back, concurrency, rate_limit, write_concurrency, client_ids))
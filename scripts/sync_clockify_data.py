@@ -5,29 +5,44 @@ This script:
 1. Fetches all time entries from Clockify
 2. Maps Clockify users to internal users by email
 3. Maps Clockify projects to clients
-4. Assigns time entries to sprints based on entry date
-5. Upserts to Supabase time_entries table
-6. Logs sync status
-"""
+4. Assigns time entries to sprints based on entry date (assign_sprints RPC, per batch)
+5. Upserts to Supabase time_entries table in batches
+6. Refreshes the time_entries_daily rollup for the dates it wrote
+7. Logs sync status
 
-import os
-import requests
-from datetime import datetime, timedelta, timezone
-from supabase import create_client, Client
-from dotenv import load_dotenv
+With --server-side, steps 2-6 run in the database: raw entries are sent in
+large batches to the ingest_clockify_entries RPC.
 
-# Load environment variables
-load_dotenv()
+With --reconcile, stored entries of each user's window that Clockify no longer
+returns (deleted there) are reported, archived or deleted after the user's
+entries were fetched completely (reconcile_time_entries RPC).
 
-# Configuration
+With --clients NAME_OR_ID [...], only those clients' Clockify projects are
+synced, all users at once (sync_clockify_async); see resolve_clients().
+"""
+
+import os
+import logging
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from sync_clients import get_supabase, get_http, load_env
+from sync_cache import active_cache, disable_cache, fetch_all_rows
+from sync_checkpoint import start_checkpoint
+from sync_mirror import time_entry_fingerprint, enable_mirror, add_mirror_argument, mirror_path_from_args
+from sync_metrics import (
+    start_run, finish_run, phase, update_progress, increment_progress, write_sync_log
+)
+from sync_exporter import export_run
+from sync_logging import (
+    get_logger, add_logging_arguments, configure_from_args, diagnostic_counts, reset_diagnostic_counts
+)
+
+# Configuration (read again by load_settings() once .env is loaded)
 CLOCKIFY_API_KEY = os.getenv('CLOCKIFY_API_KEY')
 CLOCKIFY_WORKSPACE_ID = os.getenv('CLOCKIFY_WORKSPACE_ID')
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
-# Initialize Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-
 # Clockify API base URL
 CLOCKIFY_API_URL = 'https://api.clockify.me/api/v1'
 
@@ -35,29 +50,48 @@ CLOCKIFY_API_URL = 'https://api.clockify.me/api/v1'
 # Time entries within this many days before Sprint 1 start will be assigned to Sprint 1
 PRE_SPRINT_LOOKBACK_DAYS = 14
 
+# Number of time entries per sprint-assignment RPC and upsert call
+BATCH_SIZE = 200
+
+# Raw entries per ingest_clockify_entries call in --server-side mode
+INGEST_BATCH_SIZE = 5000
+
+# Long-running processes reload Clockify projects this often (ProjectContext)
+PROJECT_CONTEXT_MINUTES = 15
+
+# --reconcile: what happens to stored entries Clockify no longer returns
+RECONCILE_MODES = ('dry-run', 'archive', 'delete')
+# Refuse to remove more than this share of a user's stored entries in one window
+RECONCILE_MAX_FRACTION = 0.5
+
 # Cache for client sprint data to avoid repeated queries
 _client_sprint_cache = {}
 
-def log_sync(source, status, records_synced=0, error_message=None):
-    """Log sync status to sync_logs table"""
-    try:
-        supabase.table('sync_logs').insert({
-            'source': source,
-            'sync_start': datetime.now(timezone.utc).isoformat(),
-            'sync_end': datetime.now(timezone.utc).isoformat(),
-            'status': status,
-            'records_synced': records_synced,
-            'error_message': error_message
-        }).execute()
-    except Exception as e:
-        print(f"Warning: Failed to log sync status: {e}")
+log = get_logger('clockify')
+
+def load_settings():
+    """Load .env and re-read the configuration above; entry points call this before syncing"""
+    global CLOCKIFY_API_KEY, CLOCKIFY_WORKSPACE_ID, SUPABASE_URL, SUPABASE_SERVICE_KEY
+
+    load_env()
+    CLOCKIFY_API_KEY = os.getenv('CLOCKIFY_API_KEY')
+    CLOCKIFY_WORKSPACE_ID = os.getenv('CLOCKIFY_WORKSPACE_ID')
+    SUPABASE_URL = os.getenv('SUPABASE_URL')
+    SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+
+def log_sync(source, status, records_synced=0, error_message=None, metrics=None):
+    """
+    Log sync status to sync_logs table, with timing and call counts if metrics is given.
+    Finalizes the run's 'running' row when start_run() created one.
+    """
+    write_sync_log(get_supabase(), source, status, records_synced, error_message, metrics)
 
 def fetch_clockify_users():
     """Fetch all users from Clockify workspace"""
     headers = {'X-Api-Key': CLOCKIFY_API_KEY}
     url = f'{CLOCKIFY_API_URL}/workspaces/{CLOCKIFY_WORKSPACE_ID}/users'
 
-    response = requests.get(url, headers=headers)
+    response = get_http().get(url, headers=headers)
 
     if response.status_code != 200:
         raise Exception(f"Clockify API error fetching users: {response.status_code} - {response.text}")
@@ -79,7 +113,7 @@ def fetch_clockify_projects():
             'page-size': page_size,
             'archived': 'false'  # Only active projects
         }
-        response = requests.get(url, headers=headers, params=params)
+        response = get_http().get(url, headers=headers, params=params)
 
         if response.status_code != 200:
             raise Exception(f"Clockify API error fetching projects: {response.status_code} - {response.text}")
@@ -97,13 +131,25 @@ def fetch_clockify_projects():
         
         # Safety limit
         if page > 20:
-            print("Warning: Reached page limit for projects")
+            log.warning("Reached page limit for projects")
             break
 
     return all_projects
 
 def fetch_clockify_time_entries(user_id, start_date=None, end_date=None):
     """Fetch time entries for a specific user"""
+    all_entries = []
+    for _, entries in iter_clockify_time_entry_pages(user_id, start_date, end_date):
+        all_entries.extend(entries)
+    return all_entries
+
+def iter_clockify_time_entry_pages(user_id, start_date=None, end_date=None, first_page=1, status=None):
+    """
+    Yield (page number, entries) for a user's time entries, one page of up to 1000 at a time.
+    With a status dict, status['started_at'] is set when the first page is requested and
+    status['complete'] True once the last page was reached (not after a failed request
+    or the page limit), i.e. every entry of the window was seen.
+    """
     headers = {'X-Api-Key': CLOCKIFY_API_KEY}
 
     # Default to last 365 days if no date range specified
@@ -116,9 +162,10 @@ def fetch_clockify_time_entries(user_id, start_date=None, end_date=None):
     start_str = start_date.strftime('%Y-%m-%dT00:00:00Z')
     end_str = end_date.strftime('%Y-%m-%dT23:59:59Z')
 
-    all_entries = []
-    page = 1
+    page = first_page
     page_size = 1000  # Max page size
+    if status is not None:
+        status.update(complete=False, started_at=datetime.now(timezone.utc))
 
     while True:
         url = f'{CLOCKIFY_API_URL}/workspaces/{CLOCKIFY_WORKSPACE_ID}/user/{user_id}/time-entries'
@@ -130,38 +177,44 @@ def fetch_clockify_time_entries(user_id, start_date=None, end_date=None):
             'hydrated': 'true'  # Include full task/project details
         }
 
-        response = requests.get(url, headers=headers, params=params)
+        response = get_http().get(url, headers=headers, params=params)
 
         if response.status_code != 200:
-            print(f"Warning: Error fetching time entries for user {user_id} page {page}: {response.status_code}")
+            log.warning(f"Error fetching time entries for user {user_id} page {page}: {response.status_code}",
+                        user_id=user_id, page=page, status=response.status_code)
             break
 
         entries = response.json()
 
         if not entries:
+            if status is not None:
+                status['complete'] = True
             break  # No more entries
 
-        all_entries.extend(entries)
+        increment_progress(pages_fetched=1, entries_fetched=len(entries))
+        yield page, entries
         page += 1
 
         # Safety limit
         if page > 100:
-            print(f"Warning: Reached page limit for user {user_id}")
+            log.warning(f"Reached page limit for user {user_id}", user_id=user_id)
             break
 
-    return all_entries
-
 def map_clockify_user_to_internal(clockify_email):
     """Map Clockify user email to internal user UUID"""
     if not clockify_email:
         return None
 
+    cache = active_cache()
+    if cache:
+        return cache.user_id_for_email(clockify_email)
+
     try:
-        response = supabase.table('users').select('id').eq('email', clockify_email.lower()).execute()
+        response = get_supabase().table('users').select('id').eq('email', clockify_email.lower()).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]['id']
     except Exception as e:
-        print(f"Warning: Could not map Clockify user {clockify_email}: {e}")
+        log.warning(f"Could not map Clockify user {clockify_email}: {e}", email=clockify_email, error=str(e))
 
     return None
 
@@ -197,21 +250,25 @@ def map_project_to_client(project_name):
     if not project_name:
         return None
 
+    cache = active_cache()
+    if cache:
+        return match_project_to_client(project_name, cache.clients())
+
     try:
         # Check manual mappings first
         manual_client_name = MANUAL_PROJECT_MAPPINGS.get(project_name)
         if manual_client_name:
-            response = supabase.table('clients').select('id').ilike('name', manual_client_name).execute()
+            response = get_supabase().table('clients').select('id').ilike('name', manual_client_name).execute()
             if response.data and len(response.data) > 0:
                 return response.data[0]['id']
 
         # Try exact match first
-        response = supabase.table('clients').select('id, name').ilike('name', project_name).execute()
+        response = get_supabase().table('clients').select('id, name').ilike('name', project_name).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]['id']
 
         # Try partial match (case insensitive)
-        response = supabase.table('clients').select('id, name').execute()
+        response = get_supabase().table('clients').select('id, name').execute()
         if response.data:
             project_lower = project_name.lower()
             project_normalized = normalize_name(project_name)
@@ -229,10 +286,181 @@ def map_project_to_client(project_name):
                     return client['id']
 
     except Exception as e:
-        print(f"Warning: Could not map project '{project_name}': {e}")
+        log.warning(f"Could not map project '{project_name}': {e}", project=project_name, error=str(e))
 
     return None
 
+def match_project_to_client(project_name, clients):
+    """map_project_to_client() against an in-memory list of {id, name} clients"""
+    manual_client_name = MANUAL_PROJECT_MAPPINGS.get(project_name)
+    if manual_client_name:
+        for client in clients:
+            if client['name'].lower() == manual_client_name.lower():
+                return client['id']
+
+    project_lower = project_name.lower()
+    for client in clients:
+        if client['name'].lower() == project_lower:
+            return client['id']
+
+    project_normalized = normalize_name(project_name)
+    for client in clients:
+        client_lower = client['name'].lower()
+        client_normalized = normalize_name(client['name'])
+        if project_lower in client_lower or client_lower in project_lower:
+            return client['id']
+        if project_normalized in client_normalized or client_normalized in project_normalized:
+            return client['id']
+
+    return None
+
+def load_stored_project_mappings():
+    """Load Clockify project -> client mappings already saved in clockify_projects"""
+    cache = active_cache()
+    if cache:
+        return cache.stored_project_mappings()
+
+    try:
+        response = get_supabase().table('clockify_projects') \
+            .select('clockify_id, client_id') \
+            .not_.is_('client_id', 'null') \
+            .execute()
+        return {p['clockify_id']: p['client_id'] for p in response.data or []}
+    except Exception as e:
+        log.warning(f"Could not load stored project mappings: {e}", error=str(e))
+        return {}
+
+def store_project_mappings(clockify_projects, project_client_map):
+    """
+    Save Clockify projects to clockify_projects so the database can resolve
+    project -> client itself (ingest_clockify_entries). Unmapped projects are
+    saved without a client_id so manual mappings on them are left alone.
+    Returns False if the write failed.
+    """
+    mapped = [
+        {'clockify_id': p['id'], 'name': p['name'], 'client_id': project_client_map[p['id']], 'is_active': True}
+        for p in clockify_projects if p['id'] in project_client_map
+    ]
+    unmapped = [
+        {'clockify_id': p['id'], 'name': p['name'], 'is_active': True}
+        for p in clockify_projects if p['id'] not in project_client_map
+    ]
+
+    try:
+        for rows in (mapped, unmapped):
+            if rows:
+                get_supabase().table('clockify_projects').upsert(rows, on_conflict='clockify_id').execute()
+        return True
+    except Exception as e:
+        log.warning(f"Failed to store project mappings: {e}", error=str(e))
+        return False
+
+def build_project_client_map(clockify_projects):
+    """
+    Map Clockify project IDs to client IDs by name, falling back to mappings
+    stored in clockify_projects, and save the result back to clockify_projects
+    """
+    stored_mappings = load_stored_project_mappings()
+
+    project_client_map = {}
+    for project in clockify_projects:
+        client_id = map_project_to_client(project['name']) or stored_mappings.get(project['id'])
+        if client_id:
+            project_client_map[project['id']] = client_id
+            log.diagnostic('project_mapped', "   Mapped project '{project}' to client",
+                           client=(client_id, project['name']), project=project['name'])
+        else:
+            log.diagnostic('project_unmapped', "   Could not map project '{project}' to any client",
+                           client=project['name'], project=project['name'])
+
+    # A warm cache remembers what it last stored; unchanged projects and mappings aren't written again
+    cache = active_cache()
+    stored_key = (tuple((p['id'], p['name']) for p in clockify_projects), tuple(sorted(project_client_map.items())))
+    if cache is None or cache.stored_project_map != stored_key:
+        if store_project_mappings(clockify_projects, project_client_map) and cache:
+            cache.stored_project_map = stored_key
+    return project_client_map
+
+def resolve_clients(names_or_ids):
+    """
+    Client ids for --clients arguments: a client id, or a client name matched
+    exactly, then normalized, then as a normalized substring. Raises ValueError
+    for an argument that matches no client or several.
+    """
+    clients = fetch_all_rows('clients', 'id, name')
+    by_id = {client['id']: client for client in clients}
+
+    client_ids = []
+    for arg in names_or_ids:
+        if arg in by_id:
+            matches = [by_id[arg]]
+        else:
+            wanted = normalize_name(arg)
+            matches = ([c for c in clients if c['name'] == arg]
+                       or [c for c in clients if normalize_name(c['name']) == wanted]
+                       or [c for c in clients if wanted and wanted in normalize_name(c['name'])])
+        if not matches:
+            raise ValueError(f"No client matches '{arg}'")
+        if len(matches) > 1:
+            names = ", ".join(sorted(c['name'] for c in matches))
+            raise ValueError(f"'{arg}' matches several clients ({names}); use the full name or the id")
+        log.info(f"   Client '{arg}' -> {matches[0]['name']} ({matches[0]['id']})",
+                 client=matches[0]['name'], client_id=matches[0]['id'])
+        if matches[0]['id'] not in client_ids:
+            client_ids.append(matches[0]['id'])
+    return client_ids
+
+class ProjectContext:
+    """
+    Clockify project names and project -> client map for long-running processes
+    (sync_jobs.py workers, the webhook receiver). Reloaded every
+    PROJECT_CONTEXT_MINUTES, or sooner when an entry names a project it hasn't seen.
+    """
+
+    def __init__(self):
+        self.project_names = None
+        self.project_client_map = None
+        self.loaded_at = None
+
+    def get(self, project_ids=()):
+        """(project_names, project_client_map), reloaded first if stale or missing any of project_ids"""
+        now = datetime.now(timezone.utc)
+        if self.loaded_at is not None:
+            age = now - self.loaded_at
+            unknown = any(project_id and project_id not in self.project_names for project_id in project_ids)
+            # An unknown project reloads at most once a minute (entries may name deleted projects)
+            if age < timedelta(minutes=PROJECT_CONTEXT_MINUTES) and not (unknown and age > timedelta(minutes=1)):
+                return self.project_names, self.project_client_map
+
+        with phase('fetch_projects'):
+            clockify_projects = fetch_clockify_projects()
+        self.project_names = {project['id']: project['name'] for project in clockify_projects}
+        with phase('map_projects'):
+            self.project_client_map = build_project_client_map(clockify_projects)
+        self.loaded_at = now
+        return self.project_names, self.project_client_map
+
+def refresh_reference_caches():
+    """
+    For long-running processes: drop warm cache tables whose version moved, and
+    the sprint data derived from them. Without the versions RPC (or when the
+    mirror can't be refreshed) the warm cache is disabled. Returns the changed tables.
+    """
+    cache = active_cache()
+    if cache is None:
+        return set()
+    try:
+        changed = cache.check_versions()
+    except Exception as e:
+        log.warning(f"Could not check cache versions or refresh the mirror, disabling warm caches: {e}", error=str(e))
+        disable_cache()
+        _client_sprint_cache.clear()
+        return set()
+
+    if changed & {'clients', 'sprints'}:
+        _client_sprint_cache.clear()
+    return changed
+
 def get_client_sprint_data(client_id):
     """
     Get cached sprint data for a client including first sprint and campaign_start_date.
@@ -240,10 +468,23 @@ def get_client_sprint_data(client_id):
     """
     if client_id in _client_sprint_cache:
         return _client_sprint_cache[client_id]
-    
+
+    cache = active_cache()
+    if cache:
+        client = cache.client(client_id) or {}
+        all_sprints = cache.client_sprints(client_id)
+        _client_sprint_cache[client_id] = {
+            'first_sprint': all_sprints[0] if all_sprints else None,
+            'last_sprint': all_sprints[-1] if all_sprints else None,
+            'campaign_start_date': (datetime.fromisoformat(client['campaign_start_date']).date()
+                                    if client.get('campaign_start_date') else None),
+            'all_sprints': all_sprints
+        }
+        return _client_sprint_cache[client_id]
+
     try:
         # Fetch client's campaign_start_date
-        client_response = supabase.table('clients') \
+        client_response = get_supabase().table('clients') \
             .select('campaign_start_date') \
             .eq('id', client_id) \
             .execute()
@@ -253,7 +494,7 @@ def get_client_sprint_data(client_id):
             campaign_start_date = datetime.fromisoformat(client_response.data[0]['campaign_start_date']).date()
         
         # Fetch all sprints for this client, ordered by start_date
-        sprints_response = supabase.table('sprints') \
+        sprints_response = get_supabase().table('sprints') \
             .select('id, name, start_date, end_date, sprint_number') \
             .eq('client_id', client_id) \
             .order('start_date') \
@@ -274,14 +515,70 @@ def get_client_sprint_data(client_id):
         return cache_data
         
     except Exception as e:
-        print(f"Warning: Could not fetch sprint data for client {client_id}: {e}")
+        log.warning(f"Could not fetch sprint data for client {client_id}: {e}", client_id=client_id, error=str(e))
         return {'first_sprint': None, 'last_sprint': None, 'campaign_start_date': None, 'all_sprints': []}
 
 
-def find_sprint_for_date(client_id, entry_date, debug=False):
+def match_sprint_for_date(client_data, entry_date):
+    """
+    Pick the sprint for an entry date from a client's sprint data (as returned by
+    get_client_sprint_data). Same rules as the assign_sprints RPC.
+
+    Returns: (sprint, tag) tuple where:
+        - sprint: matching sprint dict or None
+        - tag: None if exact match, 'pre_sprint_prep' if within lookback window,
+               'no_sprints', 'before_campaign', 'post_sprint_work' or 'gap_between_sprints'
+    """
+    entry_date_str = entry_date.isoformat()
+
+    # Exact match (may be multiple if on boundary date); sprints are ordered by start_date
+    matches = [s for s in client_data['all_sprints'] if s['start_date'] <= entry_date_str <= s['end_date']]
+    if matches:
+        # If multiple sprints match (boundary overlap), prefer the one ending on this date
+        ending_on_date = next((s for s in matches if s['end_date'] == entry_date_str), None)
+        return ending_on_date or matches[0], None
+
+    first_sprint = client_data['first_sprint']
+    last_sprint = client_data['last_sprint']
+    campaign_start_date = client_data['campaign_start_date']
+
+    if not first_sprint:
+        # No sprints exist for this client
+        return None, 'no_sprints'
+
+    first_sprint_start = date.fromisoformat(first_sprint['start_date'])
+    last_sprint_end = date.fromisoformat(last_sprint['end_date'])
+
+    # Check if entry is BEFORE first sprint (potential pre-sprint prep)
+    if entry_date < first_sprint_start:
+        # Calculate lookback window
+        lookback_start = first_sprint_start - timedelta(days=PRE_SPRINT_LOOKBACK_DAYS)
+
+        # If campaign_start_date exists, use whichever is later as the cutoff
+        if campaign_start_date:
+            lookback_start = max(lookback_start, campaign_start_date)
+
+        # Entry falls within the pre-sprint lookback window
+        if entry_date >= lookback_start:
+            return first_sprint, 'pre_sprint_prep'
+
+        # Entry is too far before the sprint
+        return None, 'before_campaign'
+
+    # Check if entry is AFTER last sprint (post-sprint work)
+    if entry_date > last_sprint_end:
+        return None, 'post_sprint_work'
+
+    # Entry falls in a gap between sprints
+    return None, 'gap_between_sprints'
+
+def find_sprint_for_date(client_id, entry_date, debug=None, client_name=None):
     """
     Find the sprint that a time entry belongs to based on date.
-    
+    Sprints are loaded once per client (get_client_sprint_data) and matched in memory.
+    debug=None logs the match detail only for clients selected with --debug-client
+    (SYNC_DEBUG_CLIENTS, by id or client_name), or at DEBUG level.
+
     Returns: (sprint_id, tag) tuple where:
         - sprint_id: UUID of matching sprint or None
         - tag: None if exact match, 'pre_sprint_prep' if within lookback window, 
@@ -294,85 +591,32 @@ def find_sprint_for_date(client_id, entry_date, debug=False):
         # Convert entry_date to date object for comparison
         if isinstance(entry_date, datetime):
             entry_date = entry_date.date()
-        
-        entry_date_obj = entry_date
-        entry_date_str = entry_date.isoformat() if hasattr(entry_date, 'isoformat') else str(entry_date)
-
-        # Query sprints for this client where entry_date falls within sprint dates
-        response = supabase.table('sprints') \
-            .select('id, name, start_date, end_date') \
-            .eq('client_id', client_id) \
-            .lte('start_date', entry_date_str) \
-            .gte('end_date', entry_date_str) \
-            .order('start_date') \
-            .execute()
 
-        # Exact match found (may be multiple if on boundary date)
-        if response.data and len(response.data) > 0:
-            selected_sprint = response.data[0]
-            
-            # If multiple sprints match (boundary overlap), prefer the one ending on this date
-            if len(response.data) > 1:
-                ending_on_date = next((s for s in response.data if s['end_date'] == entry_date_str), None)
-                if ending_on_date:
-                    selected_sprint = ending_on_date
-            
-            if debug:
-                print(f"      ✓ Found sprint: {selected_sprint['name']}")
-            return selected_sprint['id'], None
-        
-        # No exact match - check for pre-sprint or post-sprint work
         client_data = get_client_sprint_data(client_id)
-        first_sprint = client_data['first_sprint']
-        last_sprint = client_data['last_sprint']
-        campaign_start_date = client_data['campaign_start_date']
-        
-        if not first_sprint:
-            # No sprints exist for this client
-            if debug:
-                print(f"      DEBUG: No sprints found for client {client_id}")
-            return None, 'no_sprints'
-        
-        # Parse sprint dates
-        first_sprint_start = datetime.fromisoformat(first_sprint['start_date']).date()
-        last_sprint_end = datetime.fromisoformat(last_sprint['end_date']).date()
-        
-        # Check if entry is BEFORE first sprint (potential pre-sprint prep)
-        if entry_date_obj < first_sprint_start:
-            # Calculate lookback window
-            lookback_start = first_sprint_start - timedelta(days=PRE_SPRINT_LOOKBACK_DAYS)
-            
-            # If campaign_start_date exists, use whichever is later as the cutoff
-            if campaign_start_date:
-                lookback_start = max(lookback_start, campaign_start_date)
-            
-            # Entry falls within the pre-sprint lookback window
-            if entry_date_obj >= lookback_start:
-                if debug:
-                    print(f"      ✓ Pre-sprint prep: {entry_date_obj} assigned to {first_sprint['name']} (within {PRE_SPRINT_LOOKBACK_DAYS}-day lookback)")
-                return first_sprint['id'], 'pre_sprint_prep'
+        sprint, tag = match_sprint_for_date(client_data, entry_date)
+
+        if debug is None:
+            debug = log.is_debug_client((client_id, client_name))
+        if debug or log.is_enabled(logging.DEBUG):
+            level = logging.INFO if debug else logging.DEBUG
+            fields = {'client_id': client_id, 'entry_date': entry_date, 'tag': tag}
+            if sprint and not tag:
+                log.log(level, f"      Found sprint: {sprint['name']}", sprint=sprint['name'], **fields)
+            elif sprint:
+                log.log(level, f"      Pre-sprint prep: {entry_date} assigned to {sprint['name']} "
+                               f"(within {PRE_SPRINT_LOOKBACK_DAYS}-day lookback)", sprint=sprint['name'], **fields)
+            elif tag == 'no_sprints':
+                log.log(level, f"      No sprints found for client {client_id}", **fields)
             else:
-                # Entry is too far before the sprint
-                if debug:
-                    print(f"      ✗ Entry {entry_date_obj} is before lookback window (starts {lookback_start})")
-                return None, 'before_campaign'
-        
-        # Check if entry is AFTER last sprint (post-sprint work)
-        if entry_date_obj > last_sprint_end:
-            if debug:
-                print(f"      ✗ Entry {entry_date_obj} is after last sprint ends ({last_sprint_end})")
-            return None, 'post_sprint_work'
-        
-        # Entry falls in a gap between sprints
-        if debug:
-            print(f"      DEBUG: Entry {entry_date_obj} falls in gap between sprints")
-            for s in client_data['all_sprints']:
-                print(f"        - {s['name']}: {s['start_date']} to {s['end_date']}")
-        
-        return None, 'gap_between_sprints'
+                log.log(level, f"      Entry {entry_date} not in any sprint - {tag}", **fields)
+                for s in client_data['all_sprints']:
+                    log.log(level, f"        - {s['name']}: {s['start_date']} to {s['end_date']}", **fields)
+
+        return (sprint['id'] if sprint else None), tag
 
     except Exception as e:
-        print(f"Warning: Could not find sprint for client {client_id} on date {entry_date}: {e}")
+        log.warning(f"Could not find sprint for client {client_id} on date {entry_date}: {e}",
+                    client_id=client_id, entry_date=entry_date, error=str(e))
 
     return None, None
 
@@ -405,206 +649,612 @@ def parse_duration_to_hours(duration_str):
 
     return round(hours + (minutes / 60.0), 2)
 
-def sync_time_entries(days_back=365):
-    """Main sync function for time entries"""
-    print(f">> Starting Clockify sync (last {days_back} days)...")
+def refresh_daily_rollup(entry_dates):
+    """Recompute time_entries_daily for the given entry dates (ISO strings) only"""
+    if not entry_dates:
+        return
 
     try:
-        # Fetch Clockify users
-        print(">> Fetching Clockify users...")
-        clockify_users = fetch_clockify_users()
-        print(f"   Found {len(clockify_users)} users")
+        get_supabase().rpc('refresh_time_entries_daily', {
+            'p_dates': sorted(entry_dates)
+        }).execute()
+    except Exception as e:
+        log.warning(f"Failed to refresh daily rollup: {e}", error=str(e))
 
-        # Fetch Clockify projects
-        print(">> Fetching Clockify projects...")
-        clockify_projects = fetch_clockify_projects()
-        print(f"   Found {len(clockify_projects)} projects")
-
-        # Create project ID to client ID mapping
-        project_client_map = {}
-        for project in clockify_projects:
-            client_id = map_project_to_client(project['name'])
-            if client_id:
-                project_client_map[project['id']] = client_id
-                print(f"   [OK] Mapped project '{project['name']}' to client")
-            else:
-                print(f"   [X] Could not map project '{project['name']}' to any client")
+def assign_sprints_batch(rows):
+    """
+    Assign sprints to a batch of time entry rows in one round trip.
+
+    Sends (clockify_id, client_id, entry_date) for every row with a client to the
+    assign_sprints RPC. Falls back to find_sprint_for_date() per row if the RPC
+    is unavailable (e.g. migration not applied yet).
 
-        # Set date range
-        end_date = datetime.now(timezone.utc)
-        start_date = end_date - timedelta(days=days_back)
+    Returns: dict of clockify_id -> (sprint_id, tag)
+    """
+    payload = [
+        {'clockify_id': row['clockify_id'], 'client_id': row['client_id'], 'entry_date': row['entry_date']}
+        for row in rows if row.get('client_id')
+    ]
+    if not payload:
+        return {}
+
+    try:
+        response = get_supabase().rpc('assign_sprints', {
+            'p_entries': payload,
+            'p_lookback_days': PRE_SPRINT_LOOKBACK_DAYS
+        }).execute()
+        return {a['clockify_id']: (a['sprint_id'], a['tag']) for a in response.data or []}
+    except Exception as e:
+        log.warning(f"assign_sprints RPC failed, falling back to per-entry lookup: {e}", error=str(e))
 
-        entries_synced = 0
-        entries_skipped = 0
-        skip_reasons = {
+    return {
+        row['clockify_id']: find_sprint_for_date(row['client_id'], date.fromisoformat(row['entry_date']),
+                                                 client_name=row.get('project_name'))
+        for row in rows if row.get('client_id')
+    }
+
+def fill_existing_client_ids(rows):
+    """
+    For rows whose project isn't mapped, reuse the client_id already stored on the
+    time entry (one query per batch instead of one per entry)
+    """
+    missing_ids = [row['clockify_id'] for row in rows if not row['client_id']]
+    if not missing_ids:
+        return
+
+    cache = active_cache()
+    index = cache.time_entry_index(missing_ids) if cache else None
+    if index is not None:
+        existing = {clockify_id: e['client_id'] for clockify_id, e in index.items() if e.get('client_id')}
+    else:
+        try:
+            response = get_supabase().table('time_entries') \
+                .select('clockify_id, client_id') \
+                .in_('clockify_id', missing_ids) \
+                .execute()
+        except Exception as e:
+            log.warning(f"Could not look up existing client ids: {e}", error=str(e))
+            return
+        existing = {e['clockify_id']: e['client_id'] for e in response.data or [] if e.get('client_id')}
+
+    for row in rows:
+        if not row['client_id']:
+            row['client_id'] = existing.get(row['clockify_id'])
+
+def split_unchanged_rows(rows):
+    """
+    Rows that differ from the stored time entry, and how many don't. Only a cache
+    with a time entry index (the local mirror) can tell; otherwise every row is written.
+    """
+    cache = active_cache()
+    index = cache.time_entry_index([row['clockify_id'] for row in rows]) if cache else None
+    if not index:
+        return rows, 0
+
+    changed = [
+        row for row in rows
+        if index.get(row['clockify_id'], {}).get('fingerprint') != time_entry_fingerprint(row)
+    ]
+    return changed, len(rows) - len(changed)
+
+def build_time_entry_row(entry, internal_user_id, project_names, project_client_map):
+    """
+    Shape a raw Clockify time entry into a time_entries row.
+    sprint_id and tags are filled in later, per batch.
+
+    Returns: (row, skip_reason) - row is None when the entry is skipped
+    """
+    time_interval = entry.get('timeInterval', {})
+
+    # Parse dates
+    start_time = time_interval.get('start')
+    if not start_time:
+        return None, None
+
+    entry_date = datetime.fromisoformat(start_time.replace('Z', '+00:00')).date()
+
+    # Parse duration
+    duration = time_interval.get('duration')
+    hours = parse_duration_to_hours(duration) if duration else 0.0
+
+    if hours == 0:
+        return None, 'no_hours'
+
+    project_id = entry.get('projectId')
+    task = entry.get('task')
+
+    return {
+        'clockify_id': entry['id'],
+        'sprint_id': None,
+        'client_id': project_client_map.get(project_id),  # Direct client reference
+        'user_id': internal_user_id,
+        'entry_date': entry_date.isoformat(),
+        'hours': hours,
+        'description': entry.get('description', ''),
+        'task_category': task.get('name') if task else None,
+        'project_name': project_names.get(project_id),
+        'tags': [],
+        'updated_at': datetime.now(timezone.utc).isoformat()
+    }, None
+
+def upsert_time_entry_rows(rows):
+    """
+    Write time entry rows through the upsert_time_entries RPC.
+
+    time_entries is partitioned by entry_date month, so PostgREST's upsert on
+    clockify_id can't be used; the RPC keeps clockify_id unique across partitions
+    (see database/migrations/partition_time_entries_1_upsert_rpc.sql).
+    """
+    get_supabase().rpc('upsert_time_entries', {'p_rows': rows}).execute()
+
+def delete_time_entries(clockify_ids):
+    """Delete time entries by Clockify id; returns the entry dates they were on"""
+    dates = set()
+    for i in range(0, len(clockify_ids), BATCH_SIZE):
+        response = get_supabase().table('time_entries') \
+            .delete() \
+            .in_('clockify_id', clockify_ids[i:i + BATCH_SIZE]) \
+            .execute()
+        dates.update(row['entry_date'] for row in response.data or [])
+    return dates
+
+def reconcile_deleted_entries(internal_user_id, start_date, end_date, clockify_ids, fetched_at, mode, stats):
+    """
+    Handle the user's stored entries dated start_date..end_date whose clockify_id
+    isn't in clockify_ids (deleted in Clockify, or moved out of the window):
+    report them ('dry-run'), move them to time_entries_deleted ('archive') or
+    delete them ('delete'), with one reconcile_time_entries call. Only call this
+    after a complete fetch of the window (iter_clockify_time_entry_pages status);
+    rows written after fetched_at, when that fetch started, are left alone.
+    """
+    if isinstance(start_date, datetime):
+        start_date = start_date.date()
+    if isinstance(end_date, datetime):
+        end_date = end_date.date()
+
+    with phase('reconcile'):
+        result = get_supabase().rpc('reconcile_time_entries', {
+            'p_user_id': internal_user_id,
+            'p_start_date': start_date.isoformat(),
+            'p_end_date': end_date.isoformat(),
+            'p_clockify_ids': sorted(clockify_ids),
+            'p_fetched_at': fetched_at.isoformat(),
+            'p_dry_run': mode == 'dry-run',
+            'p_archive': mode == 'archive',
+            'p_max_fraction': RECONCILE_MAX_FRACTION,
+        }).execute().data
+
+    stats['orphaned'] += result['orphans']
+    stats['deleted'] += result['removed']
+    if result['refused']:
+        log.warning(f"   Not removing {result['orphans']} of {result['stored']} stored entries missing from Clockify "
+                    f"({start_date}..{end_date}): more than {RECONCILE_MAX_FRACTION:.0%}, check the fetch",
+                    user_id=internal_user_id, orphans=result['orphans'], stored=result['stored'])
+    elif result['orphans']:
+        action = {'dry-run': 'would remove', 'archive': 'archived', 'delete': 'deleted'}[mode]
+        log.info(f"   Missing from Clockify: {result['orphans']} entries, {float(result['hours']):.2f}h on "
+                 f"{len(result['dates'])} dates ({action})", user_id=internal_user_id, mode=mode,
+                 orphans=result['orphans'], removed=result['removed'], hours=float(result['hours']),
+                 dates=result['dates'], clockify_ids=result['clockify_ids'])
+    return result
+
+def new_sync_stats():
+    """Counters shared by the per-user and per-batch steps of a Clockify sync"""
+    return {
+        'synced': 0,
+        'unchanged': 0,
+        'skipped': 0,
+        # Stored entries Clockify no longer returns (--reconcile), and how many were removed
+        'orphaned': 0,
+        'deleted': 0,
+        'skip_reasons': {
             'no_hours': 0,
             'no_sprint': 0,
             'pre_sprint_prep': 0,
             'non_client_work': 0
+        },
+        'touched_dates': set()
+    }
+
+def merge_sync_stats(total, part):
+    """Add one part's counters (new_sync_stats()) into total"""
+    total['synced'] += part['synced']
+    total['unchanged'] += part['unchanged']
+    total['skipped'] += part['skipped']
+    total['orphaned'] += part['orphaned']
+    total['deleted'] += part['deleted']
+    for reason, count in part['skip_reasons'].items():
+        total['skip_reasons'][reason] = total['skip_reasons'].get(reason, 0) + count
+    total['touched_dates'].update(part['touched_dates'])
+
+def log_sync_summary(stats, metrics):
+    """Final counts and timing of a finished run"""
+    skip_reasons = stats['skip_reasons']
+    log.info(
+        f"\n>> Sync complete!\n"
+        f"   Time entries synced: {stats['synced']}\n"
+        f"   Unchanged (not rewritten): {stats['unchanged']}\n"
+        f"   Entries skipped: {stats['skipped']}\n"
+        f"   Missing from Clockify: {stats['orphaned']} (removed: {stats['deleted']})\n"
+        f"\n== Breakdown:\n"
+        f"   - No hours (running timers): {skip_reasons['no_hours']}\n"
+        f"   - Pre-sprint prep (assigned to Sprint 1): {skip_reasons['pre_sprint_prep']}\n"
+        f"   - No sprint found (post-sprint/gaps): {skip_reasons['no_sprint']}\n"
+        f"   - Non-client work (tracked): {skip_reasons['non_client_work']}",
+        synced=stats['synced'], unchanged=stats['unchanged'], skipped=stats['skipped'], skip_reasons=skip_reasons,
+        orphaned=stats['orphaned'], deleted=stats['deleted'],
+        diagnostics=diagnostic_counts()
+    )
+    log.info(
+        f"\n== Timing: {metrics.duration:.1f}s, {metrics.api_calls} API calls, {metrics.db_calls} DB calls\n"
+        + "\n".join(f"   - {name}: {seconds:.1f}s" for name, seconds in metrics.phases.items()),
+        **metrics.to_dict()
+    )
+
+def write_time_entry_batch(rows, stats, raise_errors=False):
+    """
+    Resolve clients, assign sprints and upsert one batch of time entry rows. A failed
+    upsert is logged and counted as skipped, or re-raised with raise_errors (for
+    callers that retry the batch, e.g. the webhook receiver)
+    """
+    with phase('assign_sprints'):
+        fill_existing_client_ids(rows)
+        assignments = assign_sprints_batch(rows)
+
+    for row in rows:
+        if not row['client_id']:
+            # Non-client work - still track it but without sprint
+            stats['skip_reasons']['non_client_work'] += 1
+            continue
+
+        sprint_id, sprint_tag = assignments.get(row['clockify_id'], (None, None))
+        row['sprint_id'] = sprint_id
+
+        if sprint_tag:
+            # Add the tag (pre_sprint_prep, post_sprint_work, etc.)
+            row['tags'].append(sprint_tag)
+
+            if sprint_id:
+                # Pre-sprint prep - assigned to a sprint with a tag
+                log.diagnostic('pre_sprint_prep',
+                               "   Pre-sprint prep: {project} on {entry_date} assigned to sprint (tagged: {tag})",
+                               client=(row['client_id'], row['project_name']), project=row['project_name'],
+                               entry_date=row['entry_date'], tag=sprint_tag, client_id=row['client_id'])
+                stats['skip_reasons']['pre_sprint_prep'] += 1
+            else:
+                # No sprint assignment possible
+                log.diagnostic('no_sprint', "   No sprint for {project} on {entry_date} - tagged as {tag}",
+                               client=(row['client_id'], row['project_name']), project=row['project_name'],
+                               entry_date=row['entry_date'], tag=sprint_tag, client_id=row['client_id'])
+                stats['skip_reasons']['no_sprint'] += 1
+
+    # Entries identical to the stored row count as synced without being written again
+    rows, unchanged = split_unchanged_rows(rows)
+    stats['synced'] += unchanged
+    stats['unchanged'] += unchanged
+    if not rows:
+        return
+
+    try:
+        with phase('write'):
+            upsert_time_entry_rows(rows)
+    except Exception as e:
+        log.error(f"   Error upserting batch of {len(rows)} time entries: {e}", rows=len(rows), error=str(e))
+        if raise_errors:
+            raise
+        stats['skipped'] += len(rows)
+        return
+
+    stats['synced'] += len(rows)
+    stats['touched_dates'].update(row['entry_date'] for row in rows)
+    increment_progress(rows_written=len(rows))
+
+def process_time_entries(time_entries, internal_user_id, project_names, project_client_map, stats):
+    """Shape one user's Clockify entries and write them in batches of BATCH_SIZE"""
+    # Keyed by clockify_id: a duplicate in one upsert batch would fail the whole batch
+    rows = {}
+
+    for entry in time_entries:
+        try:
+            row, skip_reason = build_time_entry_row(entry, internal_user_id, project_names, project_client_map)
+        except Exception as e:
+            log.error(f"   Error processing time entry: {e}", clockify_id=entry.get('id'), error=str(e))
+            stats['skipped'] += 1
+            continue
+
+        if skip_reason:
+            stats['skipped'] += 1
+            stats['skip_reasons'][skip_reason] += 1
+        if row:
+            rows[row['clockify_id']] = row
+
+    rows = list(rows.values())
+    for i in range(0, len(rows), BATCH_SIZE):
+        write_time_entry_batch(rows[i:i + BATCH_SIZE], stats)
+
+def load_user_emails():
+    """Lower-cased emails of all internal users (to skip fetching unknown Clockify users)"""
+    response = get_supabase().table('users').select('email').execute()
+    return {u['email'].lower() for u in response.data or [] if u.get('email')}
+
+def slim_clockify_entry(entry):
+    """Keep only the fields ingest_clockify_entries reads; hydrated entries are large"""
+    task = entry.get('task')
+    time_interval = entry.get('timeInterval') or {}
+    return {
+        'id': entry['id'],
+        'userId': entry.get('userId'),
+        'projectId': entry.get('projectId'),
+        'description': entry.get('description', ''),
+        'task': {'name': task.get('name')} if task else None,
+        'timeInterval': {
+            'start': time_interval.get('start'),
+            'duration': time_interval.get('duration')
         }
+    }
+
+def ingest_entries_server_side(entries, run_metadata, stats):
+    """
+    Send raw entries to the ingest_clockify_entries RPC in chunks of INGEST_BATCH_SIZE.
+    The database does mapping, sprint assignment, upsert and rollup refresh;
+    the counts it returns are merged into stats.
+    """
+    for i in range(0, len(entries), INGEST_BATCH_SIZE):
+        chunk = entries[i:i + INGEST_BATCH_SIZE]
+        try:
+            with phase('ingest'):
+                result = get_supabase().rpc('ingest_clockify_entries', {
+                    'p_entries': chunk,
+                    'p_run': run_metadata
+                }).execute().data
+        except Exception as e:
+            log.error(f"   Error ingesting batch of {len(chunk)} entries: {e}", entries=len(chunk), error=str(e))
+            stats['skipped'] += len(chunk)
+            continue
+
+        stats['synced'] += result['synced']
+        stats['skipped'] += result['skipped']
+        increment_progress(rows_written=result['synced'])
+        for reason, count in result['skip_reasons'].items():
+            stats['skip_reasons'][reason] = stats['skip_reasons'].get(reason, 0) + count
+
+        log.info(f"   >> Ingested batch of {len(chunk)} entries ({result['synced']} synced)",
+                 entries=len(chunk), synced=result['synced'])
+
+def sync_time_entries(days_back=365, server_side=False, profile=False, profile_dir=None, resume=False,
+                      reconcile=None):
+    """
+    Main sync function for time entries.
+
+    server_side=True ships raw entries to the ingest_clockify_entries RPC instead
+    of mapping, assigning sprints and shaping rows in Python.
+    profile=True writes cProfile and per-phase memory artifacts (sync_profiler).
+    resume=True continues the last interrupted run from its checkpoint (sync_checkpoint).
+    reconcile (one of RECONCILE_MODES) handles stored entries Clockify no longer
+    returns, per user whose window was fetched completely (reconcile_deleted_entries).
+    """
+    mode = "server-side ingest" if server_side else "client-side mapping"
+    log.info(f">> Starting Clockify sync (last {days_back} days, {mode})...", days_back=days_back, mode=mode)
+
+    reset_diagnostic_counts()
+    stats = new_sync_stats()
+    checkpoint = start_checkpoint('server' if server_side else 'client', days_back, stats,
+                                  client=get_supabase() if resume else None)
+    metrics = start_run('clockify', get_supabase(), get_http(), profile=profile, profile_dir=profile_dir)
+    if checkpoint.resumed_from:
+        update_progress(resumed_from=checkpoint.resumed_from)
+
+    try:
+        # Fetch Clockify users
+        log.info(">> Fetching Clockify users...")
+        with phase('fetch_users'):
+            clockify_users = fetch_clockify_users()
+        log.info(f"   Found {len(clockify_users)} users", users=len(clockify_users))
+
+        # Fetch Clockify projects
+        log.info(">> Fetching Clockify projects...")
+        with phase('fetch_projects'):
+            clockify_projects = fetch_clockify_projects()
+        log.info(f"   Found {len(clockify_projects)} projects", projects=len(clockify_projects))
+
+        # Create project ID to client ID mapping (also saved to clockify_projects)
+        project_names = {project['id']: project['name'] for project in clockify_projects}
+        with phase('map_projects'):
+            project_client_map = build_project_client_map(clockify_projects)
+
+        # Date range (a resumed run keeps the interrupted run's)
+        start_date = checkpoint.start_date
+        end_date = checkpoint.end_date
+
+        # Server-side mode: raw entries are buffered and sent in large batches
+        run_metadata = {'users': [], 'lookback_days': PRE_SPRINT_LOOKBACK_DAYS}
+        pending_entries = []
+        pending_users = []
+        with phase('map_users'):
+            known_emails = load_user_emails() if server_side else None
 
         # Fetch and process time entries for each user
-        for clockify_user in clockify_users:
+        update_progress(users_total=len(clockify_users), users_done=0)
+        for users_done, clockify_user in enumerate(clockify_users):
             user_email = clockify_user.get('email')
             user_name = clockify_user.get('name', 'Unknown')
+            update_progress(users_done=users_done, current_user=user_name)
 
             if not user_email:
                 continue
 
-            # Map to internal user
-            internal_user_id = map_clockify_user_to_internal(user_email)
+            if clockify_user['id'] in checkpoint.users_done:
+                log.debug(f"Skipping user {user_name} - done before the run was interrupted", user=user_name)
+                continue
+
+            # Map to internal user (in server-side mode the ingest RPC maps by email itself)
+            if server_side:
+                internal_user_id = None
+                is_known_user = user_email.lower() in known_emails
+            else:
+                with phase('map_users'):
+                    internal_user_id = map_clockify_user_to_internal(user_email)
+                is_known_user = internal_user_id is not None
 
-            if not internal_user_id:
-                print(f"\n👤 Skipping user {user_name} ({user_email}) - not found in system")
+            if not is_known_user:
+                log.info(f"Skipping user {user_name} ({user_email}) - not found in system", user=user_name, email=user_email)
                 continue
 
-            print(f"\n👤 Processing user: {user_name}")
-
-            # Fetch time entries
-            time_entries = fetch_clockify_time_entries(
-                clockify_user['id'],
-                start_date,
-                end_date
-            )
-
-            print(f"   Found {len(time_entries)} time entries")
-
-            # Track entries for this user
-            user_entries_synced = 0
-            user_entries_skipped = 0
-
-            # Process each entry
-            for entry in time_entries:
-                try:
-                    # Extract data
-                    clockify_id = entry['id']
-                    project_id = entry.get('projectId')
-                    task = entry.get('task')
-                    description = entry.get('description', '')
-                    time_interval = entry.get('timeInterval', {})
-
-                    # Parse dates
-                    start_time = time_interval.get('start')
-                    if not start_time:
-                        continue
-
-                    entry_date = datetime.fromisoformat(start_time.replace('Z', '+00:00')).date()
-
-                    # Parse duration
-                    duration = time_interval.get('duration')
-                    hours = parse_duration_to_hours(duration) if duration else 0.0
-
-                    if hours == 0:
-                        entries_skipped += 1
-                        user_entries_skipped += 1
-                        skip_reasons['no_hours'] += 1
-                        continue
-
-                    # Get project name (MOVED UP - needed for debug logging)
-                    project_name = None
-                    for proj in clockify_projects:
-                        if proj['id'] == project_id:
-                            project_name = proj['name']
-                            break
-
-                    # Map to client
-                    client_id = project_client_map.get(project_id)
-
-                    # If no project mapping, check if entry already exists with a client_id
-                    if not client_id:
-                        existing_entry = supabase.table('time_entries') \
-                            .select('client_id') \
-                            .eq('clockify_id', clockify_id) \
-                            .execute()
-                        
-                        if existing_entry.data and len(existing_entry.data) > 0:
-                            client_id = existing_entry.data[0].get('client_id')
-
-                    # Handle non-client work (internal projects, training, etc.)
-                    sprint_id = None
-                    tags = []
-
-                    if client_id:
-                        # Find sprint for client work (returns tuple: sprint_id, tag)
-                        sprint_id, sprint_tag = find_sprint_for_date(client_id, entry_date, debug=False)
-
-                        if sprint_tag:
-                            # Add the tag (pre_sprint_prep, post_sprint_work, etc.)
-                            tags.append(sprint_tag)
-                            
-                            if sprint_id:
-                                # Pre-sprint prep - assigned to a sprint with a tag
-                                print(f"   >> Pre-sprint prep: {project_name} on {entry_date} assigned to sprint (tagged: {sprint_tag})")
-                                skip_reasons['pre_sprint_prep'] += 1
-                            else:
-                                # No sprint assignment possible
-                                print(f"   !! No sprint for {project_name} on {entry_date} - tagged as {sprint_tag}")
-                                skip_reasons['no_sprint'] += 1
-                    else:
-                        # Non-client work - still track it but without sprint
-                        skip_reasons['non_client_work'] += 1
-
-                    # Get task name
-                    task_category = task.get('name') if task else None
-
-                    # Create time entry data
-                    time_entry_data = {
-                        'clockify_id': clockify_id,
-                        'sprint_id': sprint_id,
-                        'client_id': client_id,  # Direct client reference
-                        'user_id': internal_user_id,
-                        'entry_date': entry_date.isoformat(),
-                        'hours': hours,
-                        'description': description,
-                        'task_category': task_category,
-                        'project_name': project_name,
-                        'tags': tags,
-                        'updated_at': datetime.now(timezone.utc).isoformat()
-                    }
-
-                    # Upsert to database
-                    supabase.table('time_entries').upsert(
-                        time_entry_data,
-                        on_conflict='clockify_id'
-                    ).execute()
-
-                    entries_synced += 1
-                    user_entries_synced += 1
-
-                except Exception as e:
-                    print(f"   !! Error processing time entry: {e}")
-                    entries_skipped += 1
-                    user_entries_skipped += 1
-
-            print(f"   >> Synced {user_entries_synced} entries (skipped {user_entries_skipped})")
+            log.info(f"\nProcessing user: {user_name}", user=user_name)
+
+            if server_side:
+                with phase('fetch_entries'):
+                    time_entries = fetch_clockify_time_entries(clockify_user['id'], start_date, end_date)
+                log.info(f"   Found {len(time_entries)} time entries", user=user_name, entries=len(time_entries))
+
+                run_metadata['users'].append({'clockify_user_id': clockify_user['id'], 'email': user_email})
+                pending_entries.extend(slim_clockify_entry(entry) for entry in time_entries)
+                pending_users.append(clockify_user['id'])
+                if len(pending_entries) >= INGEST_BATCH_SIZE:
+                    ingest_entries_server_side(pending_entries, run_metadata, stats)
+                    pending_entries = []
+                    for user_id in pending_users:
+                        checkpoint.user_done(user_id, stats)
+                    pending_users = []
+                continue
 
-        # Log success
-        log_sync('clockify', 'success', entries_synced)
+            # Client-side mode: each page is written before the next is fetched, then checkpointed
+            synced_before = stats['synced']
+            skipped_before = stats['skipped']
+            entries_found = 0
+            first_page = checkpoint.first_page(clockify_user['id'])
+            if first_page > 1:
+                log.info(f"   Resuming at page {first_page}", user=user_name, page=first_page)
+
+            fetch_status = {}
+            fetched_ids = set()
+            pages = iter_clockify_time_entry_pages(clockify_user['id'], start_date, end_date, first_page, fetch_status)
+            while True:
+                with phase('fetch_entries'):
+                    page, time_entries = next(pages, (None, None))
+                if page is None:
+                    break
+                entries_found += len(time_entries)
+                fetched_ids.update(entry['id'] for entry in time_entries)
+                process_time_entries(time_entries, internal_user_id, project_names, project_client_map, stats)
+                checkpoint.page_done(clockify_user['id'], page, stats)
+
+            # Pages before a resumed run's first page weren't seen, so their entries would look deleted
+            if reconcile and fetch_status.get('complete') and first_page == 1:
+                reconcile_deleted_entries(internal_user_id, start_date, end_date, fetched_ids,
+                                          fetch_status['started_at'], reconcile, stats)
+            elif reconcile:
+                log.info("   Not reconciling deletions - the fetch was incomplete or resumed", user=user_name)
+            checkpoint.user_done(clockify_user['id'], stats)
+
+            log.info(f"   Found {entries_found} time entries", user=user_name, entries=entries_found)
+            log.info(f"   >> Synced {stats['synced'] - synced_before} entries (skipped {stats['skipped'] - skipped_before})",
+                     user=user_name, synced=stats['synced'] - synced_before, skipped=stats['skipped'] - skipped_before)
+
+        update_progress(users_done=len(clockify_users), current_user=None)
+
+        if pending_entries:
+            ingest_entries_server_side(pending_entries, run_metadata, stats)
+            for user_id in pending_users:
+                checkpoint.user_done(user_id, stats)
+
+        # Refresh the daily rollup for the days we wrote (the ingest RPC does its own)
+        if stats['touched_dates']:
+            log.info(f"\n>> Refreshing daily rollup for {len(stats['touched_dates'])} dates...", dates=len(stats['touched_dates']))
+            with phase('refresh_rollup'):
+                refresh_daily_rollup(stats['touched_dates'])
 
-        print(f"\n>> Sync complete!")
-        print(f"   Time entries synced: {entries_synced}")
-        print(f"   Entries skipped: {entries_skipped}")
-        print(f"\n== Breakdown:")
-        print(f"   - No hours (running timers): {skip_reasons['no_hours']}")
-        print(f"   - Pre-sprint prep (assigned to Sprint 1): {skip_reasons['pre_sprint_prep']}")
-        print(f"   - No sprint found (post-sprint/gaps): {skip_reasons['no_sprint']}")
-        print(f"   - Non-client work (tracked): {skip_reasons['non_client_work']}")
+        # Log success
+        finish_run()
+        log_sync('clockify', 'success', stats['synced'], metrics=metrics)
+        export_run('clockify', 'success', stats['synced'], metrics, stats)
+        log_sync_summary(stats, metrics)
 
         return True
 
     except Exception as e:
+        # Records written before the failure are kept, and the checkpoint in progress lets --resume continue
         error_msg = str(e)
-        print(f"\n!! Sync failed: {error_msg}")
-        log_sync('clockify', 'error', 0, error_msg)
+        log.error(f"\nSync failed: {error_msg}", exc_info=True, error=error_msg)
+        # Refresh the rollup for what was written; a rerun skips unchanged rows and wouldn't
+        if stats['touched_dates']:
+            refresh_daily_rollup(stats['touched_dates'])
+        finish_run()
+        log_sync('clockify', 'error', stats['synced'], error_msg, metrics=metrics)
+        export_run('clockify', 'error', stats['synced'], metrics)
         return False
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sync time entries from Clockify to Supabase')
+    parser.add_argument('--days', type=int, default=365, help='Days of history to sync (default: 365)')
+    parser.add_argument('--server-side', action='store_true',
+                        help='Send raw entries to the ingest_clockify_entries RPC instead of mapping in Python')
+    parser.add_argument('--async', dest='async_engine', action='store_true',
+                        help='Fetch users concurrently and overlap writes with fetches (sync_clockify_async)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='--async: Clockify requests in flight and users processed at once (default: 8)')
+    parser.add_argument('--rate-limit', type=float, default=20,
+                        help='--async: Clockify requests per second (default: 20)')
+    parser.add_argument('--processes', type=int,
+                        help='Shard users (and --windows) over this many processes (sync_clockify_sharded)')
+    parser.add_argument('--windows', type=int, default=1,
+                        help='--processes: date windows per user, to spread large users over processes (default: 1)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Continue the last run from its checkpoint if it was interrupted (same mode and --days)')
+    parser.add_argument('--reconcile', choices=RECONCILE_MODES,
+                        help='Stored entries Clockify no longer returns: report them (dry-run), move them to '
+                             'time_entries_deleted (archive) or delete them')
+    parser.add_argument('--clients', nargs='+', metavar='NAME_OR_ID',
+                        help="Only sync these clients' Clockify projects, all users concurrently (async engine; "
+                             "uses --concurrency and --rate-limit)")
+    parser.add_argument('--profile', action='store_true',
+                        help='Write a cProfile dump and per-phase memory stats to profiles/')
+    parser.add_argument('--profile-dir', help='Directory for --profile artifacts (default: profiles/)')
+    add_mirror_argument(parser)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    load_settings()
+    configure_from_args(args)
+
     # Check environment variables
     if not all([CLOCKIFY_API_KEY, CLOCKIFY_WORKSPACE_ID, SUPABASE_URL, SUPABASE_SERVICE_KEY]):
-        print("!! Error: Missing required environment variables")
-        print("Required: CLOCKIFY_API_KEY, CLOCKIFY_WORKSPACE_ID, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
+        log.error("Missing required environment variables\n"
+                  "Required: CLOCKIFY_API_KEY, CLOCKIFY_WORKSPACE_ID, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
         exit(1)
 
+    if args.async_engine and (args.server_side or args.profile or args.resume):
+        parser.error('--async cannot be combined with --server-side, --profile or --resume')
+    if args.processes and (args.async_engine or args.server_side or args.profile or args.resume):
+        parser.error('--processes cannot be combined with --async, --server-side, --profile or --resume')
+    if args.reconcile and (args.async_engine or args.server_side):
+        parser.error('--reconcile cannot be combined with --async or --server-side')
+    if args.clients and (args.server_side or args.processes or args.resume or args.reconcile or args.profile):
+        parser.error('--clients cannot be combined with --server-side, --processes, --resume, --reconcile or --profile')
+
+    mirror_path = mirror_path_from_args(args)
+    if mirror_path:
+        log.info(f">> Refreshing local mirror {mirror_path}...", path=mirror_path)
+        enable_mirror(mirror_path)
+
     # Run sync (default: last 365 days)
-    success = sync_time_entries(days_back=365)
+    if args.clients:
+        from sync_clockify_async import run_sync_time_entries_async
+        try:
+            client_ids = resolve_clients(args.clients)
+        except ValueError as e:
+            parser.error(str(e))
+        success = run_sync_time_entries_async(days_back=args.days, concurrency=args.concurrency,
+                                              rate_limit=args.rate_limit, client_ids=client_ids)
+    elif args.processes:
+        from sync_clockify_sharded import sync_time_entries_sharded
+        success = sync_time_entries_sharded(days_back=args.days, processes=args.processes, windows=args.windows,
+                                            mirror_path=mirror_path, reconcile=args.reconcile)
+    elif args.async_engine:
+        from sync_clockify_async import run_sync_time_entries_async
+        success = run_sync_time_entries_async(days_back=args.days, concurrency=args.concurrency,
+                                              rate_limit=args.rate_limit)
+    else:
+        success = sync_time_entries(days_back=args.days, server_side=args.server_side,
+                                    profile=args.profile, profile_dir=args.profile_dir, resume=args.resume,
+                                    reconcile=args.reconcile)
     exit(0 if success else 1)
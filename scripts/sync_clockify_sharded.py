@@ -0,0 +1,217 @@
+"""
+Multi-process engine for the Clockify sync, for full backfills:
+
+    python scripts/sync_clockify_data.py --days 365 --processes 8 [--windows 4]
+
+The coordinator (this process) does what sync_time_entries() does before and
+after the per-user loop: fetch Clockify users and projects, build and store the
+project -> client map, map users to internal ids, and at the end refresh the
+daily rollup and write the run's one sync_logs row. The per-user work is split
+into shards, one per user and date window (--windows splits the date range so a
+heavy user's year spreads over several processes). The shards run on a process
+pool (spawned, so every worker opens its own Supabase client and HTTP session).
+
+Each worker gets the reference data once, read-only: the project maps, and
+users/clients/sprints/clockify_projects as a preloaded sync_cache.WarmCache (or
+the local mirror file, with --mirror). It then fetches, shapes and batch-writes
+its shard's entries with the same functions as the default engine
+(iter_clockify_time_entry_pages, process_time_entries), page by page.
+
+With --reconcile, each shard reconciles deletions for its own user and window
+once that window was fetched completely.
+
+Workers return their counters, phase timings, call counts and diagnostic
+counts, and the coordinator merges them into the run's totals. So the summary,
+sync_logs.metrics and the exported metrics cover the whole run. Phase times add
+up across processes. Live progress counts shards as users. Sharded runs don't
+write checkpoints; use the default engine with --resume for restartable runs.
+"""
+
+import os
+import multiprocessing
+from datetime import datetime, timedelta, timezone
+
+import sync_cache
+import sync_clockify_data as clockify
+from sync_clients import get_supabase, get_http
+from sync_metrics import start_run, finish_run, phase, update_progress, increment_progress
+from sync_exporter import export_run
+from sync_logging import (
+    get_logger, configure_logging, logging_config, diagnostic_counts, add_diagnostic_counts, reset_diagnostic_counts
+)
+
+log = get_logger('clockify')
+
+# Set in each worker process by _init_worker
+_worker_context = None
+
+def shard_windows(start_date, end_date, windows):
+    """Split [start_date, end_date] into consecutive, non-overlapping whole-day windows"""
+    days = (end_date.date() - start_date.date()).days + 1
+    windows = max(1, min(windows, days))
+    bounds = []
+    first = start_date.date()
+    for i in range(windows):
+        window_start = first + timedelta(days=days * i // windows)
+        window_end = first + timedelta(days=days * (i + 1) // windows - 1)
+        bounds.append((window_start.isoformat(), window_end.isoformat()))
+    return bounds
+
+def _init_worker(context):
+    """Pool initializer: logging, and the read-only reference data every shard uses"""
+    global _worker_context
+    _worker_context = context
+
+    configure_logging(**context['logging'])
+    # Settings the coordinator may have overridden after import (the benchmarks point them at stubs)
+    clockify.CLOCKIFY_API_URL, clockify.CLOCKIFY_API_KEY, clockify.CLOCKIFY_WORKSPACE_ID = context['clockify']
+    if context['mirror_path']:
+        from sync_mirror import MirrorCache, SyncMirror
+        sync_cache.enable_cache(MirrorCache(SyncMirror(context['mirror_path'])))
+    else:
+        sync_cache.enable_cache(sync_cache.WarmCache.from_rows(context['tables']))
+
+def sync_shard(shard):
+    """Fetch and write one user's entries for one window; returns counters, metrics and diagnostics"""
+    context = _worker_context
+    user_name = shard['user_name']
+    window_start = datetime.fromisoformat(shard['start'])
+    window_end = datetime.fromisoformat(shard['end'])
+
+    reset_diagnostic_counts()
+    metrics = start_run('clockify', get_supabase(), get_http(), log_running=False)
+    stats = clockify.new_sync_stats()
+    entries_found = 0
+    fetch_status = {}
+    fetched_ids = set()
+    try:
+        pages = clockify.iter_clockify_time_entry_pages(shard['clockify_user_id'], window_start, window_end,
+                                                        status=fetch_status)
+        while True:
+            with phase('fetch_entries'):
+                page, time_entries = next(pages, (None, None))
+            if page is None:
+                break
+            entries_found += len(time_entries)
+            fetched_ids.update(entry['id'] for entry in time_entries)
+            clockify.process_time_entries(time_entries, shard['internal_user_id'], context['project_names'],
+                                          context['project_client_map'], stats)
+        if context['reconcile'] and fetch_status.get('complete'):
+            clockify.reconcile_deleted_entries(shard['internal_user_id'], window_start, window_end, fetched_ids,
+                                               fetch_status['started_at'], context['reconcile'], stats)
+    finally:
+        finish_run()
+
+    log.info(f"   {user_name} {shard['start']}..{shard['end']}: {entries_found} entries, "
+             f"synced {stats['synced']} (skipped {stats['skipped']})",
+             user=user_name, window=[shard['start'], shard['end']], entries=entries_found,
+             synced=stats['synced'], skipped=stats['skipped'], pid=os.getpid())
+    return {
+        'stats': stats,
+        'metrics': metrics.to_dict(),
+        'pages_fetched': metrics.progress.get('pages_fetched', 0),
+        'entries_fetched': metrics.progress.get('entries_fetched', 0),
+        'diagnostics': diagnostic_counts(),
+    }
+
+def sync_time_entries_sharded(days_back=365, processes=None, windows=1, mirror_path=None, reconcile=None):
+    """sync_time_entries() with the per-user work spread over a process pool"""
+    processes = processes or os.cpu_count() or 1
+    log.info(f">> Starting Clockify sync (last {days_back} days, sharded over {processes} processes)...",
+             days_back=days_back, mode='sharded', processes=processes, windows=windows)
+
+    reset_diagnostic_counts()
+    metrics = start_run('clockify', get_supabase(), get_http())
+    stats = clockify.new_sync_stats()
+
+    try:
+        log.info(">> Fetching Clockify users...")
+        with phase('fetch_users'):
+            clockify_users = clockify.fetch_clockify_users()
+        log.info(f"   Found {len(clockify_users)} users", users=len(clockify_users))
+
+        log.info(">> Fetching Clockify projects...")
+        with phase('fetch_projects'):
+            clockify_projects = clockify.fetch_clockify_projects()
+        log.info(f"   Found {len(clockify_projects)} projects", projects=len(clockify_projects))
+
+        project_names = {project['id']: project['name'] for project in clockify_projects}
+        with phase('map_projects'):
+            project_client_map = clockify.build_project_client_map(clockify_projects)
+
+        end_date = datetime.now(timezone.utc)
+        start_date = end_date - timedelta(days=days_back)
+        bounds = shard_windows(start_date, end_date, windows)
+
+        shards = []
+        with phase('map_users'):
+            for clockify_user in clockify_users:
+                user_email = clockify_user.get('email')
+                user_name = clockify_user.get('name', 'Unknown')
+                if not user_email:
+                    continue
+                internal_user_id = clockify.map_clockify_user_to_internal(user_email)
+                if internal_user_id is None:
+                    log.info(f"Skipping user {user_name} ({user_email}) - not found in system",
+                             user=user_name, email=user_email)
+                    continue
+                shards.extend({
+                    'clockify_user_id': clockify_user['id'],
+                    'internal_user_id': internal_user_id,
+                    'user_name': user_name,
+                    'start': window_start,
+                    'end': window_end,
+                } for window_start, window_end in bounds)
+
+        with phase('load_reference'):
+            cache = sync_cache.active_cache() or sync_cache.WarmCache()
+            context = {
+                'project_names': project_names,
+                'project_client_map': project_client_map,
+                'tables': None if mirror_path else cache.load_rows(),
+                'mirror_path': mirror_path,
+                'reconcile': reconcile,
+                'logging': logging_config(),
+                'clockify': (clockify.CLOCKIFY_API_URL, clockify.CLOCKIFY_API_KEY, clockify.CLOCKIFY_WORKSPACE_ID),
+            }
+
+        log.info(f"\n>> Syncing {len(shards)} shards ({len(bounds)} windows per user)...",
+                 shards=len(shards), windows=len(bounds))
+        update_progress(users_total=len(shards), users_done=0)
+
+        pool = multiprocessing.get_context('spawn').Pool(processes, initializer=_init_worker, initargs=(context,))
+        try:
+            for shards_done, result in enumerate(pool.imap_unordered(sync_shard, shards), start=1):
+                clockify.merge_sync_stats(stats, result['stats'])
+                metrics.merge(result['metrics'])
+                add_diagnostic_counts(result['diagnostics'])
+                increment_progress(pages_fetched=result['pages_fetched'], entries_fetched=result['entries_fetched'],
+                                   rows_written=result['stats']['synced'] - result['stats']['unchanged'])
+                update_progress(users_done=shards_done)
+        finally:
+            pool.close()
+            pool.join()
+
+        if stats['touched_dates']:
+            log.info(f"\n>> Refreshing daily rollup for {len(stats['touched_dates'])} dates...",
+                     dates=len(stats['touched_dates']))
+            with phase('refresh_rollup'):
+                clockify.refresh_daily_rollup(stats['touched_dates'])
+
+        finish_run()
+        clockify.log_sync('clockify', 'success', stats['synced'], metrics=metrics)
+        export_run('clockify', 'success', stats['synced'], metrics, stats)
+        clockify.log_sync_summary(stats, metrics)
+
+        return True
+
+    except Exception as e:
+        error_msg = str(e)
+        log.error(f"\nSync failed: {error_msg}", exc_info=True, error=error_msg)
+        # Refresh the rollup for what the finished shards wrote; a rerun skips unchanged rows and wouldn't
+        if stats['touched_dates']:
+            clockify.refresh_daily_rollup(stats['touched_dates'])
+        finish_run()
+        clockify.log_sync('clockify', 'error', stats['synced'], error_msg, metrics=metrics)
+        export_run('clockify', 'error', stats['synced'], metrics)
+        return False
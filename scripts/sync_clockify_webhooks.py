@@ -0,0 +1,259 @@
+"""
+Receiver for Clockify webhooks, so new and edited time entries reach Supabase
+within seconds instead of at the next polling sync:
+
+    python scripts/sync_clockify_webhooks.py serve --port 9109 [--record events.jsonl]
+    python scripts/sync_clockify_webhooks.py replay events.jsonl [--url http://127.0.0.1:9109/webhooks/clockify]
+    python scripts/sync_clockify_webhooks.py replay events.jsonl --direct
+
+In Clockify (Workspace settings > Webhooks) point one webhook per event at
+POST /webhooks/clockify: new time entry, time entry updated, time entry
+deleted, timer stopped. Each webhook has its own signing secret, sent in the
+Clockify-Signature header; put all of them, comma-separated, in
+CLOCKIFY_WEBHOOK_SECRETS. Requests without a matching signature get 401.
+
+Accepted events are buffered (sync_webhooks.MicroBatcher, keyed by time entry
+id, so the last event for an entry wins) and applied every few seconds with the
+same functions as sync_time_entries(): user mapping by email, project -> client
+mapping, and per-batch sprint assignment and upsert (write_time_entry_batch).
+Deleted entries are deleted. The daily rollup is refreshed for the dates the
+batch wrote, deleted, or moved entries away from.
+
+Webhooks can be missed (receiver down, Clockify retries exhausted), so keep a
+polling sync running as a periodic reconciliation, e.g. the daemon with
+--clockify-every 360 --clockify-days 30.
+
+replay posts a file written by --record (or written by hand, one
+{"headers": {"Clockify-Webhook-Event-Type": ...}, "body": <time entry>} per
+line) to a running receiver, signed with the first secret. --direct applies it
+in-process without a server.
+"""
+
+import os
+import json
+import signal
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import sync_cache
+import sync_clockify_data as clockify
+from sync_clients import get_supabase
+from sync_exporter import serve_metrics, export_entry_stats, record_webhook_event
+from sync_mirror import MirrorCache, SyncMirror, add_mirror_argument, mirror_path_from_args
+from sync_webhooks import MicroBatcher, EventRecorder, token_matches, read_events, replay_events
+from sync_logging import get_logger, add_logging_arguments, configure_from_args
+
+log = get_logger('clockify')
+
+WEBHOOK_PATH = '/webhooks/clockify'
+SIGNATURE_HEADER = 'Clockify-Signature'
+EVENT_HEADER = 'Clockify-Webhook-Event-Type'
+
+UPSERT_EVENTS = {'NEW_TIME_ENTRY', 'TIME_ENTRY_UPDATED', 'TIMER_STOPPED', 'TIME_ENTRY_RESTORED'}
+DELETE_EVENTS = {'TIME_ENTRY_DELETED'}
+
+# Events applied per batch, and the longest an accepted event waits to be applied
+MAX_BATCH = clockify.BATCH_SIZE
+FLUSH_SECONDS = 5.0
+
+def webhook_secrets():
+    return [s.strip() for s in os.getenv('CLOCKIFY_WEBHOOK_SECRETS', '').split(',') if s.strip()]
+
+class ClockifyUserMap:
+    """Clockify user id -> internal user id, via the Clockify users' emails; reloaded when an unknown id shows up"""
+
+    def __init__(self):
+        self._ids = {}
+        self.loaded_at = None
+
+    def internal_id(self, clockify_user_id):
+        if clockify_user_id not in self._ids:
+            now = datetime.now(timezone.utc)
+            if self.loaded_at is None or now - self.loaded_at > timedelta(minutes=1):
+                self._ids = {
+                    user['id']: clockify.map_clockify_user_to_internal(user.get('email'))
+                    for user in clockify.fetch_clockify_users()
+                }
+                self.loaded_at = now
+        return self._ids.get(clockify_user_id)
+
+class ClockifyWebhookReceiver:
+    """Validates Clockify webhook requests and applies their time entries in micro-batches"""
+
+    def __init__(self, secrets, recorder=None, max_batch=MAX_BATCH, flush_seconds=FLUSH_SECONDS):
+        self.secrets = secrets
+        self.recorder = recorder
+        self.users = ClockifyUserMap()
+        self.projects = clockify.ProjectContext()
+        self.batcher = MicroBatcher('clockify-webhooks', self.apply, max_batch, flush_seconds)
+        self.started_at = datetime.now(timezone.utc)
+        self.totals = clockify.new_sync_stats()
+        self.deleted = 0
+        self.received = Counter()
+        self._received_lock = threading.Lock()
+
+    def handle(self, headers, body):
+        """sync_exporter.serve_metrics POST route: (HTTP status, response)"""
+        # The header is caller-controlled: unknown names share one counter and metric label
+        event = headers.get(EVENT_HEADER)
+        if event not in UPSERT_EVENTS | DELETE_EVENTS:
+            event = 'other'
+
+        if not token_matches(headers.get(SIGNATURE_HEADER), self.secrets):
+            record_webhook_event('clockify', event, 'rejected')
+            log.warning(f"Rejected Clockify webhook with a missing or unknown signature ({event})", event=event)
+            return 401, {'error': 'invalid signature'}
+
+        with self._received_lock:
+            self.received[event] += 1
+
+        try:
+            entry = json.loads(body)
+        except ValueError:
+            record_webhook_event('clockify', event, 'rejected')
+            return 400, {'error': 'body is not JSON'}
+
+        if event not in UPSERT_EVENTS | DELETE_EVENTS or not isinstance(entry, dict) or not entry.get('id') \
+                or entry.get('workspaceId', clockify.CLOCKIFY_WORKSPACE_ID) != clockify.CLOCKIFY_WORKSPACE_ID:
+            record_webhook_event('clockify', event, 'ignored')
+            return 200, {'status': 'ignored'}
+
+        if self.recorder:
+            self.recorder.record(headers, entry)
+        self.batcher.add(entry['id'], (event, entry))
+        record_webhook_event('clockify', event, 'accepted')
+        return 200, {'status': 'accepted'}
+
+    def apply(self, events):
+        """Write one micro-batch: upsert created/updated entries, delete deleted ones, refresh the rollup"""
+        clockify.refresh_reference_caches()
+        upserts = [entry for event, entry in events if event in UPSERT_EVENTS]
+        deletes = [entry['id'] for event, entry in events if event in DELETE_EVENTS]
+        stats = clockify.new_sync_stats()
+
+        # Dates the entries are stored on now: an edit can move an entry to another day
+        stored = get_supabase().table('time_entries') \
+            .select('clockify_id, entry_date') \
+            .in_('clockify_id', [entry['id'] for entry in upserts]) \
+            .execute().data if upserts else []
+        stats['touched_dates'].update(row['entry_date'] for row in stored or [])
+
+        project_names, project_client_map = self.projects.get(entry.get('projectId') for entry in upserts)
+        rows = []
+        for entry in upserts:
+            internal_user_id = self.users.internal_id(entry.get('userId'))
+            if internal_user_id is None:
+                log.info(f"Skipping webhook entry {entry['id']} - Clockify user {entry.get('userId')} not found in system",
+                         clockify_id=entry['id'], clockify_user_id=entry.get('userId'))
+                continue
+            row, skip_reason = clockify.build_time_entry_row(entry, internal_user_id, project_names, project_client_map)
+            if skip_reason:
+                stats['skipped'] += 1
+                stats['skip_reasons'][skip_reason] += 1
+            if row:
+                rows.append(row)
+
+        if rows:
+            # A failed write raises, so the batcher puts the events back and retries them
+            clockify.write_time_entry_batch(rows, stats, raise_errors=True)
+        if deletes:
+            stats['touched_dates'].update(clockify.delete_time_entries(deletes))
+            self.deleted += len(deletes)
+
+        clockify.refresh_daily_rollup(stats['touched_dates'])
+        export_entry_stats(stats)
+        clockify.merge_sync_stats(self.totals, dict(stats, touched_dates=set()))
+        log.info(f"   Webhook batch: {len(rows)} entries written ({stats['unchanged']} unchanged), "
+                 f"{len(deletes)} deleted, {stats['skipped']} skipped",
+                 written=len(rows), unchanged=stats['unchanged'], deleted=len(deletes), skipped=stats['skipped'])
+
+    def start(self):
+        self.batcher.start()
+        return self
+
+    def stop(self):
+        self.batcher.stop()
+
+    def status(self):
+        return {
+            'started_at': self.started_at.isoformat(),
+            'now': datetime.now(timezone.utc).isoformat(),
+            'received': dict(self.received),
+            'batcher': self.batcher.status(),
+            'synced': self.totals['synced'],
+            'unchanged': self.totals['unchanged'],
+            'skipped': self.totals['skipped'],
+            'skip_reasons': self.totals['skip_reasons'],
+            'deleted': self.deleted,
+            'cache': sync_cache.active_cache().status() if sync_cache.active_cache() else None,
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply Clockify webhook events to Supabase in micro-batches')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help='Run the receiver')
+    serve_parser.add_argument('--port', type=int, default=9109, help='Port to listen on (default: 9109)')
+    serve_parser.add_argument('--host', default='127.0.0.1',
+                              help='Address to listen on (default: 127.0.0.1; put a TLS proxy in front)')
+    serve_parser.add_argument('--record', help='Append accepted events to this JSONL file, for replay')
+    serve_parser.add_argument('--flush-seconds', type=float, default=FLUSH_SECONDS,
+                              help=f'Longest an event waits before its batch is applied (default: {FLUSH_SECONDS:g})')
+    add_mirror_argument(serve_parser)
+
+    replay_parser = commands.add_parser('replay', help='Send recorded events to a receiver')
+    replay_parser.add_argument('file', help='JSONL file written by serve --record')
+    replay_parser.add_argument('--url', default=f'http://127.0.0.1:9109{WEBHOOK_PATH}', help='Receiver URL')
+    replay_parser.add_argument('--delay', type=float, default=0, help='Seconds between events')
+    replay_parser.add_argument('--direct', action='store_true', help='Apply the events in this process, without a server')
+
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    clockify.load_settings()
+    configure_from_args(args)
+
+    secrets = webhook_secrets()
+    if not secrets:
+        log.error("Missing required environment variable CLOCKIFY_WEBHOOK_SECRETS")
+        exit(1)
+
+    if args.command == 'replay' and not args.direct:
+        codes = replay_events(args.file, args.url, headers={SIGNATURE_HEADER: secrets[0]}, delay=args.delay)
+        log.info(f">> Replayed {len(codes)} events: {sum(1 for c in codes if c < 400)} accepted",
+                 events=len(codes), accepted=sum(1 for c in codes if c < 400))
+        exit(0 if all(c < 400 for c in codes) else 1)
+
+    if not all([clockify.CLOCKIFY_API_KEY, clockify.CLOCKIFY_WORKSPACE_ID,
+                clockify.SUPABASE_URL, clockify.SUPABASE_SERVICE_KEY]):
+        log.error("Missing required environment variables\n"
+                  "Required: CLOCKIFY_API_KEY, CLOCKIFY_WORKSPACE_ID, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
+        exit(1)
+
+    if args.command == 'replay':
+        receiver = ClockifyWebhookReceiver(secrets)
+        for event in read_events(args.file):
+            receiver.handle({**event.get('headers', {}), SIGNATURE_HEADER: secrets[0]}, json.dumps(event['body']))
+        ok = receiver.batcher.flush()
+        log.info(f">> Applied {receiver.batcher.events_applied} events", **receiver.status())
+        exit(0 if ok else 1)
+
+    mirror_path = mirror_path_from_args(args)
+    sync_cache.enable_cache(MirrorCache(SyncMirror(mirror_path)) if mirror_path else None)
+
+    recorder = EventRecorder(args.record, [EVENT_HEADER]) if args.record else None
+    receiver = ClockifyWebhookReceiver(secrets, recorder, flush_seconds=args.flush_seconds).start()
+    server = serve_metrics(args.port, args.host, status=receiver.status, post_routes={WEBHOOK_PATH: receiver.handle})
+    log.info(f">> Receiving Clockify webhooks on http://{args.host}:{args.port}{WEBHOOK_PATH} "
+             f"(also /status and /metrics)")
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *a: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *a: stop_event.set())
+    while not stop_event.wait(1):
+        pass
+
+    log.info(">> Stopping: applying buffered events...")
+    server.shutdown()
+    receiver.stop()
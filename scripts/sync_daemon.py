@@ -0,0 +1,234 @@
+"""
+Long-running sync daemon: runs the Monday.com and Clockify syncs on a schedule in one process.
+
+    python scripts/sync_daemon.py                          # Monday hourly, Clockify every 30 min
+    python scripts/sync_daemon.py --monday-every 120 --clockify-every 60 --clockify-days 60
+    python scripts/sync_daemon.py --once                   # both syncs once, in order, then exit
+
+Compared with a cron job per sync:
+- Jobs run one at a time, in dependency order. When both are due, Monday runs
+  first, so Clockify assigns entries to the sprints Monday has just written.
+  Clockify doesn't run before Monday's first run since the daemon started has
+  finished. If Monday fails, Clockify still runs between Monday's retries.
+- users, clients, sprints and clockify_projects stay in memory between runs
+  (sync_cache.WarmCache). Before each run the daemon compares their change
+  versions (migrations/add_sync_cache_versions.sql) and reloads only what changed.
+- With --mirror, the caches are loaded from the local SQLite mirror
+  (sync_mirror.py), which is refreshed incrementally before each run instead.
+- GET /status (JSON: each job's last run, next run and failures, plus the cache
+  versions and reload counts) and GET /metrics (sync_exporter) are served on
+  --port.
+
+SIGINT/SIGTERM stop the daemon after the running job finishes.
+"""
+
+import os
+import time
+import signal
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+
+import sync_cache
+import sync_clockify_data
+import sync_monday_data
+from sync_exporter import serve_metrics
+from sync_mirror import MirrorCache, SyncMirror, add_mirror_argument, mirror_path_from_args
+from sync_logging import get_logger, add_logging_arguments, configure_from_args
+
+log = get_logger('daemon')
+
+# Wait before retrying a failed job (or the job's interval, if shorter)
+FAILURE_RETRY_MINUTES = 10
+
+# Longest sleep between schedule checks, so stop signals are handled promptly
+TICK_SECONDS = 30
+
+class SyncJob:
+    """One scheduled sync and the state of its runs"""
+
+    def __init__(self, name, run, every_minutes, after=()):
+        self.name = name
+        self.run = run
+        self.every = timedelta(minutes=every_minutes)
+        self.after = tuple(after)
+        self.next_run = datetime.now(timezone.utc)
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_started = None
+        self.last_finished = None
+        self.last_status = None
+        self.last_success = None
+        self.last_duration = None
+
+    def is_due(self, now):
+        return now >= self.next_run
+
+    def status(self):
+        return {
+            'every_minutes': self.every.total_seconds() / 60,
+            'after': list(self.after),
+            'running': self.running,
+            'next_run': self.next_run.isoformat(),
+            'runs': self.runs,
+            'failures': self.failures,
+            'consecutive_failures': self.consecutive_failures,
+            'last_started': self.last_started.isoformat() if self.last_started else None,
+            'last_finished': self.last_finished.isoformat() if self.last_finished else None,
+            'last_status': self.last_status,
+            'last_success': self.last_success.isoformat() if self.last_success else None,
+            'last_duration_seconds': round(self.last_duration, 1) if self.last_duration is not None else None,
+        }
+
+class SyncDaemon:
+    """Runs due jobs one at a time in dependency order, with warm reference caches"""
+
+    def __init__(self, jobs, cache=None):
+        # Jobs are run in list order; a job's dependencies must come before it
+        self.jobs = jobs
+        self.by_name = {job.name: job for job in jobs}
+        self.started_at = datetime.now(timezone.utc)
+        self.stop_event = threading.Event()
+        self.cache = sync_cache.enable_cache(cache)
+
+    def refresh_caches(self):
+        """Reload reference tables whose version moved; without the versions RPC, drop the cache"""
+        changed = sync_clockify_data.refresh_reference_caches()
+        self.cache = sync_cache.active_cache()
+        if changed:
+            log.info(f">> Reference data changed: {', '.join(sorted(changed))}", changed=sorted(changed))
+
+    def runnable(self, job, now):
+        """
+        Due, and every dependency has run since the daemon started and isn't running or
+        due itself. A failing dependency doesn't block the job, only delays it past the retry.
+        """
+        if not job.is_due(now):
+            return False
+        for name in job.after:
+            dependency = self.by_name[name]
+            if dependency.last_finished is None or dependency.running or dependency.is_due(now):
+                return False
+        return True
+
+    def run_job(self, job):
+        self.refresh_caches()
+
+        job.running = True
+        job.last_started = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        log.info(f"\n>> [{job.name}] starting", job=job.name)
+
+        try:
+            ok = job.run()
+        except Exception as e:
+            log.error(f"[{job.name}] crashed: {e}", exc_info=True, job=job.name, error=str(e))
+            ok = False
+
+        job.running = False
+        job.last_finished = datetime.now(timezone.utc)
+        job.last_duration = time.perf_counter() - started
+        job.last_status = 'success' if ok else 'error'
+        job.runs += 1
+
+        if ok:
+            job.last_success = job.last_finished
+            job.consecutive_failures = 0
+            job.next_run = job.last_started + job.every
+        else:
+            job.failures += 1
+            job.consecutive_failures += 1
+            job.next_run = job.last_finished + min(job.every, timedelta(minutes=FAILURE_RETRY_MINUTES))
+
+        log.info(f">> [{job.name}] {job.last_status} in {job.last_duration:.1f}s, next run {job.next_run:%H:%M:%S} UTC",
+                 job=job.name, status=job.last_status, duration_seconds=round(job.last_duration, 1),
+                 next_run=job.next_run)
+
+    def run_due_jobs(self):
+        """Run every runnable job once, in order; returns how many ran"""
+        ran = 0
+        for job in self.jobs:
+            if self.stop_event.is_set():
+                break
+            if self.runnable(job, datetime.now(timezone.utc)):
+                self.run_job(job)
+                ran += 1
+        return ran
+
+    def run_forever(self):
+        log.info(">> Sync daemon started: " + ", ".join(
+            f"{job.name} every {job.every.total_seconds() / 60:g} min" for job in self.jobs
+        ))
+
+        while not self.stop_event.is_set():
+            self.run_due_jobs()
+
+            # Jobs already due are waiting on a dependency; wake for the next one coming due
+            now = datetime.now(timezone.utc)
+            waits = [(job.next_run - now).total_seconds() for job in self.jobs]
+            wait = min((w for w in waits if w > 0), default=TICK_SECONDS)
+            self.stop_event.wait(min(wait, TICK_SECONDS))
+
+        log.info(">> Sync daemon stopped")
+
+    def stop(self, *args):
+        log.info(">> Stopping after the current job...")
+        self.stop_event.set()
+
+    def status(self):
+        return {
+            'started_at': self.started_at.isoformat(),
+            'now': datetime.now(timezone.utc).isoformat(),
+            'jobs': {job.name: job.status() for job in self.jobs},
+            'cache': self.cache.status() if self.cache else None,
+        }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the Monday.com and Clockify syncs on a schedule')
+    parser.add_argument('--monday-every', type=float, default=60, help='Minutes between Monday syncs (default: 60)')
+    parser.add_argument('--clockify-every', type=float, default=30, help='Minutes between Clockify syncs (default: 30)')
+    parser.add_argument('--clockify-days', type=int, default=30,
+                        help='Days of Clockify history each run syncs (default: 30)')
+    parser.add_argument('--clockify-reconcile', choices=sync_clockify_data.RECONCILE_MODES,
+                        help='Report, archive or delete stored entries missing from Clockify in each run\'s window')
+    parser.add_argument('--port', type=int, default=9108, help='Port for /status and /metrics (0 to disable)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address for /status and /metrics (default: 127.0.0.1)')
+    parser.add_argument('--once', action='store_true', help='Run both syncs once, in order, and exit')
+    add_mirror_argument(parser)
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    sync_clockify_data.load_settings()
+    sync_monday_data.load_settings()
+    configure_from_args(args)
+
+    board_ids_available = [bid for bid in sync_monday_data.MONDAY_BOARD_IDS.values() if bid]
+    if not all([sync_monday_data.MONDAY_API_KEY, board_ids_available,
+                sync_clockify_data.CLOCKIFY_API_KEY, sync_clockify_data.CLOCKIFY_WORKSPACE_ID,
+                os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY')]):
+        log.error("Missing required environment variables\n"
+                  "Required: MONDAY_API_KEY, at least one MONDAY_*_BOARD_ID, CLOCKIFY_API_KEY, "
+                  "CLOCKIFY_WORKSPACE_ID, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
+        exit(1)
+
+    mirror_path = mirror_path_from_args(args)
+    daemon = SyncDaemon([
+        SyncJob('monday', sync_monday_data.sync_clients_and_sprints, args.monday_every),
+        # A retry after a failed run continues from its checkpoint
+        SyncJob('clockify', lambda: sync_clockify_data.sync_time_entries(days_back=args.clockify_days, resume=True,
+                                                                         reconcile=args.clockify_reconcile),
+                args.clockify_every, after=['monday']),
+    ], cache=MirrorCache(SyncMirror(mirror_path)) if mirror_path else None)
+
+    if args.once:
+        daemon.run_due_jobs()
+        exit(0 if all(job.last_status == 'success' for job in daemon.jobs) else 1)
+
+    if args.port:
+        serve_metrics(args.port, args.host, status=daemon.status)
+        log.info(f">> Serving /status and /metrics on http://{args.host}:{args.port}")
+
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run_forever()
@@ -0,0 +1,303 @@
+"""
+OpenMetrics exporter for sync performance (no dependencies).
+
+The syncs record into the module-level REGISTRY while they run (API requests and
+latency via sync_metrics' request hooks, Monday complexity, and per-run totals
+via export_run()). Two ways to expose it:
+
+- Textfile: set SYNC_METRICS_TEXTFILE_DIR to the node_exporter textfile collector
+  directory. Each run rewrites sync_<source>.prom there. Counters and histograms
+  are carried over from the previous file, so they keep growing across cron runs
+  like a long-lived process's would. Meant for the one-sync-per-process cron jobs;
+  a process running both syncs should serve HTTP instead.
+- HTTP: serve_metrics(port) serves /metrics from a background thread, for
+  long-running processes (sync_daemon.py, which also serves /status, and the
+  webhook receivers, which also take POSTs on their webhook paths).
+
+Metrics:
+    clockify_api_requests_total{endpoint,status}
+    clockify_api_request_duration_seconds{endpoint}      histogram (page latency)
+    monday_api_requests_total{endpoint,status}
+    monday_api_request_duration_seconds{endpoint}        histogram
+    monday_complexity_consumed_total
+    monday_complexity_remaining                          gauge (budget left after the last query)
+    supabase_requests_total{source}
+    time_entries_written_total{outcome}                  written / unchanged / skipped / failed
+    time_entries_reconciled_total{outcome}               found / removed (deleted in Clockify)
+    clockify_skip_reasons_total{reason}
+    sync_runs_total{source,status}
+    sync_run_duration_seconds{source}                    histogram
+    sync_records_synced_total{source}
+    sync_last_run_timestamp_seconds{source,status}       gauge
+    webhook_events_total{source,event,outcome}           accepted / ignored / rejected
+"""
+
+import os
+import re
+import threading
+import time
+
+from sync_logging import get_logger
+
+log = get_logger('exporter')
+
+TEXTFILE_DIR = os.getenv('SYNC_METRICS_TEXTFILE_DIR')
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RUN_DURATION_BUCKETS = (10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+# family name -> (type, help, histogram buckets)
+FAMILIES = {
+    'clockify_api_requests': ('counter', 'Clockify API requests', None),
+    'clockify_api_request_duration_seconds': ('histogram', 'Clockify API request latency (one page per request)', LATENCY_BUCKETS),
+    'monday_api_requests': ('counter', 'Monday.com API requests', None),
+    'monday_api_request_duration_seconds': ('histogram', 'Monday.com API request latency', LATENCY_BUCKETS),
+    'monday_complexity_consumed': ('counter', 'Monday.com API complexity points consumed', None),
+    'monday_complexity_remaining': ('gauge', 'Monday.com complexity budget left after the last query', None),
+    'supabase_requests': ('counter', 'Supabase PostgREST requests made by the syncs', None),
+    'time_entries_written': ('counter', 'Clockify time entries by outcome (written, unchanged, skipped, failed)', None),
+    'time_entries_reconciled': ('counter', 'Stored Clockify entries Clockify no longer returns, by outcome (found, removed)', None),
+    'clockify_skip_reasons': ('counter', 'Clockify entries by skip/tag reason', None),
+    'sync_runs': ('counter', 'Sync runs by source and final status', None),
+    'sync_run_duration_seconds': ('histogram', 'Sync run duration', RUN_DURATION_BUCKETS),
+    'sync_records_synced': ('counter', 'Records synced', None),
+    'sync_last_run_timestamp_seconds': ('gauge', 'Unix time the last run of each source finished', None),
+    'webhook_events': ('counter', 'Webhook events received, by outcome (accepted, ignored, rejected)', None),
+}
+
+SAMPLE_LINE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(?:\{(.*)\})?\s+(\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+LABEL_ESCAPE = re.compile(r'\\(.)')
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _format_labels(key):
+    if not key:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape_label_value(v)}"' for k, v in key) + '}'
+
+def _escape_label_value(value):
+    # Exposition format: backslash, double quote and newline are escaped in label values
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _unescape_label_value(value):
+    return LABEL_ESCAPE.sub(lambda m: '\n' if m.group(1) == 'n' else m.group(1), value)
+
+def _format_value(value):
+    if isinstance(value, float):
+        return str(int(value)) if value.is_integer() else repr(value)
+    return str(value)
+
+class OpenMetricsRegistry:
+    """Counters, gauges and fixed-bucket histograms rendered in OpenMetrics text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (family, labels key) -> value, or for histograms {'buckets': [...], 'sum': x, 'count': n}
+        self._samples = {}
+
+    def inc(self, family, amount=1, **labels):
+        with self._lock:
+            key = (family, _labels_key(labels))
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+    def set(self, family, value, **labels):
+        with self._lock:
+            self._samples[(family, _labels_key(labels))] = value
+
+    def observe(self, family, value, **labels):
+        buckets = FAMILIES[family][2]
+        with self._lock:
+            key = (family, _labels_key(labels))
+            hist = self._samples.setdefault(key, {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    hist['buckets'][i] += 1
+            hist['sum'] += value
+            hist['count'] += 1
+
+    def get(self, family, **labels):
+        return self._samples.get((family, _labels_key(labels)))
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for family, (metric_type, help_text, buckets) in FAMILIES.items():
+                samples = [(key, value) for (name, key), value in self._samples.items() if name == family]
+                if not samples:
+                    continue
+
+                lines.append(f"# TYPE {family} {metric_type}")
+                lines.append(f"# HELP {family} {help_text}")
+                for key, value in sorted(samples):
+                    if metric_type == 'counter':
+                        lines.append(f"{family}_total{_format_labels(key)} {_format_value(value)}")
+                    elif metric_type == 'gauge':
+                        lines.append(f"{family}{_format_labels(key)} {_format_value(value)}")
+                    else:
+                        for bound, count in zip(buckets, value['buckets']):
+                            lines.append(f"{family}_bucket{_format_labels(key + (('le', str(float(bound))),))} {count}")
+                        lines.append(f"{family}_bucket{_format_labels(key + (('le', '+Inf'),))} {value['count']}")
+                        lines.append(f"{family}_sum{_format_labels(key)} {_format_value(value['sum'])}")
+                        lines.append(f"{family}_count{_format_labels(key)} {value['count']}")
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def merge_previous(self, text):
+        """
+        Add counter and histogram values from a previously rendered file, so totals
+        carry across processes. Gauges are kept only if this process hasn't set them.
+        """
+        previous = {}
+        for line in text.splitlines():
+            match = SAMPLE_LINE.match(line)
+            if not match:
+                continue
+            name, labels, value = match.groups()
+            previous[(name, _labels_key({k: _unescape_label_value(v) for k, v in LABEL.findall(labels or '')}))] = float(value)
+
+        with self._lock:
+            for family, (metric_type, _, buckets) in FAMILIES.items():
+                if metric_type == 'counter':
+                    for (name, key), value in previous.items():
+                        if name == f"{family}_total":
+                            self._samples[(family, key)] = self._samples.get((family, key), 0) + value
+                elif metric_type == 'gauge':
+                    for (name, key), value in previous.items():
+                        if name == family:
+                            self._samples.setdefault((family, key), value)
+                else:
+                    for (name, key), count in previous.items():
+                        if name != f"{family}_count":
+                            continue
+                        hist = self._samples.setdefault(
+                            (family, key), {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+                        )
+                        for i, bound in enumerate(buckets):
+                            le_key = tuple(sorted(key + (('le', str(float(bound))),)))
+                            hist['buckets'][i] += int(previous.get((f"{family}_bucket", le_key), 0))
+                        hist['sum'] += previous.get((f"{family}_sum", key), 0.0)
+                        hist['count'] += int(count)
+
+REGISTRY = OpenMetricsRegistry()
+
+# Textfiles whose previous totals are already merged into REGISTRY
+_merged_textfiles = set()
+
+def record_api_response(source, response):
+    """Count one external API response and its latency (called from sync_metrics' hook)"""
+    if source == 'monday':
+        endpoint = 'graphql'
+    else:
+        endpoint = str(response.url).split('?', 1)[0].rstrip('/').rsplit('/', 1)[-1]
+
+    REGISTRY.inc(f'{source}_api_requests', endpoint=endpoint, status=response.status_code)
+    REGISTRY.observe(f'{source}_api_request_duration_seconds', response.elapsed.total_seconds(), endpoint=endpoint)
+
+def record_monday_complexity(complexity):
+    """complexity is the {before, query, after} object Monday returns when asked for it"""
+    if not complexity:
+        return
+    if complexity.get('query') is not None:
+        REGISTRY.inc('monday_complexity_consumed', complexity['query'])
+    if complexity.get('after') is not None:
+        REGISTRY.set('monday_complexity_remaining', complexity['after'])
+
+def export_run(source, status, records_synced, metrics, stats=None):
+    """
+    Record a finished run and, if SYNC_METRICS_TEXTFILE_DIR is set, write the
+    textfile. stats is the Clockify sync's counters (new_sync_stats()).
+    """
+    REGISTRY.inc('sync_runs', source=source, status=status)
+    REGISTRY.inc('sync_records_synced', records_synced, source=source)
+    REGISTRY.set('sync_last_run_timestamp_seconds', round(time.time(), 3), source=source, status=status)
+    if metrics is not None:
+        REGISTRY.observe('sync_run_duration_seconds', metrics.duration, source=source)
+        REGISTRY.inc('supabase_requests', metrics.db_calls, source=source)
+
+    if stats is not None:
+        export_entry_stats(stats)
+
+    if TEXTFILE_DIR:
+        write_textfile(os.path.join(TEXTFILE_DIR, f"sync_{source}.prom"))
+
+def export_entry_stats(stats):
+    """Count Clockify entries by outcome and skip reason (new_sync_stats() counters)"""
+    no_hours = stats['skip_reasons'].get('no_hours', 0)
+    unchanged = stats.get('unchanged', 0)
+    REGISTRY.inc('time_entries_written', stats['synced'] - unchanged, outcome='written')
+    REGISTRY.inc('time_entries_written', unchanged, outcome='unchanged')
+    REGISTRY.inc('time_entries_written', no_hours, outcome='skipped')
+    REGISTRY.inc('time_entries_written', max(stats['skipped'] - no_hours, 0), outcome='failed')
+    REGISTRY.inc('time_entries_reconciled', stats.get('orphaned', 0), outcome='found')
+    REGISTRY.inc('time_entries_reconciled', stats.get('deleted', 0), outcome='removed')
+    for reason, count in stats['skip_reasons'].items():
+        REGISTRY.inc('clockify_skip_reasons', count, reason=reason)
+
+def record_webhook_event(source, event, outcome):
+    REGISTRY.inc('webhook_events', source=source, event=event or 'unknown', outcome=outcome)
+
+def write_textfile(path):
+    """Merge with the previous file and replace it atomically (the collector may read at any time)"""
+    try:
+        if path not in _merged_textfiles and os.path.exists(path):
+            with open(path) as f:
+                REGISTRY.merge_previous(f.read())
+        _merged_textfiles.add(path)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(REGISTRY.render())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        log.warning(f"Failed to write metrics textfile {path}: {e}", path=path, error=str(e))
+
+def serve_metrics(port, host='127.0.0.1', status=None, post_routes=None):
+    """
+    Serve REGISTRY at http://host:port/metrics from a daemon thread; returns the server.
+    status, if given, is a callable whose JSON-serialisable result is served at /status.
+    post_routes maps paths to callables taking (headers, body bytes) and returning
+    (HTTP status, JSON-serialisable response), for webhook receivers.
+    """
+    # Imported here: only long-running processes serve, and http.server is slow to import
+    import json
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/metrics':
+                body = REGISTRY.render().encode('utf-8')
+                content_type = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+            elif path == '/status' and status is not None:
+                body = json.dumps(status(), indent=2, default=str).encode('utf-8')
+                content_type = 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.respond(200, body, content_type)
+
+        def do_POST(self):
+            route = (post_routes or {}).get(self.path.split('?', 1)[0])
+            if route is None:
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            code, response = route(self.headers, body)
+            self.respond(code, json.dumps(response, default=str).encode('utf-8'), 'application/json')
+
+        def respond(self, code, body, content_type):
+            self.send_response(code)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,413 @@
+"""
+Sync work as a queue of jobs in the sync_jobs table, drained by any number of
+workers on any number of machines (database/migrations/add_sync_jobs.sql):
+
+    python scripts/sync_jobs.py enqueue --monday                    # one job per Monday board
+    python scripts/sync_jobs.py enqueue --days 365 --windows 4      # one job per Clockify user and window
+    python scripts/sync_jobs.py work                                # run jobs until stopped
+    python scripts/sync_jobs.py work --once                         # run jobs until the queue is empty
+    python scripts/sync_jobs.py status [--batch NAME]
+    python scripts/sync_jobs.py requeue-dead [--batch NAME]
+
+Jobs:
+    monday_board          sync_monday_data.sync_board() for one board, then the
+                          re-assignment of pending sprint date changes
+    clockify_user_window  one user's entries for one date window, fetched page by
+                          page and written with the same functions as
+                          sync_time_entries() (process_time_entries); the job
+                          refreshes the daily rollup for the dates it wrote.
+                          Enqueued with --reconcile, it then reconciles
+                          deletions in its window (reconcile_deleted_entries)
+
+Enqueueing a Clockify backfill does what sync_time_entries() does before its
+per-user loop: fetch users and projects, store the project -> client map and
+map users to internal ids, so workers only need the stored mappings. Enqueue
+(and drain) the Monday jobs first when sprints may have changed.
+
+A worker claims jobs with claim_sync_jobs (FOR UPDATE SKIP LOCKED) and holds a
+lease on each, extended every LEASE_SECONDS / 3 by a background thread. A job
+that raises, or whose entry writes failed, goes back to the queue with
+exponential backoff; after max_attempts it is dead-lettered (status 'dead').
+If a worker dies, its lease runs out and the next claim hands the job to
+another worker. Writes are upserts, so running a job again is safe.
+
+Jobs don't write sync_logs rows; each job's counters, phase timings and call
+counts are stored in sync_jobs.result, and `status` totals them per batch.
+"""
+
+import os
+import socket
+import signal
+import argparse
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+
+import sync_cache
+import sync_clockify_data as clockify
+import sync_monday_data as monday
+from sync_clients import get_supabase, get_http
+from sync_clockify_sharded import shard_windows
+from sync_cache import fetch_all_rows
+from sync_metrics import start_run, finish_run, phase
+from sync_mirror import MirrorCache, SyncMirror, add_mirror_argument, mirror_path_from_args
+from sync_logging import (
+    get_logger, add_logging_arguments, configure_from_args, diagnostic_counts, reset_diagnostic_counts
+)
+
+log = get_logger('jobs')
+
+JOB_KINDS = ('clockify_user_window', 'monday_board')
+
+# Seconds a claimed job stays leased without a heartbeat; a dead worker's jobs are re-claimed after this
+LEASE_SECONDS = 300
+
+# Attempts before a job is dead-lettered
+MAX_ATTEMPTS = 5
+
+# Seconds between claims when the queue is empty
+POLL_SECONDS = 10
+
+class LeaseLost(Exception):
+    """The job's lease expired and another worker may have claimed it"""
+
+class JobLease:
+    """Keeps a claimed job's lease alive from a background thread while the job runs"""
+
+    def __init__(self, job_id, worker_id, lease_seconds=LEASE_SECONDS):
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'lease-{job_id}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.lease_seconds / 3):
+            try:
+                held = get_supabase().rpc('extend_sync_job_lease', {
+                    'p_id': self.job_id,
+                    'p_worker': self.worker_id,
+                    'p_lease_seconds': self.lease_seconds,
+                }).execute().data
+            except Exception as e:
+                # Keep trying; the lease only lapses if this keeps failing for lease_seconds
+                log.warning(f"Could not extend lease of job {self.job_id}: {e}", job_id=self.job_id, error=str(e))
+                continue
+            if not held:
+                log.warning(f"Lost the lease of job {self.job_id}", job_id=self.job_id)
+                self.lost = True
+                return
+
+    def check(self):
+        """Raise LeaseLost if another worker may now own the job"""
+        if self.lost:
+            raise LeaseLost(f"Lease of job {self.job_id} expired")
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def new_batch_name(prefix):
+    return f"{prefix}-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}"
+
+def enqueue(jobs, batch):
+    """Insert jobs ({'kind', 'payload', 'dedupe_key'}); returns how many were new"""
+    jobs = [{'max_attempts': MAX_ATTEMPTS, **job} for job in jobs]
+    inserted = get_supabase().rpc('enqueue_sync_jobs', {'p_jobs': jobs, 'p_batch': batch}).execute().data
+    log.info(f">> Enqueued {inserted} of {len(jobs)} jobs in batch {batch} "
+             f"({len(jobs) - inserted} already queued or running)", batch=batch, jobs=len(jobs), inserted=inserted)
+    return inserted
+
+def monday_board_jobs():
+    return [
+        {'kind': 'monday_board', 'payload': {'region': region, 'board_id': board_id},
+         'dedupe_key': f"monday_board:{board_id}"}
+        for region, board_id in monday.MONDAY_BOARD_IDS.items() if board_id
+    ]
+
+def clockify_user_window_jobs(days_back, windows=1, reconcile=None):
+    """
+    One job per known Clockify user and date window; also stores the project -> client map.
+    reconcile (clockify.RECONCILE_MODES) makes each job reconcile deletions in its window.
+    """
+    log.info(">> Fetching Clockify users and projects...")
+    clockify_users = clockify.fetch_clockify_users()
+    clockify_projects = clockify.fetch_clockify_projects()
+    log.info(f"   Found {len(clockify_users)} users, {len(clockify_projects)} projects",
+             users=len(clockify_users), projects=len(clockify_projects))
+    clockify.build_project_client_map(clockify_projects)
+
+    end_date = datetime.now(timezone.utc)
+    bounds = shard_windows(end_date - timedelta(days=days_back), end_date, windows)
+
+    jobs = []
+    for clockify_user in clockify_users:
+        user_email = clockify_user.get('email')
+        user_name = clockify_user.get('name', 'Unknown')
+        if not user_email:
+            continue
+        internal_user_id = clockify.map_clockify_user_to_internal(user_email)
+        if internal_user_id is None:
+            log.info(f"Skipping user {user_name} ({user_email}) - not found in system",
+                     user=user_name, email=user_email)
+            continue
+        jobs.extend({
+            'kind': 'clockify_user_window',
+            'payload': {
+                'clockify_user_id': clockify_user['id'],
+                'internal_user_id': internal_user_id,
+                'user_name': user_name,
+                'start': window_start,
+                'end': window_end,
+                'reconcile': reconcile,
+            },
+            'dedupe_key': f"clockify_user_window:{clockify_user['id']}:{window_start}:{window_end}",
+        } for window_start, window_end in bounds)
+    return jobs
+
+class SyncWorker:
+    """Claims and runs sync jobs until stopped (or, with once, until none are runnable)"""
+
+    def __init__(self, worker_id=None, kinds=None, lease_seconds=LEASE_SECONDS, cache=None):
+        self.worker_id = worker_id or default_worker_id()
+        self.kinds = list(kinds) if kinds else None
+        self.lease_seconds = lease_seconds
+        self.stop_event = threading.Event()
+        sync_cache.enable_cache(cache)
+        self.counts = Counter()
+
+        self.projects = clockify.ProjectContext()
+
+    def claim(self, limit=1):
+        return get_supabase().rpc('claim_sync_jobs', {
+            'p_worker': self.worker_id,
+            'p_limit': limit,
+            'p_lease_seconds': self.lease_seconds,
+            'p_kinds': self.kinds,
+        }).execute().data or []
+
+    def run_clockify_user_window(self, payload, lease):
+        project_names, project_client_map = self.projects.get()
+        stats = clockify.new_sync_stats()
+        entries_found = 0
+        fetch_status = {}
+        fetched_ids = set()
+        window_start, window_end = datetime.fromisoformat(payload['start']), datetime.fromisoformat(payload['end'])
+
+        pages = clockify.iter_clockify_time_entry_pages(payload['clockify_user_id'], window_start, window_end,
+                                                        status=fetch_status)
+        while True:
+            lease.check()
+            with phase('fetch_entries'):
+                page, time_entries = next(pages, (None, None))
+            if page is None:
+                break
+            entries_found += len(time_entries)
+            fetched_ids.update(entry['id'] for entry in time_entries)
+            clockify.process_time_entries(time_entries, payload['internal_user_id'], project_names,
+                                          project_client_map, stats)
+
+        if payload.get('reconcile'):
+            # An incomplete fetch would make unseen entries look deleted; retry the job instead
+            if not fetch_status.get('complete'):
+                raise RuntimeError("Clockify fetch incomplete, not reconciling deletions")
+            lease.check()
+            clockify.reconcile_deleted_entries(payload['internal_user_id'], window_start, window_end, fetched_ids,
+                                               fetch_status['started_at'], payload['reconcile'], stats)
+
+        if stats['touched_dates']:
+            with phase('refresh_rollup'):
+                clockify.refresh_daily_rollup(stats['touched_dates'])
+
+        # Entries skipped for a reason other than no hours are failed writes; retry the job
+        failed = stats['skipped'] - stats['skip_reasons']['no_hours']
+        if failed > 0:
+            raise RuntimeError(f"{failed} time entries failed to write")
+
+        log.info(f"   {payload['user_name']} {payload['start']}..{payload['end']}: {entries_found} entries, "
+                 f"synced {stats['synced']} (skipped {stats['skipped']})",
+                 user=payload['user_name'], window=[payload['start'], payload['end']], entries=entries_found,
+                 synced=stats['synced'], skipped=stats['skipped'])
+        return {'entries': entries_found, 'stats': dict(stats, touched_dates=sorted(stats['touched_dates']))}
+
+    def run_monday_board(self, payload, lease):
+        clients_synced, sprints_synced = monday.sync_board(payload['region'], payload['board_id'])
+        lease.check()
+        clients_reassigned, entries_reassigned = monday.reassign_pending_sprint_changes()
+        return {'clients': clients_synced, 'sprints': sprints_synced,
+                'clients_reassigned': clients_reassigned, 'entries_reassigned': entries_reassigned}
+
+    def run_job(self, job):
+        """Run one claimed job and record its outcome; returns the job's new status"""
+        job_id, kind = job['id'], job['kind']
+        log.info(f"\n>> [job {job_id}] {kind} (attempt {job['attempts']}/{job['max_attempts']})",
+                 job_id=job_id, kind=kind, attempt=job['attempts'], payload=job['payload'])
+
+        clockify.refresh_reference_caches()
+        reset_diagnostic_counts()
+        metrics = start_run('clockify' if kind == 'clockify_user_window' else 'monday',
+                            get_supabase(), get_http(), log_running=False)
+        try:
+            with JobLease(job_id, self.worker_id, self.lease_seconds) as lease:
+                result = getattr(self, f'run_{kind}')(job['payload'], lease)
+                lease.check()
+        except Exception as e:
+            finish_run()
+            error_msg = f"{type(e).__name__}: {e}"
+            log.error(f"[job {job_id}] failed: {error_msg}", exc_info=not isinstance(e, LeaseLost),
+                      job_id=job_id, kind=kind, error=error_msg)
+            status = None
+            if not isinstance(e, LeaseLost):
+                status = get_supabase().rpc('fail_sync_job', {
+                    'p_id': job_id, 'p_worker': self.worker_id, 'p_error': error_msg
+                }).execute().data
+            status = status or 'lost'
+            self.counts[status] += 1
+            if status == 'dead':
+                log.error(f"[job {job_id}] dead-lettered after {job['attempts']} attempts", job_id=job_id, kind=kind)
+            return status
+
+        finish_run()
+        result.update(metrics=metrics.to_dict(), diagnostics=diagnostic_counts(), worker=self.worker_id)
+        completed = get_supabase().rpc('complete_sync_job', {
+            'p_id': job_id, 'p_worker': self.worker_id, 'p_result': result
+        }).execute().data
+        status = 'done' if completed else 'lost'
+        self.counts[status] += 1
+        log.info(f">> [job {job_id}] {status} in {metrics.duration:.1f}s", job_id=job_id, kind=kind, status=status,
+                 duration_seconds=round(metrics.duration, 1))
+        return status
+
+    def run_forever(self, once=False):
+        log.info(f">> Sync worker {self.worker_id} started" + (f" (kinds: {', '.join(self.kinds)})" if self.kinds else ""),
+                 worker=self.worker_id, kinds=self.kinds)
+
+        while not self.stop_event.is_set():
+            try:
+                jobs = self.claim()
+            except Exception as e:
+                log.error(f"Could not claim jobs: {e}", error=str(e))
+                jobs = []
+            for job in jobs:
+                self.run_job(job)
+            if not jobs:
+                if once:
+                    break
+                self.stop_event.wait(POLL_SECONDS)
+
+        log.info(f">> Sync worker {self.worker_id} stopped: " + (
+            ", ".join(f"{count} {status}" for status, count in sorted(self.counts.items())) or "no jobs"
+        ), worker=self.worker_id, counts=dict(self.counts))
+
+    def stop(self, *args):
+        log.info(">> Stopping after the current job...")
+        self.stop_event.set()
+
+def print_status(batch=None):
+    """Job counts per batch, kind and status, totals of finished Clockify jobs, and dead jobs' errors"""
+    rows = fetch_all_rows('sync_jobs', 'id, kind, batch, status, attempts, locked_by, lease_until, last_error, result')
+    if batch:
+        rows = [row for row in rows if row['batch'] == batch]
+    if not rows:
+        print("No sync jobs" + (f" in batch {batch}" if batch else ""))
+        return
+
+    by_batch = defaultdict(list)
+    for row in rows:
+        by_batch[row['batch'] or '-'].append(row)
+
+    for name, jobs in by_batch.items():
+        print(f"\n== Batch {name}")
+        for kind in JOB_KINDS:
+            counts = Counter(job['status'] for job in jobs if job['kind'] == kind)
+            if counts:
+                print(f"   {kind}: " + ", ".join(f"{counts[s]} {s}" for s in ('queued', 'running', 'done', 'dead') if counts[s]))
+
+        synced = sum(((job['result'] or {}).get('stats') or {}).get('synced', 0) for job in jobs if job['status'] == 'done')
+        if synced:
+            print(f"   Time entries synced: {synced}")
+        for job in jobs:
+            if job['status'] == 'running':
+                print(f"   [running] job {job['id']} on {job['locked_by']}, lease until {job['lease_until']}")
+            elif job['status'] == 'dead':
+                print(f"   [dead] job {job['id']} ({job['kind']}, {job['attempts']} attempts): {job['last_error']}")
+
+def requeue_dead(batch=None):
+    """Put dead-lettered jobs back in the queue with their attempts reset"""
+    query = get_supabase().table('sync_jobs').update({
+        'status': 'queued',
+        'attempts': 0,
+        'run_after': datetime.now(timezone.utc).isoformat(),
+        'finished_at': None,
+    }).eq('status', 'dead')
+    if batch:
+        query = query.eq('batch', batch)
+    requeued = query.execute().data or []
+    print(f"Requeued {len(requeued)} dead jobs")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Queue sync work as jobs and run workers that drain the queue')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = commands.add_parser('enqueue', help='Add Monday board and/or Clockify user-window jobs')
+    enqueue_parser.add_argument('--monday', action='store_true', help='One job per configured Monday board')
+    enqueue_parser.add_argument('--days', type=int, help='One job per Clockify user for this many days of history')
+    enqueue_parser.add_argument('--windows', type=int, default=1,
+                                help='--days: date windows per user, so large users spread over workers (default: 1)')
+    enqueue_parser.add_argument('--reconcile', choices=clockify.RECONCILE_MODES,
+                                help='--days: jobs also report, archive or delete stored entries Clockify no longer returns')
+    enqueue_parser.add_argument('--batch', help='Batch name to group the jobs under (default: enqueue time)')
+
+    work_parser = commands.add_parser('work', help='Claim and run jobs')
+    work_parser.add_argument('--once', action='store_true', help='Exit when no job is runnable')
+    work_parser.add_argument('--kinds', nargs='+', choices=JOB_KINDS, help='Only run these kinds of job')
+    work_parser.add_argument('--lease', type=int, default=LEASE_SECONDS,
+                             help=f'Lease seconds per claimed job (default: {LEASE_SECONDS})')
+    work_parser.add_argument('--worker-id', help='Name of this worker in sync_jobs.locked_by (default: host:pid)')
+    add_mirror_argument(work_parser)
+
+    for name in ('status', 'requeue-dead'):
+        command_parser = commands.add_parser(name)
+        command_parser.add_argument('--batch', help='Only this batch')
+
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    clockify.load_settings()
+    monday.load_settings()
+    configure_from_args(args)
+
+    if not all([os.getenv('SUPABASE_URL'), os.getenv('SUPABASE_SERVICE_ROLE_KEY')]):
+        log.error("Missing required environment variables\nRequired: SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
+        exit(1)
+
+    if args.command == 'enqueue':
+        if not args.monday and not args.days:
+            enqueue_parser.error('give --monday and/or --days')
+        if args.monday:
+            enqueue(monday_board_jobs(), args.batch or new_batch_name('monday'))
+        if args.days:
+            enqueue(clockify_user_window_jobs(args.days, args.windows, args.reconcile),
+                    args.batch or new_batch_name('clockify'))
+
+    elif args.command == 'work':
+        mirror_path = mirror_path_from_args(args)
+        worker = SyncWorker(args.worker_id, args.kinds, args.lease,
+                            cache=MirrorCache(SyncMirror(mirror_path)) if mirror_path else None)
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        worker.run_forever(once=args.once)
+        exit(1 if worker.counts['dead'] else 0)
+
+    elif args.command == 'status':
+        print_status(args.batch)
+
+    else:
+        requeue_dead(args.batch)
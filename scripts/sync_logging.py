@@ -0,0 +1,211 @@
+"""
+Leveled, structured logging for the sync scripts.
+
+    log = get_logger('clockify')
+    log.info("Processing user", user=name)
+    log.warning("Could not map project", project=name, error=str(e))
+
+Per-entry diagnostics (an entry without a sprint, a sprint without dates, ...) are
+counted rather than printed one by one; diagnostic_counts() gives the totals for
+the run summary. A sample of them, the ones for selected clients, or all of them
+at DEBUG level can still be logged:
+
+    log.diagnostic('no_sprint', "No sprint for {project} on {entry_date}",
+                   client=(client_id, project), project=project, entry_date=day)
+
+The message template is only formatted when the record is actually emitted.
+
+Configuration (environment, or the sync scripts' --log-* / --debug-client flags):
+    SYNC_LOG_LEVEL       DEBUG, INFO (default), WARNING or ERROR
+    SYNC_LOG_FORMAT      text (default) or json - one JSON object per line
+    SYNC_LOG_SAMPLE      fraction of per-entry diagnostics to log (default 0: counted only)
+    SYNC_DEBUG_CLIENTS   comma-separated client ids or names whose debug detail is
+                         logged at INFO regardless of level ('*' for every client)
+"""
+
+import os
+import sys
+import json
+import random
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+ROOT_LOGGER = 'sync'
+
+_config = {
+    'configured': False,
+    'sample_rate': 0.0,
+    'debug_clients': frozenset(),
+}
+
+_counts = Counter()
+_counts_lock = threading.Lock()
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever sys.stdout is at the time (the benchmarks redirect it per run)"""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+class TextFormatter(logging.Formatter):
+    """The message as written, with the level in front of warnings and errors"""
+
+    def format(self, record):
+        message = record.getMessage()
+        if record.levelno >= logging.WARNING:
+            indent = message[:len(message) - len(message.lstrip())]
+            message = f"{indent}{record.levelname}: {message.lstrip()}"
+        if record.exc_info:
+            message += '\n' + self.formatException(record.exc_info)
+        return message
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: ts, level, logger, msg and the record's fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage().strip(),
+            **getattr(record, 'fields', {})
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def configure_logging(level=None, json_output=None, sample_rate=None, debug_clients=None):
+    """Set up the 'sync' logger; arguments left as None fall back to the SYNC_LOG_* environment"""
+    if level is None:
+        level = os.getenv('SYNC_LOG_LEVEL', 'INFO')
+    if json_output is None:
+        json_output = os.getenv('SYNC_LOG_FORMAT', 'text').lower() == 'json'
+    if sample_rate is None:
+        sample_rate = float(os.getenv('SYNC_LOG_SAMPLE') or 0)
+    if debug_clients is None:
+        debug_clients = [c for c in os.getenv('SYNC_DEBUG_CLIENTS', '').split(',') if c.strip()]
+
+    handler = _StdoutHandler()
+    handler.setFormatter(JsonFormatter() if json_output else TextFormatter())
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.propagate = False
+
+    _config['sample_rate'] = sample_rate
+    _config['debug_clients'] = frozenset(str(c).strip().lower() for c in debug_clients)
+    _config['configured'] = True
+
+def logging_config():
+    """configure_logging() arguments reproducing the current setup (for worker processes)"""
+    root = logging.getLogger(ROOT_LOGGER)
+    return {
+        'level': root.level or logging.INFO,
+        'json_output': any(isinstance(h.formatter, JsonFormatter) for h in root.handlers),
+        'sample_rate': _config['sample_rate'],
+        'debug_clients': sorted(_config['debug_clients']),
+    }
+
+def add_logging_arguments(parser):
+    """The --log-* and --debug-client flags shared by the sync entry points"""
+    parser.add_argument('--log-level', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='Log level (default: SYNC_LOG_LEVEL or INFO)')
+    parser.add_argument('--log-json', action='store_true', default=None,
+                        help='Log one JSON object per line (default: SYNC_LOG_FORMAT)')
+    parser.add_argument('--log-sample', type=float,
+                        help='Fraction of per-entry diagnostics to log, e.g. 0.01 (default: counted only)')
+    parser.add_argument('--debug-client', action='append',
+                        help='Log debug detail for this client id or name (repeatable, * for all)')
+
+def configure_from_args(args):
+    configure_logging(
+        level=args.log_level,
+        json_output=args.log_json,
+        sample_rate=args.log_sample,
+        debug_clients=args.debug_client
+    )
+
+def diagnostic_counts():
+    """Diagnostics counted since the last reset_diagnostic_counts()"""
+    with _counts_lock:
+        return dict(_counts)
+
+def reset_diagnostic_counts():
+    with _counts_lock:
+        _counts.clear()
+
+def add_diagnostic_counts(counts):
+    """Add diagnostics counted elsewhere (a worker process) to this process's totals"""
+    with _counts_lock:
+        _counts.update(counts)
+
+class SyncLogger:
+    """Thin wrapper over a logging.Logger that takes structured fields as keyword arguments"""
+
+    def __init__(self, name):
+        self._logger = logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+    def is_enabled(self, level):
+        return self._logger.isEnabledFor(level)
+
+    def log(self, level, msg, exc_info=False, **fields):
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, msg, exc_info=exc_info, extra={'fields': fields})
+
+    def debug(self, msg, **fields):
+        self.log(logging.DEBUG, msg, **fields)
+
+    def info(self, msg, **fields):
+        self.log(logging.INFO, msg, **fields)
+
+    def warning(self, msg, **fields):
+        self.log(logging.WARNING, msg, **fields)
+
+    def error(self, msg, exc_info=False, **fields):
+        self.log(logging.ERROR, msg, exc_info=exc_info, **fields)
+
+    def is_debug_client(self, client):
+        """Whether client (an id or name, or a tuple of them) was selected with SYNC_DEBUG_CLIENTS"""
+        selected = _config['debug_clients']
+        if not selected or client is None:
+            return False
+        if '*' in selected:
+            return True
+        keys = client if isinstance(client, (tuple, list)) else (client,)
+        return any(key is not None and str(key).lower() in selected for key in keys)
+
+    def diagnostic(self, kind, template, client=None, **fields):
+        """
+        Count one per-entry diagnostic and log it if the client is selected for
+        debugging (INFO), it's sampled (INFO) or DEBUG is enabled
+        """
+        with _counts_lock:
+            _counts[kind] += 1
+
+        if self.is_debug_client(client):
+            level = logging.INFO
+        elif _config['sample_rate'] and random.random() < _config['sample_rate']:
+            level = logging.INFO
+            fields['sampled'] = True
+        else:
+            level = logging.DEBUG
+
+        if self._logger.isEnabledFor(level):
+            self._logger.log(level, template.format(**fields), extra={'fields': {'diagnostic': kind, **fields}})
+
+def get_logger(name):
+    """Logger for one sync source; configures from the environment on first use"""
+    if not _config['configured']:
+        configure_logging()
+    return SyncLogger(name)
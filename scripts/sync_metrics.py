@@ -0,0 +1,354 @@
+"""
+Per-run timing and call-count instrumentation for the sync scripts.
+
+A SyncMetrics object collects, for one sync run:
+- real start/end times
+- time spent per phase (fetch users, fetch entries, write, ...); phases that run
+  once per user or per batch accumulate
+- external API calls and bytes received (requests.Session response hook)
+- Supabase (PostgREST) calls and bytes received (httpx event hooks on the client)
+
+log_sync() in each sync script stores to_dict() in sync_logs.metrics
+(database/migrations/add_sync_logs_metrics.sql), and
+check_sync_logs.py --chart draws it.
+
+Each run also gets its sync_logs row at the start, with status 'running'. Progress
+reported through update_progress()/increment_progress() is written to that row's
+progress column (at most every HEARTBEAT_INTERVAL seconds, with heartbeat_at), and
+write_sync_log() finalizes the same row with success or error
+(database/migrations/add_sync_logs_progress.sql). save_checkpoint() writes a resume
+point into progress right away (sync_checkpoint).
+
+Usage:
+    metrics = start_run('clockify', supabase, http)
+    with phase('fetch_users'):
+        ...
+    increment_progress(rows_written=len(rows))
+    finish_run()
+    write_sync_log(supabase, 'clockify', 'success', n, metrics=metrics)
+"""
+
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import sync_exporter
+from sync_logging import get_logger
+
+log = get_logger('metrics')
+
+# The run being measured; phase() and progress updates are no-ops when nothing is running
+_active_run = None
+
+# Minimum seconds between progress updates to the running sync_logs row
+HEARTBEAT_INTERVAL = 15
+
+class SyncMetrics:
+    """Timing and call counts for one sync run"""
+
+    def __init__(self, source):
+        self.source = source
+        self.started_at = datetime.now(timezone.utc)
+        self.ended_at = None
+        self._started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.api_calls = 0
+        self.api_bytes = 0
+        self.api_errors = 0
+        self.db_calls = 0
+        self.db_bytes = 0
+        self._unhooks = []
+        # Phases and progress may be updated from worker threads (sync_clockify_async)
+        self._lock = threading.Lock()
+
+        # Running sync_logs row (see open_log)
+        self.log_id = None
+        self.progress = {}
+        self._client = None
+        self._last_heartbeat = 0.0
+
+        # Set by start_run(profile=True)
+        self.profiler = None
+
+    @contextmanager
+    def phase(self, name):
+        """Add the time spent in the block to the named phase"""
+        if self.profiler:
+            self.profiler.phase_started(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.phases[name] += elapsed
+            if self.profiler:
+                self.profiler.phase_finished(name)
+
+    def record_api_response(self, response, *args, **kwargs):
+        """requests response hook: count an external API call (also takes a read httpx response)"""
+        self.api_calls += 1
+        self.api_bytes += len(response.content)
+        if response.status_code >= 400:
+            self.api_errors += 1
+        sync_exporter.record_api_response(self.source, response)
+
+    def record_db_request(self, request):
+        self.db_calls += 1
+
+    def record_db_response(self, response):
+        # The body isn't read yet when httpx calls the hook; PostgREST sends Content-Length
+        self.db_bytes += int(response.headers.get('content-length', 0))
+
+    def instrument_session(self, session):
+        """Count requests made through a requests.Session"""
+        hooks = session.hooks['response']
+        hooks.append(self.record_api_response)
+        self._unhooks.append(lambda: hooks.remove(self.record_api_response))
+
+    def instrument_supabase(self, client):
+        """Count PostgREST requests (tables and RPCs) made through a supabase-py client"""
+        try:
+            event_hooks = client.postgrest.session.event_hooks
+        except AttributeError:
+            log.warning("Could not instrument Supabase client; DB calls won't be counted")
+            return
+
+        event_hooks['request'].append(self.record_db_request)
+        event_hooks['response'].append(self.record_db_response)
+
+        def unhook():
+            event_hooks['request'].remove(self.record_db_request)
+            event_hooks['response'].remove(self.record_db_response)
+        self._unhooks.append(unhook)
+
+    def open_log(self, client):
+        """Insert this run's sync_logs row with status 'running'; later heartbeats update it"""
+        self._client = client
+        row = {
+            'source': self.source,
+            'sync_start': self.started_at.isoformat(),
+            'status': 'running',
+            'records_synced': 0,
+        }
+
+        try:
+            try:
+                response = client.table('sync_logs').insert({
+                    **row,
+                    'progress': {},
+                    'heartbeat_at': self.started_at.isoformat()
+                }).execute()
+            except Exception:
+                # progress/heartbeat_at missing (migration not applied) - still mark the run as running
+                response = client.table('sync_logs').insert(row).execute()
+            self.log_id = response.data[0]['id']
+            self._last_heartbeat = time.perf_counter()
+        except Exception as e:
+            log.warning(f"Failed to log sync start: {e}", source=self.source, error=str(e))
+
+    def update_progress(self, **fields):
+        """Set progress fields (users_total, users_done, ...) and heartbeat if due"""
+        with self._lock:
+            self.progress.update(fields)
+        self._maybe_heartbeat()
+
+    def increment_progress(self, **counts):
+        """Add to progress counters (pages_fetched, rows_written, ...) and heartbeat if due"""
+        with self._lock:
+            for name, count in counts.items():
+                self.progress[name] = self.progress.get(name, 0) + count
+        self._maybe_heartbeat()
+
+    def save_checkpoint(self, checkpoint):
+        """Store a resume point (sync_checkpoint) in progress and write it to the running row now"""
+        with self._lock:
+            self.progress['checkpoint'] = checkpoint
+        # Heartbeats are switched off after a failed write (see heartbeat)
+        if self._last_heartbeat != float('inf'):
+            self.heartbeat()
+
+    def progress_snapshot(self):
+        """Progress plus elapsed time, throughput and (when users_total is known) an ETA"""
+        elapsed = self.duration
+        with self._lock:
+            progress = dict(self.progress)
+        snapshot = {**progress, 'elapsed_seconds': round(elapsed, 1)}
+
+        if elapsed and progress.get('rows_written'):
+            snapshot['rows_per_second'] = round(progress['rows_written'] / elapsed, 1)
+
+        done = progress.get('users_done')
+        total = progress.get('users_total')
+        if done and total:
+            snapshot['eta_seconds'] = round(elapsed / done * (total - done), 1)
+
+        return snapshot
+
+    def _maybe_heartbeat(self):
+        if self.log_id and time.perf_counter() - self._last_heartbeat >= HEARTBEAT_INTERVAL:
+            self.heartbeat()
+
+    def heartbeat(self):
+        """Write current progress to the running sync_logs row"""
+        if not self.log_id:
+            return
+
+        self._last_heartbeat = time.perf_counter()
+        try:
+            self._client.table('sync_logs').update({
+                'progress': self.progress_snapshot(),
+                'heartbeat_at': datetime.now(timezone.utc).isoformat(),
+                'records_synced': self.progress.get('rows_written', 0)
+            }).eq('id', self.log_id).execute()
+        except Exception as e:
+            # Don't retry every progress update against a table without the columns
+            log.warning(f"Failed to write sync heartbeat, disabling heartbeats: {e}", error=str(e))
+            self._last_heartbeat = float('inf')
+
+    def finish(self):
+        if self.ended_at is None:
+            self.ended_at = datetime.now(timezone.utc)
+            for unhook in self._unhooks:
+                unhook()
+            self._unhooks = []
+
+            if self.profiler:
+                output_dir = self.profiler.stop(self)
+                log.info(f"\n>> Profile written to {output_dir}", path=str(output_dir))
+
+    @property
+    def duration(self):
+        if self.ended_at is not None:
+            return (self.ended_at - self.started_at).total_seconds()
+        return time.perf_counter() - self._started
+
+    def merge(self, other):
+        """Add another run's phase times and call counts (a to_dict() from a worker process)"""
+        with self._lock:
+            for name, seconds in other.get('phases', {}).items():
+                self.phases[name] += seconds
+        for name in ('api_calls', 'api_bytes', 'api_errors', 'db_calls', 'db_bytes'):
+            setattr(self, name, getattr(self, name) + other.get(name, 0))
+
+    def to_dict(self):
+        """JSON-serialisable summary, as stored in sync_logs.metrics"""
+        return {
+            'duration_seconds': round(self.duration, 3),
+            'phases': {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            'api_calls': self.api_calls,
+            'api_bytes': self.api_bytes,
+            'api_errors': self.api_errors,
+            'db_calls': self.db_calls,
+            'db_bytes': self.db_bytes,
+        }
+
+def start_run(source, supabase_client=None, http_session=None, log_running=True, profile=False, profile_dir=None):
+    """
+    Begin measuring a sync run; instruments the given clients until finish_run().
+    With a Supabase client and log_running, the run's 'running' sync_logs row is
+    inserted now. profile=True also runs cProfile and per-phase tracemalloc
+    (sync_profiler) and writes the artifacts when the run finishes.
+    """
+    global _active_run
+
+    if _active_run is not None:
+        _active_run.finish()
+
+    _active_run = SyncMetrics(source)
+    if http_session is not None:
+        _active_run.instrument_session(http_session)
+    if supabase_client is not None:
+        _active_run.instrument_supabase(supabase_client)
+        if log_running:
+            _active_run.open_log(supabase_client)
+    if profile:
+        from sync_profiler import SyncProfiler
+        _active_run.profiler = SyncProfiler(source, profile_dir)
+        _active_run.profiler.start()
+    return _active_run
+
+def finish_run():
+    """Stop measuring and return the finished run (or None)"""
+    global _active_run
+
+    metrics = _active_run
+    _active_run = None
+    if metrics is not None:
+        metrics.finish()
+    return metrics
+
+def active_run():
+    return _active_run
+
+@contextmanager
+def phase(name):
+    """Time a block against the active run's phase; no-op outside a run"""
+    if _active_run is None:
+        yield
+        return
+
+    with _active_run.phase(name):
+        yield
+
+def update_progress(**fields):
+    """SyncMetrics.update_progress on the active run; no-op outside a run"""
+    if _active_run is not None:
+        _active_run.update_progress(**fields)
+
+def increment_progress(**counts):
+    """SyncMetrics.increment_progress on the active run; no-op outside a run"""
+    if _active_run is not None:
+        _active_run.increment_progress(**counts)
+
+def save_checkpoint(checkpoint):
+    """SyncMetrics.save_checkpoint on the active run; no-op outside a run"""
+    if _active_run is not None:
+        _active_run.save_checkpoint(checkpoint)
+
+def record_api_response(response):
+    """Count an external API response on the active run, for clients without requests hooks (httpx)"""
+    if _active_run is not None:
+        _active_run.record_api_response(response)
+
+def write_sync_log(client, source, status, records_synced=0, error_message=None, metrics=None):
+    """
+    Finalize a sync run in sync_logs. Updates the run's 'running' row if it has one,
+    otherwise inserts a new row. Columns added by later migrations (metrics,
+    progress, heartbeat_at) are dropped if the table doesn't have them yet.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    row = {
+        'source': source,
+        'sync_start': metrics.started_at.isoformat() if metrics else now,
+        'sync_end': metrics.ended_at.isoformat() if metrics and metrics.ended_at else now,
+        'status': status,
+        'records_synced': records_synced,
+        'error_message': error_message
+    }
+    extra = {}
+    if metrics:
+        extra = {
+            'metrics': metrics.to_dict(),
+            'progress': metrics.progress_snapshot(),
+            'heartbeat_at': now
+        }
+
+    def write(values):
+        if metrics and metrics.log_id:
+            client.table('sync_logs').update(values).eq('id', metrics.log_id).execute()
+        else:
+            client.table('sync_logs').insert(values).execute()
+
+    try:
+        if extra:
+            try:
+                write({**row, **extra})
+                return
+            except Exception as e:
+                log.warning(f"Failed to log sync metrics: {e}", source=source, error=str(e))
+        write(row)
+    except Exception as e:
+        log.warning(f"Failed to log sync status: {e}", source=source, error=str(e))
@@ -0,0 +1,354 @@
+"""
+Local SQLite mirror of the reference tables, plus a compact index of time_entries.
+
+    python scripts/sync_mirror.py                    # create, or refresh incrementally
+    python scripts/sync_mirror.py --full             # rebuild from scratch
+    python scripts/sync_mirror.py --stats            # row counts and high-water marks, no refresh
+    python scripts/sync_mirror.py --sql "SELECT client_id, COUNT(*) FROM time_entries WHERE sprint_id IS NULL GROUP BY 1"
+
+Mirrored (default file: mirror/reference.sqlite, or SYNC_MIRROR_PATH):
+    users              id, email, name, monday_person_id
+    clients            id, name, campaign_start_date, region, is_active
+    sprints            id, client_id, name, start_date, end_date, sprint_number
+    clockify_projects  clockify_id, name, client_id
+    time_entries       clockify_id, user_id, client_id, sprint_id, entry_date, hours, fingerprint
+
+fingerprint is a hash of the columns the Clockify sync writes
+(time_entry_fingerprint), so an entry can be compared with what's stored
+without keeping descriptions locally.
+
+A refresh only downloads rows whose updated_at is at or after the table's
+high-water mark, less REFRESH_OVERLAP (the sync sets updated_at on time entries
+it writes, and the update_*_updated_at triggers set it on every update). Deletes
+don't move updated_at: when the local and remote row counts differ afterwards,
+the key sets are compared and the difference is fetched or deleted.
+
+With --mirror, the Clockify sync and sync_daemon.py refresh the mirror when they
+start a run and read it through sync_cache (MirrorCache):
+- user, project and sprint lookups read the mirrored tables
+- entries without a mapped project take their stored client_id from the index
+- entries whose fingerprint matches the index aren't written again
+debug/debug_sprint_assignment.py --mirror and the transform benchmarks read the
+file directly, without network access.
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timedelta, timezone
+
+import sync_cache
+from sync_cache import WarmCache, fetch_all_rows, PAGE_SIZE
+from sync_clients import get_supabase
+from sync_logging import get_logger
+
+log = get_logger('mirror')
+
+DEFAULT_MIRROR_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'mirror', 'reference.sqlite')
+
+# Refreshes start this far before the high-water mark, for rows committed late
+# or stamped by a client clock that runs behind
+REFRESH_OVERLAP = timedelta(minutes=10)
+
+# Keys per IN (...) filter, remote and local
+KEY_CHUNK_SIZE = 200
+
+# table -> (key column, local columns); the order is refresh order
+MIRROR_TABLES = {
+    'users': ('id', ('id', 'email', 'name', 'monday_person_id', 'updated_at')),
+    'clients': ('id', ('id', 'name', 'campaign_start_date', 'region', 'is_active', 'updated_at')),
+    'sprints': ('id', ('id', 'client_id', 'name', 'start_date', 'end_date', 'sprint_number', 'updated_at')),
+    'clockify_projects': ('clockify_id', ('clockify_id', 'name', 'client_id', 'updated_at')),
+    'time_entries': ('clockify_id', ('clockify_id', 'user_id', 'client_id', 'sprint_id', 'entry_date', 'hours',
+                                     'fingerprint', 'updated_at')),
+}
+
+# Columns fetched for the time_entries index; the fingerprinted ones aren't stored
+TIME_ENTRY_REMOTE_COLUMNS = ('clockify_id, user_id, client_id, sprint_id, entry_date, hours, description, '
+                             'task_category, project_name, tags, updated_at')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY, email TEXT, name TEXT, monday_person_id INTEGER, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS clients (
+    id TEXT PRIMARY KEY, name TEXT, campaign_start_date TEXT, region TEXT, is_active INTEGER, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS sprints (
+    id TEXT PRIMARY KEY, client_id TEXT, name TEXT, start_date TEXT, end_date TEXT, sprint_number INTEGER,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS sprints_client_dates ON sprints (client_id, start_date, end_date);
+CREATE TABLE IF NOT EXISTS clockify_projects (
+    clockify_id TEXT PRIMARY KEY, name TEXT, client_id TEXT, updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS time_entries (
+    clockify_id TEXT PRIMARY KEY, user_id TEXT, client_id TEXT, sprint_id TEXT, entry_date TEXT, hours REAL,
+    fingerprint TEXT, updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS time_entries_client_date ON time_entries (client_id, entry_date);
+CREATE TABLE IF NOT EXISTS mirror_meta (
+    table_name TEXT PRIMARY KEY, high_water TEXT, refreshed_at TEXT
+);
+"""
+
+def time_entry_fingerprint(row):
+    """Hash of the time_entries columns the Clockify sync writes (a row it built, or one read back)"""
+    values = [
+        row.get('user_id'), row.get('client_id'), row.get('sprint_id'), row.get('entry_date'),
+        f"{float(row.get('hours') or 0):.4f}", row.get('description') or '', row.get('task_category'),
+        row.get('project_name'), sorted(row.get('tags') or []),
+    ]
+    return hashlib.blake2b(json.dumps(values, separators=(',', ':')).encode(), digest_size=12).hexdigest()
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def fetch_changed_rows(table, columns, key, since):
+    """
+    Rows with updated_at >= since, oldest first. Pages are keyset-paged on
+    (updated_at, key), so rows updated while paging can't shift a row out of a page.
+    """
+    rows = []
+    last = None
+    while True:
+        query = get_supabase().table(table).select(columns)
+        if last is None:
+            query = query.gte('updated_at', since)
+        else:
+            stamp, last_key = last['updated_at'], last[key]
+            query = query.or_(f'updated_at.gt."{stamp}",and(updated_at.eq."{stamp}",{key}.gt."{last_key}")')
+        page = query.order('updated_at').order(key).limit(PAGE_SIZE).execute().data or []
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        last = page[-1]
+
+def remote_count(table, key):
+    response = get_supabase().table(table).select(key, count='exact').limit(1).execute()
+    return response.count or 0
+
+class SyncMirror:
+    """The mirror file: schema, refreshes and reads (one connection, shared across threads)"""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('SYNC_MIRROR_PATH') or DEFAULT_MIRROR_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        with self._lock:
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def query(self, sql, params=()):
+        """Rows of a local query, as dicts"""
+        with self._lock:
+            return [dict(row) for row in self.db.execute(sql, params)]
+
+    def high_water(self, table):
+        rows = self.query('SELECT high_water FROM mirror_meta WHERE table_name = ?', (table,))
+        return rows[0]['high_water'] if rows else None
+
+    def local_count(self, table):
+        return self.query(f'SELECT COUNT(*) AS n FROM {table}')[0]['n']
+
+    def _write_rows(self, table, rows):
+        key, columns = MIRROR_TABLES[table]
+        if table == 'time_entries':
+            rows = [dict(row, fingerprint=time_entry_fingerprint(row)) for row in rows]
+        placeholders = ', '.join('?' for _ in columns)
+        self.db.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+            [tuple(row.get(column) for column in columns) for row in rows]
+        )
+
+    def _set_high_water(self, table, rows, previous):
+        stamps = [parse_timestamp(row['updated_at']) for row in rows if row.get('updated_at')]
+        if previous:
+            stamps.append(parse_timestamp(previous))
+        self.db.execute(
+            'INSERT OR REPLACE INTO mirror_meta (table_name, high_water, refreshed_at) VALUES (?, ?, ?)',
+            (table, max(stamps).isoformat() if stamps else None, datetime.now(timezone.utc).isoformat())
+        )
+
+    def refresh_table(self, table, full=False):
+        """Bring one table up to date; returns how many rows were written or deleted"""
+        key, columns = MIRROR_TABLES[table]
+        remote_columns = TIME_ENTRY_REMOTE_COLUMNS if table == 'time_entries' else ', '.join(columns)
+        previous = None if full else self.high_water(table)
+
+        if previous is None:
+            rows = fetch_all_rows(table, remote_columns, order=(key,))
+        else:
+            since = (parse_timestamp(previous) - REFRESH_OVERLAP).isoformat()
+            rows = fetch_changed_rows(table, remote_columns, key, since)
+
+        with self._lock, self.db:
+            if previous is None:
+                self.db.execute(f'DELETE FROM {table}')
+                changed = len(rows)
+            else:
+                changed = self._count_changed(table, rows)
+            self._write_rows(table, rows)
+            self._set_high_water(table, rows, previous)
+
+        if previous is not None and self.local_count(table) != remote_count(table, key):
+            changed += self.reconcile_table(table)
+        return changed
+
+    def _count_changed(self, table, rows):
+        """Rows that are new or differ locally; the overlap window re-fetches rows the mirror already has"""
+        key = MIRROR_TABLES[table][0]
+        stored = {}
+        keys = [row[key] for row in rows]
+        for i in range(0, len(keys), KEY_CHUNK_SIZE):
+            chunk = keys[i:i + KEY_CHUNK_SIZE]
+            stored.update(self.db.execute(
+                f"SELECT {key}, updated_at FROM {table} WHERE {key} IN ({', '.join('?' for _ in chunk)})", chunk
+            ).fetchall())
+        return sum(1 for row in rows if stored.get(row[key]) != row.get('updated_at'))
+
+    def reconcile_table(self, table):
+        """Fetch rows missing locally and delete rows gone remotely; returns how many"""
+        key, columns = MIRROR_TABLES[table]
+        remote_columns = TIME_ENTRY_REMOTE_COLUMNS if table == 'time_entries' else ', '.join(columns)
+
+        remote_keys = {row[key] for row in fetch_all_rows(table, key, order=(key,))}
+        with self._lock:
+            local_keys = {row[0] for row in self.db.execute(f'SELECT {key} FROM {table}')}
+        missing = sorted(remote_keys - local_keys)
+        deleted = sorted(local_keys - remote_keys)
+
+        rows = []
+        for i in range(0, len(missing), KEY_CHUNK_SIZE):
+            chunk = missing[i:i + KEY_CHUNK_SIZE]
+            rows.extend(get_supabase().table(table).select(remote_columns).in_(key, chunk).execute().data or [])
+
+        with self._lock, self.db:
+            self._write_rows(table, rows)
+            for i in range(0, len(deleted), KEY_CHUNK_SIZE):
+                chunk = deleted[i:i + KEY_CHUNK_SIZE]
+                self.db.execute(f"DELETE FROM {table} WHERE {key} IN ({', '.join('?' for _ in chunk)})", chunk)
+
+        if missing or deleted:
+            log.info(f"   {table}: fetched {len(rows)} missing rows, deleted {len(deleted)}",
+                     table=table, fetched=len(rows), deleted=len(deleted))
+        return len(rows) + len(deleted)
+
+    def refresh(self, full=False, tables=None):
+        """Refresh every table (or the given ones); returns {table: rows written or deleted}"""
+        changed = {}
+        for table in tables or MIRROR_TABLES:
+            changed[table] = self.refresh_table(table, full=full)
+            log.debug(f"   {table}: {changed[table]} rows refreshed", table=table, rows=changed[table])
+        return changed
+
+    def time_entry_index(self, clockify_ids):
+        """{clockify_id: {client_id, sprint_id, fingerprint}} for the ids that are mirrored"""
+        index = {}
+        for i in range(0, len(clockify_ids), KEY_CHUNK_SIZE):
+            chunk = list(clockify_ids[i:i + KEY_CHUNK_SIZE])
+            for row in self.query(
+                'SELECT clockify_id, client_id, sprint_id, fingerprint FROM time_entries '
+                f"WHERE clockify_id IN ({', '.join('?' for _ in chunk)})", chunk
+            ):
+                index[row.pop('clockify_id')] = row
+        return index
+
+    def stats(self):
+        meta = {row['table_name']: row for row in self.query('SELECT * FROM mirror_meta')}
+        return {
+            table: {
+                'rows': self.local_count(table),
+                'high_water': meta.get(table, {}).get('high_water'),
+                'refreshed_at': meta.get(table, {}).get('refreshed_at'),
+            }
+            for table in MIRROR_TABLES
+        }
+
+class MirrorCache(WarmCache):
+    """WarmCache that loads from the mirror file and refreshes it instead of checking versions"""
+
+    def __init__(self, mirror):
+        super().__init__()
+        self.mirror = mirror
+        self.refreshes = 0
+
+    def check_versions(self):
+        """Refresh the mirror and drop tables that changed; returns their names"""
+        changed = {table for table, rows in self.mirror.refresh().items() if rows}
+        self.refreshes += 1
+
+        with self._lock:
+            for table in changed & set(self._tables):
+                self.invalidations[table] += 1
+                self._tables.pop(table)
+        return changed
+
+    def _fetch(self, name):
+        order = 'start_date, id' if name == 'sprints' else MIRROR_TABLES[name][0]
+        return self.mirror.query(f'SELECT {sync_cache.TABLE_COLUMNS[name]} FROM {name} ORDER BY {order}')
+
+    def time_entry_index(self, clockify_ids):
+        return self.mirror.time_entry_index(clockify_ids)
+
+    def status(self):
+        return dict(super().status(), mirror=self.mirror.path, refreshes=self.refreshes,
+                    tables=self.mirror.stats())
+
+def enable_mirror(path=None, refresh=True):
+    """Open the mirror, bring it up to date and make the sync lookups read it"""
+    cache = MirrorCache(SyncMirror(path))
+    if refresh:
+        cache.check_versions()
+    return sync_cache.enable_cache(cache)
+
+def add_mirror_argument(parser):
+    parser.add_argument('--mirror', nargs='?', const=True, default=None, metavar='PATH',
+                        help='Read reference data from the local SQLite mirror, refreshed first '
+                             '(default file: SYNC_MIRROR_PATH or mirror/reference.sqlite)')
+
+def mirror_path_from_args(args):
+    """The --mirror file, or None when the flag wasn't given"""
+    if args.mirror is None:
+        return None
+    return args.mirror if isinstance(args.mirror, str) else (os.getenv('SYNC_MIRROR_PATH') or DEFAULT_MIRROR_PATH)
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    from sync_logging import add_logging_arguments, configure_from_args
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description='Refresh or query the local SQLite mirror of the reference tables')
+    parser.add_argument('--path', help='Mirror file (default: SYNC_MIRROR_PATH or mirror/reference.sqlite)')
+    parser.add_argument('--full', action='store_true', help='Rebuild every table instead of refreshing incrementally')
+    parser.add_argument('--stats', action='store_true', help='Show row counts and high-water marks without refreshing')
+    parser.add_argument('--sql', help='Run a query against the mirror (no refresh) and print the rows as JSON lines')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    configure_from_args(args)
+
+    mirror = SyncMirror(args.path)
+
+    if args.sql:
+        for row in mirror.query(args.sql):
+            print(json.dumps(row, default=str))
+        exit(0)
+
+    if not args.stats:
+        log.info(f">> {'Rebuilding' if args.full else 'Refreshing'} {mirror.path}...", path=mirror.path, full=args.full)
+        changed = mirror.refresh(full=args.full)
+        log.info("   " + ", ".join(f"{table}: {rows}" for table, rows in changed.items()), changed=changed)
+
+    for table, table_stats in mirror.stats().items():
+        log.info(f"   {table:18s} {table_stats['rows']:8d} rows  updated to {table_stats['high_water'] or '-'}",
+                 table=table, **table_stats)
@@ -4,23 +4,29 @@ Sync clients and sprints from Monday.com to Supabase
 This script:
 1. Fetches all board items (clients) and their subitems (sprints) from Monday.com
 2. Parses and transforms the data
-3. Upserts to Supabase clients and sprints tables
-4. Logs sync status
+3. Upserts to Supabase clients and sprints tables, recording sprints whose
+   dates are new or changed in sprint_date_changes
+4. Re-assigns the affected clients' stored time entries over the changed dates
+   (reassign_client_sprints RPC; no Clockify calls)
+5. Logs sync status
 """
 
 import os
 import re
 import json
-import requests
-from datetime import datetime, timezone
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-
-# Load environment variables
-load_dotenv()
-
-# Configuration
+import argparse
+from datetime import date, datetime, timedelta, timezone
+from sync_clients import get_supabase, get_http, load_env
+from sync_cache import active_cache
+from sync_metrics import (
+    start_run, finish_run, phase, update_progress, increment_progress, write_sync_log
+)
+from sync_exporter import record_monday_complexity, export_run
+from sync_logging import (
+    get_logger, add_logging_arguments, configure_from_args, diagnostic_counts, reset_diagnostic_counts
+)
+
+# Configuration (read again by load_settings() once .env is loaded)
 MONDAY_API_KEY = os.getenv('MONDAY_API_KEY')
 MONDAY_BOARD_IDS = {
     'AU': os.getenv('MONDAY_AU_BOARD_ID'),
@@ -30,25 +36,34 @@ MONDAY_BOARD_IDS = {
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
-# Initialize Supabase client (using service role key to bypass RLS)
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+log = get_logger('monday')
+
+def load_settings():
+    """Load .env and re-read the configuration above; entry points call this before syncing"""
+    global MONDAY_API_KEY, MONDAY_BOARD_IDS, SUPABASE_URL, SUPABASE_SERVICE_KEY
+
+    load_env()
+    MONDAY_API_KEY = os.getenv('MONDAY_API_KEY')
+    MONDAY_BOARD_IDS = {
+        'AU': os.getenv('MONDAY_AU_BOARD_ID'),
+        'US': os.getenv('MONDAY_US_BOARD_ID'),
+        'UK': os.getenv('MONDAY_UK_BOARD_ID')
+    }
+    SUPABASE_URL = os.getenv('SUPABASE_URL')
+    SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
 
 # Monday.com API endpoint
 MONDAY_API_URL = 'https://api.monday.com/v2'
 
-def log_sync(source, status, records_synced=0, error_message=None):
-    """Log sync status to sync_logs table"""
-    try:
-        supabase.table('sync_logs').insert({
-            'source': source,
-            'sync_start': datetime.now(timezone.utc).isoformat(),
-            'sync_end': datetime.now(timezone.utc).isoformat(),
-            'status': status,
-            'records_synced': records_synced,
-            'error_message': error_message
-        }).execute()
-    except Exception as e:
-        print(f"Warning: Failed to log sync status: {e}")
+# Entries this many days before a sprint can be assigned to it (PRE_SPRINT_LOOKBACK_DAYS in the Clockify sync)
+SPRINT_LOOKBACK_DAYS = 14
+
+def log_sync(source, status, records_synced=0, error_message=None, metrics=None):
+    """
+    Log sync status to sync_logs table, with timing and call counts if metrics is given.
+    Finalizes the run's 'running' row when start_run() created one.
+    """
+    write_sync_log(get_supabase(), source, status, records_synced, error_message, metrics)
 
 def get_monday_person_id_from_value(value_json):
     """Extract Monday.com person ID from person field JSON"""
@@ -79,12 +94,16 @@ def map_monday_person_to_user(monday_person_id):
     if not monday_person_id:
         return None
 
+    cache = active_cache()
+    if cache:
+        return cache.user_id_for_monday_person(monday_person_id)
+
     try:
-        response = supabase.table('users').select('id').eq('monday_person_id', monday_person_id).execute()
+        response = get_supabase().table('users').select('id').eq('monday_person_id', monday_person_id).execute()
         if response.data and len(response.data) > 0:
             return response.data[0]['id']
     except Exception as e:
-        print(f"Warning: Could not map Monday person {monday_person_id}: {e}")
+        log.warning(f"Could not map Monday person {monday_person_id}: {e}", monday_person_id=monday_person_id, error=str(e))
 
     return None
 
@@ -193,6 +212,11 @@ def fetch_monday_board_data(board_id):
     # First, get the board structure with groups
     initial_query = """
     {
+      complexity {
+        before
+        query
+        after
+      }
       boards(ids: [%s]) {
         name
         groups {
@@ -203,7 +227,7 @@ def fetch_monday_board_data(board_id):
     }
     """ % board_id
 
-    response = requests.post(MONDAY_API_URL, headers=headers, json={'query': initial_query})
+    response = get_http().post(MONDAY_API_URL, headers=headers, json={'query': initial_query})
 
     if response.status_code != 200:
         raise Exception(f"Monday.com API error: {response.status_code} - {response.text}")
@@ -213,6 +237,7 @@ def fetch_monday_board_data(board_id):
     if 'errors' in data:
         raise Exception(f"Monday.com GraphQL errors: {data['errors']}")
 
+    record_monday_complexity(data['data'].get('complexity'))
     board = data['data']['boards'][0]
 
     # Now fetch items for each group with pagination
@@ -226,6 +251,11 @@ def fetch_monday_board_data(board_id):
 
             items_query = """
             {
+              complexity {
+                before
+                query
+                after
+              }
               boards(ids: [%s]) {
                 groups(ids: ["%s"]) {
                   items_page(limit: 100%s) {
@@ -274,18 +304,22 @@ def fetch_monday_board_data(board_id):
             }
             """ % (board_id, group['id'], cursor_param)
 
-            response = requests.post(MONDAY_API_URL, headers=headers, json={'query': items_query})
+            response = get_http().post(MONDAY_API_URL, headers=headers, json={'query': items_query})
 
             if response.status_code != 200:
-                print(f"Warning: Failed to fetch items for group {group['title']}: {response.status_code}")
+                log.warning(f"Failed to fetch items for group {group['title']}: {response.status_code}",
+                            group=group['title'], status=response.status_code)
                 break
 
             page_data = response.json()
 
             if 'errors' in page_data:
-                print(f"Warning: GraphQL errors for group {group['title']}: {page_data['errors']}")
+                log.warning(f"GraphQL errors for group {group['title']}: {page_data['errors']}",
+                            group=group['title'], errors=page_data['errors'])
                 break
 
+            record_monday_complexity(page_data['data'].get('complexity'))
+
             items_page = page_data['data']['boards'][0]['groups'][0]['items_page']
             items = items_page.get('items', [])
 
@@ -293,6 +327,7 @@ def fetch_monday_board_data(board_id):
                 break
 
             group['items_page']['items'].extend(items)
+            increment_progress(pages_fetched=1)
 
             # Check if there are more pages
             cursor = items_page.get('cursor')
@@ -301,98 +336,392 @@ def fetch_monday_board_data(board_id):
 
     return board
 
-def sync_clients_and_sprints():
-    """Main sync function"""
-    print(">> Starting Monday.com sync...")
+def fetch_monday_items(item_ids):
+    """
+    Fetch items or subitems by id, in the shape fetch_monday_board_data() returns
+    items, plus their board and group and, for subitems, the parent item's.
+    Items that no longer exist are missing from the result.
+    """
+    headers = {
+        'Authorization': f'Bearer {MONDAY_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+    column_values = """
+      column_values {
+        id
+        type
+        column {
+          title
+        }
+        value
+        text
+        ... on MirrorValue {
+          display_value
+        }
+        ... on BoardRelationValue {
+          display_value
+        }
+      }
+    """
 
-    total_clients_synced = 0
-    total_sprints_synced = 0
+    items = []
+    # Monday.com takes at most 100 ids per items query
+    for i in range(0, len(item_ids), 100):
+        query = """
+        {
+          complexity {
+            before
+            query
+            after
+          }
+          items(ids: [%s], limit: 100) {
+            id
+            name
+            state
+            board { id }
+            group { title }
+            parent_item {
+              id
+              board { id }
+              group { title }
+            }
+            %s
+            subitems {
+              id
+              name
+              %s
+            }
+          }
+        }
+        """ % (', '.join(str(item_id) for item_id in item_ids[i:i + 100]), column_values, column_values)
 
-    try:
-        # Sync each board (AU, US, UK)
-        for region, board_id in MONDAY_BOARD_IDS.items():
-            if not board_id:
-                print(f"!! Skipping {region} board - no board ID configured")
-                continue
+        response = get_http().post(MONDAY_API_URL, headers=headers, json={'query': query})
 
-            print(f"\n== Syncing {region} board (ID: {board_id})...")
+        if response.status_code != 200:
+            raise Exception(f"Monday.com API error: {response.status_code} - {response.text}")
 
-            try:
-                # Fetch data from Monday.com
-                board_data = fetch_monday_board_data(board_id)
+        data = response.json()
 
-                clients_synced = 0
-                sprints_synced = 0
+        if 'errors' in data:
+            raise Exception(f"Monday.com GraphQL errors: {data['errors']}")
 
-                print(f"   Found {len(board_data['groups'])} groups")
+        record_monday_complexity(data['data'].get('complexity'))
+        items.extend(data['data']['items'] or [])
 
-                # Process each group
-                for group in board_data['groups']:
-                    group_title = group['title']
-                    items = group['items_page']['items']
-                    print(f"\n>> Processing group: {group_title} ({len(items)} items)")
+    return items
 
-                    # Process each item (client)
-                    for item in items:
-                        try:
-                            # Parse client data (pass group_title and region to determine active status)
-                            client_data = parse_client_item(item, group_title, region)
+def upsert_client(item, group_title, region):
+    """Parse one board item and upsert it as a client; returns (client_id, client_data)"""
+    # Parse client data (pass group_title and region to determine active status)
+    with phase('parse_clients'):
+        client_data = parse_client_item(item, group_title, region)
 
-                            # Upsert client
-                            client_result = supabase.table('clients').upsert(
-                                client_data,
-                                on_conflict='monday_item_id'
-                            ).execute()
+    with phase('write_clients'):
+        client_result = get_supabase().table('clients').upsert(
+            client_data,
+            on_conflict='monday_item_id'
+        ).execute()
 
-                            client_id = client_result.data[0]['id']
-                            clients_synced += 1
+    return client_result.data[0]['id'], client_data
 
-                            # Show status indicator
-                            status_indicator = "[ACTIVE]" if client_data.get('is_active', True) else "[INACTIVE]"
-                            print(f"  {status_indicator} Client: {client_data['name']}")
+def upsert_sprint(subitem, client_id, group_title):
+    """Parse one subitem and upsert it as a sprint; returns the sprint data, or None if it has no dates"""
+    with phase('parse_sprints'):
+        sprint_data = parse_sprint_subitem(subitem, client_id, group_title)
 
-                            # Process subitems (sprints)
-                            if 'subitems' in item and item['subitems']:
-                                for subitem in item['subitems']:
-                                    try:
-                                        sprint_data = parse_sprint_subitem(subitem, client_id, group_title)
+    if sprint_data:
+        write_sprint(sprint_data)
+    return sprint_data
 
-                                        if sprint_data:
-                                            supabase.table('sprints').upsert(
-                                                sprint_data,
-                                                on_conflict='monday_subitem_id'
-                                            ).execute()
+def write_sprint(sprint_data):
+    """Upsert parsed sprint data"""
+    with phase('write_sprints'):
+        get_supabase().table('sprints').upsert(
+            sprint_data,
+            on_conflict='monday_subitem_id'
+        ).execute()
 
-                                            sprints_synced += 1
-                                            print(f"    -> Sprint: {sprint_data['name']} (#{sprint_data.get('sprint_number', '?')})")
+def sprint_reassign_range(old, new, neighbours=()):
+    """
+    (start, end) ISO dates whose entries can change sprint or tag when a sprint's
+    dates go from old to new (dicts with start_date and end_date; old is None for
+    a new sprint, new is None for a deleted one).
+
+    neighbours are the client's other sprints (old and new dates). The gaps next
+    to the sprint can change tag too (post_sprint_work, gap_between_sprints,
+    pre_sprint_prep, before_campaign), so the range reaches back to the end of the
+    sprint before it and on to the start of the sprint after it.
+    """
+    sprints = [sprint for sprint in (old, new) if sprint]
+    start = min(sprint['start_date'] for sprint in sprints)
+    end = max(sprint['end_date'] for sprint in sprints)
+    range_start = (date.fromisoformat(start) - timedelta(days=SPRINT_LOOKBACK_DAYS)).isoformat()
+    range_end = end
+
+    previous_ends = [sprint['end_date'] for sprint in neighbours if sprint['start_date'] < start]
+    if previous_ends:
+        range_start = min(range_start, max(previous_ends))
+    next_starts = [sprint['start_date'] for sprint in neighbours if sprint['end_date'] > end]
+    if next_starts:
+        range_end = max(range_end, min(next_starts))
+    return range_start, range_end
+
+def reassign_client_sprints(client_id, start_date=None, end_date=None):
+    """Re-run sprint assignment for a client's stored time entries (reassign_client_sprints RPC); returns entries changed"""
+    return get_supabase().rpc('reassign_client_sprints', {
+        'p_client_id': client_id,
+        'p_start_date': start_date,
+        'p_end_date': end_date,
+        'p_lookback_days': SPRINT_LOOKBACK_DAYS,
+    }).execute().data or 0
+
+def merge_reassign_range(ranges, client_id, start, end):
+    """Widen ranges[client_id] to cover start..end; None means unbounded on that side"""
+    if client_id not in ranges:
+        ranges[client_id] = (start, end)
+        return
+    old_start, old_end = ranges[client_id]
+    ranges[client_id] = (
+        None if old_start is None or start is None else min(old_start, start),
+        None if old_end is None or end is None else max(old_end, end),
+    )
+
+def load_stored_sprint_dates(subitem_ids):
+    """monday_subitem_id (as str) -> stored {start_date, end_date}, for the sprints already stored"""
+    stored = {}
+    # In chunks, to keep the in.(...) filter within URL limits
+    for i in range(0, len(subitem_ids), 200):
+        rows = get_supabase().table('sprints') \
+            .select('monday_subitem_id, start_date, end_date') \
+            .in_('monday_subitem_id', [int(subitem_id) for subitem_id in subitem_ids[i:i + 200]]) \
+            .execute().data or []
+        stored.update({str(row['monday_subitem_id']): row for row in rows})
+    return stored
+
+def sprint_date_change(old, sprint_data, neighbours=()):
+    """The sprint_date_changes row for a new or re-dated sprint, or None if its dates are unchanged"""
+    if old and (old['start_date'], old['end_date']) == (sprint_data['start_date'], sprint_data['end_date']):
+        return None
+    reassign_start, reassign_end = sprint_reassign_range(old, sprint_data, neighbours)
+    return {
+        'client_id': sprint_data['client_id'],
+        'monday_subitem_id': sprint_data['monday_subitem_id'],
+        'sprint_name': sprint_data['name'],
+        'old_start_date': old and old['start_date'],
+        'old_end_date': old and old['end_date'],
+        'new_start_date': sprint_data['start_date'],
+        'new_end_date': sprint_data['end_date'],
+        'reassign_start': reassign_start,
+        'reassign_end': reassign_end,
+    }
 
-                                    except Exception as e:
-                                        print(f"    !! Error syncing sprint {subitem['name']}: {e}")
+def client_sprint_date_changes(sprints, stored_sprints):
+    """
+    sprint_date_changes rows for one client's parsed sprints, a list of sprint
+    data, given the stored dates by monday_subitem_id (as str). Each sprint's
+    neighbours are the client's other sprints, with their stored and new dates.
+    """
+    dates = [(str(sprint['monday_subitem_id']), sprint) for sprint in sprints]
+    dates += [(str(sprint['monday_subitem_id']), stored_sprints[str(sprint['monday_subitem_id'])])
+              for sprint in sprints if str(sprint['monday_subitem_id']) in stored_sprints]
+
+    changes = []
+    for sprint in sprints:
+        subitem_id = str(sprint['monday_subitem_id'])
+        neighbours = [other for other_id, other in dates if other_id != subitem_id]
+        change = sprint_date_change(stored_sprints.get(subitem_id), sprint, neighbours)
+        if change:
+            changes.append(change)
+    return changes
+
+def reassign_pending_sprint_changes():
+    """
+    Re-assign stored time entries for the sprint_date_changes not applied yet:
+    one reassign_client_sprints call per client over the merged ranges of its
+    changes. Returns (clients, entries changed).
+    """
+    pending = []
+    while True:
+        page = get_supabase().table('sprint_date_changes') \
+            .select('id, client_id, reassign_start, reassign_end') \
+            .is_('reassigned_at', 'null') \
+            .gt('id', pending[-1]['id'] if pending else 0) \
+            .order('id') \
+            .limit(1000) \
+            .execute().data or []
+        pending.extend(page)
+        if len(page) < 1000:
+            break
+
+    ranges = {}
+    change_ids = {}
+    for change in pending:
+        merge_reassign_range(ranges, change['client_id'], change['reassign_start'], change['reassign_end'])
+        change_ids.setdefault(change['client_id'], []).append(change['id'])
+
+    total = 0
+    for client_id, (start, end) in ranges.items():
+        try:
+            changed = reassign_client_sprints(client_id, start, end)
+        except Exception as e:
+            # Left pending; the next run retries
+            log.error(f"   Error re-assigning time entries of client {client_id}: {e}", client_id=client_id, error=str(e))
+            continue
+        get_supabase().table('sprint_date_changes').update({
+            'reassigned_at': datetime.now(timezone.utc).isoformat(),
+            'entries_reassigned': changed,
+        }).in_('id', change_ids[client_id]).execute()
+        total += changed
+        log.info(f"   Re-assigned {changed} time entries of client {client_id} ({start} to {end})",
+                 client_id=client_id, start=start, end=end, entries=changed)
+    return len(ranges), total
+
+def sync_board(region, board_id):
+    """Sync one board's clients and sprints; returns (clients_synced, sprints_synced)"""
+    log.info(f"\n== Syncing {region} board (ID: {board_id})...", region=region, board_id=board_id)
+
+    # Fetch data from Monday.com
+    with phase('fetch_board'):
+        board_data = fetch_monday_board_data(board_id)
+
+    clients_synced = 0
+    sprints_synced = 0
+
+    log.info(f"   Found {len(board_data['groups'])} groups", region=region, groups=len(board_data['groups']))
+
+    # Stored sprint dates, to record the sprints whose dates this sync changes
+    with phase('load_sprint_dates'):
+        stored_sprints = load_stored_sprint_dates([
+            subitem['id']
+            for group in board_data['groups']
+            for item in group['items_page']['items']
+            for subitem in item.get('subitems') or []
+        ])
+    date_changes = 0
+
+    # Process each group
+    for group in board_data['groups']:
+        group_title = group['title']
+        items = group['items_page']['items']
+        log.info(f"\n>> Processing group: {group_title} ({len(items)} items)", group=group_title, items=len(items))
+
+        # Process each item (client)
+        for item in items:
+            try:
+                client_id, client_data = upsert_client(item, group_title, region)
+                clients_synced += 1
+                increment_progress(rows_written=1)
+
+                log.diagnostic('client_synced', "  [{status}] Client: {name}",
+                               client=(client_id, client_data['name']),
+                               client_id=client_id, name=client_data['name'],
+                               status='ACTIVE' if client_data.get('is_active', True) else 'INACTIVE')
+
+                # Process subitems (sprints)
+                sprints = []
+                for subitem in item.get('subitems') or []:
+                    try:
+                        with phase('parse_sprints'):
+                            sprint_data = parse_sprint_subitem(subitem, client_id, group_title)
+                        if sprint_data:
+                            sprints.append(sprint_data)
+                    except Exception as e:
+                        log.error(f"    Error syncing sprint {subitem['name']}: {e}",
+                                  sprint=subitem['name'], client=item['name'], error=str(e))
+
+                # Record new and re-dated sprints before writing their dates, so a change
+                # can't be lost once the new dates are stored (if this fails, none are written)
+                changes = client_sprint_date_changes(sprints, stored_sprints)
+                if changes:
+                    with phase('write_sprints'):
+                        get_supabase().table('sprint_date_changes').insert(changes).execute()
+                    date_changes += len(changes)
+
+                for sprint_data in sprints:
+                    try:
+                        write_sprint(sprint_data)
+                        sprints_synced += 1
+                        increment_progress(rows_written=1)
+                        log.diagnostic('sprint_synced', "    -> Sprint: {sprint} (#{sprint_number})",
+                                       client=(client_id, client_data['name']),
+                                       sprint=sprint_data['name'],
+                                       sprint_number=sprint_data.get('sprint_number', '?'))
+
+                    except Exception as e:
+                        log.error(f"    Error syncing sprint {sprint_data['name']}: {e}",
+                                  sprint=sprint_data['name'], client=item['name'], error=str(e))
+
+            except Exception as e:
+                log.error(f"  Error syncing client {item['name']}: {e}", client=item['name'], error=str(e))
 
-                        except Exception as e:
-                            print(f"  !! Error syncing client {item['name']}: {e}")
+    log.info(f"\n== {region} board complete: {clients_synced} clients, {sprints_synced} sprints "
+             f"({date_changes} new or re-dated)",
+             region=region, clients=clients_synced, sprints=sprints_synced, sprint_date_changes=date_changes)
+    return clients_synced, sprints_synced
 
-                print(f"\n== {region} board complete: {clients_synced} clients, {sprints_synced} sprints")
+def sync_clients_and_sprints(profile=False, profile_dir=None, reassign=True):
+    """
+    Main sync function.
+    profile=True writes cProfile and per-phase memory artifacts (sync_profiler).
+    reassign=True re-assigns stored time entries for the sprint date changes the
+    boards recorded (reassign_pending_sprint_changes); False leaves them pending.
+    """
+    log.info(">> Starting Monday.com sync...")
+
+    total_clients_synced = 0
+    total_sprints_synced = 0
+
+    reset_diagnostic_counts()
+    metrics = start_run('monday', get_supabase(), get_http(), profile=profile, profile_dir=profile_dir)
+
+    try:
+        # Sync each board (AU, US, UK)
+        update_progress(boards_total=len([b for b in MONDAY_BOARD_IDS.values() if b]), boards_done=0)
+        for region, board_id in MONDAY_BOARD_IDS.items():
+            if not board_id:
+                log.warning(f"Skipping {region} board - no board ID configured", region=region)
+                continue
+
+            try:
+                clients_synced, sprints_synced = sync_board(region, board_id)
                 total_clients_synced += clients_synced
                 total_sprints_synced += sprints_synced
+                increment_progress(boards_done=1)
 
             except Exception as e:
-                print(f"!! Error syncing {region} board: {e}")
+                log.error(f"Error syncing {region} board: {e}", region=region, error=str(e))
                 continue
 
-        # Log success
-        log_sync('monday', 'success', total_clients_synced + total_sprints_synced)
+        clients_reassigned, entries_reassigned = 0, 0
+        if reassign:
+            log.info("\n>> Re-assigning time entries for sprint date changes...")
+            with phase('reassign_sprints'):
+                clients_reassigned, entries_reassigned = reassign_pending_sprint_changes()
 
-        print(f"\n>> Sync complete!")
-        print(f"   Total clients synced: {total_clients_synced}")
-        print(f"   Total sprints synced: {total_sprints_synced}")
+        # Log success
+        finish_run()
+        log_sync('monday', 'success', total_clients_synced + total_sprints_synced, metrics=metrics)
+        export_run('monday', 'success', total_clients_synced + total_sprints_synced, metrics)
+
+        log.info(
+            f"\n>> Sync complete!\n"
+            f"   Total clients synced: {total_clients_synced}\n"
+            f"   Total sprints synced: {total_sprints_synced}\n"
+            f"   Time entries re-assigned: {entries_reassigned} ({clients_reassigned} clients)\n"
+            f"   Timing: {metrics.duration:.1f}s, {metrics.api_calls} API calls, {metrics.db_calls} DB calls",
+            clients=total_clients_synced, sprints=total_sprints_synced,
+            clients_reassigned=clients_reassigned, entries_reassigned=entries_reassigned,
+            diagnostics=diagnostic_counts(), **metrics.to_dict()
+        )
 
         return True
 
     except Exception as e:
         error_msg = str(e)
-        print(f"\n!! Sync failed: {error_msg}")
-        log_sync('monday', 'error', 0, error_msg)
+        log.error(f"\nSync failed: {error_msg}", exc_info=True, error=error_msg)
+        finish_run()
+        log_sync('monday', 'error', 0, error_msg, metrics=metrics)
+        export_run('monday', 'error', 0, metrics)
         return False
 
 def parse_client_item(item, group_title=None, region=None):
@@ -455,7 +784,8 @@ def parse_sprint_subitem(subitem, client_id, group_title=None):
     end_date = parse_date(columns.get('End Date', {}).get('value'))
 
     if not start_date or not end_date:
-        print(f"      !! Skipping sprint {subitem['name']} - missing dates")
+        log.diagnostic('sprint_missing_dates', "      Skipping sprint {sprint} - missing dates",
+                       client=client_id, sprint=subitem['name'], client_id=client_id)
         return None
 
     # Extract sprint number from Sprint label
@@ -491,13 +821,36 @@ def parse_sprint_subitem(subitem, client_id, group_title=None):
     return {k: v for k, v in sprint_data.items() if v is not None}
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sync clients and sprints from Monday.com to Supabase')
+    parser.add_argument('--profile', action='store_true',
+                        help='Write a cProfile dump and per-phase memory stats to profiles/')
+    parser.add_argument('--profile-dir', help='Directory for --profile artifacts (default: profiles/)')
+    parser.add_argument('--no-reassign', action='store_true',
+                        help='Only record sprint date changes; leave re-assigning time entries for a later run')
+    parser.add_argument('--reassign-only', action='store_true',
+                        help='Re-assign time entries for recorded sprint date changes without syncing Monday.com')
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    load_settings()
+    configure_from_args(args)
+
+    if args.reassign_only:
+        if not all([SUPABASE_URL, SUPABASE_SERVICE_KEY]):
+            log.error("Missing required environment variables\nRequired: SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
+            exit(1)
+        clients_reassigned, entries_reassigned = reassign_pending_sprint_changes()
+        log.info(f">> Re-assigned {entries_reassigned} time entries of {clients_reassigned} clients",
+                 clients=clients_reassigned, entries=entries_reassigned)
+        exit(0)
+
     # Check environment variables
     board_ids_available = [bid for bid in MONDAY_BOARD_IDS.values() if bid]
     if not all([MONDAY_API_KEY, board_ids_available, SUPABASE_URL, SUPABASE_SERVICE_KEY]):
-        print("!! Error: Missing required environment variables")
-        print("Required: MONDAY_API_KEY, at least one MONDAY_*_BOARD_ID, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
+        log.error("Missing required environment variables\n"
+                  "Required: MONDAY_API_KEY, at least one MONDAY_*_BOARD_ID, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
         exit(1)
 
     # Run sync
-    success = sync_clients_and_sprints()
+    success = sync_clients_and_sprints(profile=args.profile, profile_dir=args.profile_dir,
+                                       reassign=not args.no_reassign)
     exit(0 if success else 1)
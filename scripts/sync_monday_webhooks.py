@@ -0,0 +1,380 @@
+"""
+Receiver for Monday.com webhooks, so client and sprint changes reach Supabase
+within seconds instead of at the next full sync_monday_data.py run:
+
+    python scripts/sync_monday_webhooks.py register --url https://<host>/webhooks/monday
+    python scripts/sync_monday_webhooks.py serve --port 9110 [--record events.jsonl]
+    python scripts/sync_monday_webhooks.py replay events.jsonl [--url ...] [--direct]
+
+register subscribes every configured board to item created, column changed,
+name changed, subitem created, subitem column/name changed, item deleted and
+item archived. Monday.com first POSTs a {"challenge": ...} to the URL, which
+the receiver echoes back.
+
+Webhooks created by a monday app carry a JWT signed with the app's signing
+secret in the Authorization header. serve requires MONDAY_SIGNING_SECRET and
+rejects requests without a valid JWT (401). Board webhooks created with a
+personal API token (as register does with MONDAY_API_KEY) aren't signed; to
+receive those, pass --allow-unsigned and keep the receiver behind a proxy that
+only exposes the webhook path. Either way a request only names items: what is
+written always comes from Monday.com (see below), so a forged request can't
+change or delete data, only cause a re-fetch.
+
+Events are buffered (sync_webhooks.MicroBatcher, keyed by item id) and applied
+every few seconds:
+- Changed items and subitems are fetched in one query (fetch_monday_items),
+  parsed with parse_client_item / parse_sprint_subitem and upserted, as the full
+  sync does. A client item brings its subitems along. A subitem whose client
+  isn't stored yet is synced through its parent item.
+- When a sprint's dates change, or a sprint is created or deleted, the client's
+  stored time entries are re-assigned (reassign_client_sprints RPC) over the
+  dates whose assignment can change: from the earlier start minus the pre-sprint
+  lookback (or the end of the sprint before, if earlier) to the later end (or the
+  start of the sprint after). A changed campaign start date re-assigns the
+  client's entries from the earlier date on.
+- Deletions are checked against Monday.com too: delete/archive events' items
+  are fetched with the changed ones, and only items Monday.com no longer
+  returns, or returns as deleted or archived, are handled as deleted. A deleted
+  subitem deletes its stored sprint (entries keep their client and get
+  re-assigned). A deleted client item marks the client inactive; its sprints
+  and entries are kept. Items still active are synced as changes.
+
+The full sync stays the reconciliation for missed webhooks.
+"""
+
+import os
+import json
+import time
+import signal
+import argparse
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+import sync_monday_data as monday
+from sync_clients import get_supabase, get_http
+from sync_exporter import serve_metrics, record_webhook_event
+from sync_webhooks import MicroBatcher, EventRecorder, verify_jwt, sign_jwt, read_events, replay_events
+from sync_logging import get_logger, add_logging_arguments, configure_from_args
+
+log = get_logger('monday')
+
+WEBHOOK_PATH = '/webhooks/monday'
+
+# Board webhook events register subscribes to
+WEBHOOK_EVENTS = (
+    'create_item', 'change_column_value', 'change_name', 'create_subitem',
+    'change_subitem_column_value', 'change_subitem_name', 'item_deleted', 'item_archived',
+)
+
+# event.type values meaning the item or subitem is gone
+DELETE_EVENTS = {'delete_pulse', 'archive_pulse'}
+
+# event.type values WEBHOOK_EVENTS deliver; anything else is counted as 'other'
+EVENT_TYPES = {'create_pulse', 'update_column_value', 'update_name'} | DELETE_EVENTS
+
+MAX_BATCH = 100
+FLUSH_SECONDS = 5.0
+
+def board_regions():
+    return {str(board_id): region for region, board_id in monday.MONDAY_BOARD_IDS.items() if board_id}
+
+class MondayWebhookReceiver:
+    """Validates Monday.com webhook requests and applies item changes in micro-batches"""
+
+    def __init__(self, signing_secret=None, recorder=None, max_batch=MAX_BATCH, flush_seconds=FLUSH_SECONDS):
+        self.signing_secret = signing_secret
+        self.recorder = recorder
+        self.regions = board_regions()
+        self.batcher = MicroBatcher('monday-webhooks', self.apply, max_batch, flush_seconds)
+        self.started_at = datetime.now(timezone.utc)
+        self.received = Counter()
+        self.totals = Counter()
+        self._lock = threading.Lock()
+
+    def handle(self, headers, body):
+        """sync_exporter.serve_metrics POST route: (HTTP status, response)"""
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            record_webhook_event('monday', None, 'rejected')
+            return 400, {'error': 'body is not JSON'}
+
+        # Subscription handshake: echo the challenge
+        if isinstance(payload, dict) and 'challenge' in payload:
+            return 200, {'challenge': payload['challenge']}
+
+        # event.type is caller-controlled: unknown values share one counter and metric label
+        event = (payload.get('event') or {}) if isinstance(payload, dict) else {}
+        event_type = event.get('type')
+        if event_type not in EVENT_TYPES:
+            event_type = 'other'
+
+        if self.signing_secret and verify_jwt(headers.get('Authorization'), self.signing_secret) is None:
+            record_webhook_event('monday', event_type, 'rejected')
+            log.warning(f"Rejected Monday webhook with a missing or invalid JWT ({event_type})", event=event_type)
+            return 401, {'error': 'invalid authorization'}
+
+        with self._lock:
+            self.received[event_type] += 1
+
+        board_id = str(event.get('parentItemBoardId') or event.get('boardId') or '')
+        if not event.get('pulseId') or board_id not in self.regions:
+            record_webhook_event('monday', event_type, 'ignored')
+            return 200, {'status': 'ignored'}
+
+        if self.recorder:
+            self.recorder.record(headers, payload)
+        self.batcher.add(str(event['pulseId']), event)
+        record_webhook_event('monday', event_type, 'accepted')
+        return 200, {'status': 'accepted'}
+
+    def apply(self, events):
+        """Write one micro-batch of item and subitem changes"""
+        item_ids = [str(event['pulseId']) for event in events]
+        delete_ids = {str(event['pulseId']) for event in events if event.get('type') in DELETE_EVENTS}
+        reassign = {}
+
+        # Delete events are only trusted once Monday.com confirms them
+        items = monday.fetch_monday_items(item_ids) if item_ids else []
+        returned = {item['id'] for item in items}
+        deleted = sorted(delete_ids - returned)
+        deleted.extend(item['id'] for item in items if item.get('state') in ('archived', 'deleted'))
+        still_active = sorted(delete_ids & {item['id'] for item in items if item.get('state', 'active') == 'active'})
+        if still_active:
+            log.warning(f"   Ignoring delete events for {len(still_active)} items that are still active in Monday.com",
+                        items=still_active)
+
+        active = [item for item in items if item.get('state', 'active') == 'active']
+        client_items = [item for item in active if not item.get('parent_item')]
+        subitems = [item for item in active if item.get('parent_item')]
+
+        # Subitems of clients that aren't stored yet are synced with their parent item
+        parent_ids = {subitem['parent_item']['id'] for subitem in subitems}
+        client_ids = self.stored_client_ids(parent_ids)
+        missing_parents = parent_ids - set(client_ids) - {item['id'] for item in client_items}
+        if missing_parents:
+            client_items.extend(monday.fetch_monday_items(sorted(missing_parents)))
+        subitems = [subitem for subitem in subitems if subitem['parent_item']['id'] in client_ids]
+
+        # (subitem, client_id, group_title) to upsert as sprints
+        sprint_updates = []
+        stored_clients = self.stored_clients([item['id'] for item in client_items])
+        for item in client_items:
+            region = self.regions.get(str((item.get('board') or {}).get('id')))
+            if region is None:
+                continue
+            group_title = (item.get('group') or {}).get('title')
+            client_id, client_data = monday.upsert_client(item, group_title, region)
+            self.totals['clients'] += 1
+
+            old_start = (stored_clients.get(item['id']) or {}).get('campaign_start_date')
+            new_start = client_data.get('campaign_start_date')
+            if item['id'] in stored_clients and old_start != new_start:
+                starts = [date.fromisoformat(d) for d in (old_start, new_start) if d]
+                start = (min(starts) - timedelta(days=monday.SPRINT_LOOKBACK_DAYS)).isoformat() if starts else None
+                monday.merge_reassign_range(reassign, client_id, start, None)
+            sprint_updates.extend((subitem, client_id, group_title) for subitem in item.get('subitems') or [])
+
+        for subitem in subitems:
+            parent = subitem['parent_item']
+            sprint_updates.append((subitem, client_ids[parent['id']], (parent.get('group') or {}).get('title')))
+
+        # (client_id, monday_subitem_id, old, new) of sprints created, re-dated or deleted
+        sprint_changes = []
+        stored_sprints = self.stored_sprints([subitem['id'] for subitem, _, _ in sprint_updates])
+        for subitem, client_id, group_title in sprint_updates:
+            sprint_data = monday.upsert_sprint(subitem, client_id, group_title)
+            if not sprint_data:
+                continue
+            self.totals['sprints'] += 1
+            old = stored_sprints.get(subitem['id'])
+            if old is None or (old['start_date'], old['end_date']) != (sprint_data['start_date'], sprint_data['end_date']):
+                log.info(f"   Sprint {sprint_data['name']} dates changed: "
+                         f"{old and old['start_date']}..{old and old['end_date']} -> "
+                         f"{sprint_data['start_date']}..{sprint_data['end_date']}",
+                         sprint=sprint_data['name'], client_id=client_id)
+                sprint_changes.append((client_id, subitem['id'], old, sprint_data))
+
+        # Item and subitem ids don't overlap, so the stored rows tell which one each is
+        deleted_sprints = self.stored_sprints(deleted)
+        for sprint in deleted_sprints.values():
+            get_supabase().table('sprints').delete().eq('id', sprint['id']).execute()
+            self.totals['sprints_deleted'] += 1
+            sprint_changes.append((sprint['client_id'], str(sprint['monday_subitem_id']), sprint, None))
+
+        # The ranges cover the gaps next to each changed sprint: its neighbours are the
+        # client's other sprints as stored now, plus the old dates of the batch's changes
+        client_sprints = self.client_sprints({client_id for client_id, _, _, _ in sprint_changes})
+        for client_id, subitem_id, old, new in sprint_changes:
+            neighbours = [sprint for sprint in client_sprints.get(client_id, [])
+                          if str(sprint['monday_subitem_id']) != subitem_id]
+            neighbours += [other_old for other_client, other_id, other_old, _ in sprint_changes
+                           if other_client == client_id and other_id != subitem_id and other_old]
+            monday.merge_reassign_range(reassign, client_id, *monday.sprint_reassign_range(old, new, neighbours))
+
+        deleted_clients = self.stored_client_ids([item_id for item_id in deleted if item_id not in deleted_sprints])
+        if deleted_clients:
+            get_supabase().table('clients').update({
+                'is_active': False,
+                'updated_at': datetime.now(timezone.utc).isoformat(),
+            }).in_('id', list(deleted_clients.values())).execute()
+            self.totals['clients_deactivated'] += len(deleted_clients)
+
+        for client_id, (start, end) in reassign.items():
+            changed = monday.reassign_client_sprints(client_id, start, end)
+            self.totals['entries_reassigned'] += changed
+            log.info(f"   Re-assigned {changed} time entries of client {client_id} ({start or '...'} to {end or '...'})",
+                     client_id=client_id, start=start, end=end, entries=changed)
+
+    def stored_client_ids(self, item_ids):
+        """monday_item_id (as str) -> client id, for the clients already stored"""
+        return {item_id: client['id'] for item_id, client in self.stored_clients(item_ids).items()}
+
+    def stored_clients(self, item_ids):
+        if not item_ids:
+            return {}
+        rows = get_supabase().table('clients') \
+            .select('id, monday_item_id, campaign_start_date') \
+            .in_('monday_item_id', [int(item_id) for item_id in item_ids]) \
+            .execute().data or []
+        return {str(row['monday_item_id']): row for row in rows}
+
+    def stored_sprints(self, subitem_ids):
+        if not subitem_ids:
+            return {}
+        rows = get_supabase().table('sprints') \
+            .select('id, client_id, monday_subitem_id, start_date, end_date') \
+            .in_('monday_subitem_id', [int(subitem_id) for subitem_id in subitem_ids]) \
+            .execute().data or []
+        return {str(row['monday_subitem_id']): row for row in rows}
+
+    def client_sprints(self, client_ids):
+        """client id -> its stored sprints' dates"""
+        if not client_ids:
+            return {}
+        rows = get_supabase().table('sprints') \
+            .select('client_id, monday_subitem_id, start_date, end_date') \
+            .in_('client_id', sorted(client_ids)) \
+            .execute().data or []
+        sprints = {}
+        for row in rows:
+            sprints.setdefault(row['client_id'], []).append(row)
+        return sprints
+
+    def start(self):
+        self.batcher.start()
+        return self
+
+    def stop(self):
+        self.batcher.stop()
+
+    def status(self):
+        return {
+            'started_at': self.started_at.isoformat(),
+            'now': datetime.now(timezone.utc).isoformat(),
+            'received': dict(self.received),
+            'batcher': self.batcher.status(),
+            **self.totals,
+        }
+
+def register_webhooks(url):
+    """Subscribe every configured board to WEBHOOK_EVENTS at url; returns the created webhook ids"""
+    headers = {
+        'Authorization': f'Bearer {monday.MONDAY_API_KEY}',
+        'Content-Type': 'application/json'
+    }
+    created = []
+    for region, board_id in monday.MONDAY_BOARD_IDS.items():
+        if not board_id:
+            continue
+        for event in WEBHOOK_EVENTS:
+            query = 'mutation { create_webhook(board_id: %s, url: %s, event: %s) { id } }' % (
+                board_id, json.dumps(url), event
+            )
+            response = get_http().post(monday.MONDAY_API_URL, headers=headers, json={'query': query})
+            data = response.json() if response.status_code == 200 else {}
+            if response.status_code != 200 or 'errors' in data:
+                log.error(f"Could not register {event} on the {region} board: {response.status_code} {response.text}",
+                          region=region, event=event)
+                continue
+            created.append(data['data']['create_webhook']['id'])
+            log.info(f"   Registered {event} on the {region} board", region=region, event=event)
+    return created
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply Monday.com webhook events to Supabase in micro-batches')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    register_parser = commands.add_parser('register', help='Create the board webhooks')
+    register_parser.add_argument('--url', required=True, help=f'Public URL of the receiver, ending in {WEBHOOK_PATH}')
+
+    serve_parser = commands.add_parser('serve', help='Run the receiver')
+    serve_parser.add_argument('--port', type=int, default=9110, help='Port to listen on (default: 9110)')
+    serve_parser.add_argument('--host', default='127.0.0.1',
+                              help='Address to listen on (default: 127.0.0.1; put a TLS proxy in front)')
+    serve_parser.add_argument('--record', help='Append accepted events to this JSONL file, for replay')
+    serve_parser.add_argument('--allow-unsigned', action='store_true',
+                              help='Accept requests without a JWT when MONDAY_SIGNING_SECRET is not set '
+                                   '(board webhooks created with an API token, as register does)')
+    serve_parser.add_argument('--flush-seconds', type=float, default=FLUSH_SECONDS,
+                              help=f'Longest an event waits before its batch is applied (default: {FLUSH_SECONDS:g})')
+
+    replay_parser = commands.add_parser('replay', help='Send recorded events to a receiver')
+    replay_parser.add_argument('file', help='JSONL file written by serve --record')
+    replay_parser.add_argument('--url', default=f'http://127.0.0.1:9110{WEBHOOK_PATH}', help='Receiver URL')
+    replay_parser.add_argument('--delay', type=float, default=0, help='Seconds between events')
+    replay_parser.add_argument('--direct', action='store_true', help='Apply the events in this process, without a server')
+
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    monday.load_settings()
+    configure_from_args(args)
+
+    signing_secret = os.getenv('MONDAY_SIGNING_SECRET')
+
+    if args.command == 'replay' and not args.direct:
+        headers = {'Authorization': sign_jwt({'exp': int(time.time()) + 300}, signing_secret)} if signing_secret else {}
+        codes = replay_events(args.file, args.url, headers=headers, delay=args.delay)
+        log.info(f">> Replayed {len(codes)} events: {sum(1 for c in codes if c < 400)} accepted",
+                 events=len(codes), accepted=sum(1 for c in codes if c < 400))
+        exit(0 if all(c < 400 for c in codes) else 1)
+
+    board_ids_available = [bid for bid in monday.MONDAY_BOARD_IDS.values() if bid]
+    if not all([monday.MONDAY_API_KEY, board_ids_available, monday.SUPABASE_URL, monday.SUPABASE_SERVICE_KEY]):
+        log.error("Missing required environment variables\n"
+                  "Required: MONDAY_API_KEY, at least one MONDAY_*_BOARD_ID, SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY")
+        exit(1)
+
+    if args.command == 'register':
+        exit(0 if len(register_webhooks(args.url)) == len(board_ids_available) * len(WEBHOOK_EVENTS) else 1)
+
+    if args.command == 'replay':
+        receiver = MondayWebhookReceiver()
+        for event in read_events(args.file):
+            receiver.handle(event.get('headers', {}), json.dumps(event['body']))
+        ok = receiver.batcher.flush()
+        log.info(f">> Applied {receiver.batcher.events_applied} events", **receiver.status())
+        exit(0 if ok else 1)
+
+    if not signing_secret:
+        if not args.allow_unsigned:
+            log.error("MONDAY_SIGNING_SECRET is not set; set it, or pass --allow-unsigned to accept unsigned requests")
+            exit(1)
+        log.warning("MONDAY_SIGNING_SECRET is not set; accepting unsigned webhook requests (--allow-unsigned)")
+
+    recorder = EventRecorder(args.record, []) if args.record else None
+    receiver = MondayWebhookReceiver(signing_secret, recorder, flush_seconds=args.flush_seconds).start()
+    server = serve_metrics(args.port, args.host, status=receiver.status, post_routes={WEBHOOK_PATH: receiver.handle})
+    log.info(f">> Receiving Monday.com webhooks on http://{args.host}:{args.port}{WEBHOOK_PATH} "
+             f"(also /status and /metrics)")
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *a: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *a: stop_event.set())
+    while not stop_event.wait(1):
+        pass
+
+    log.info(">> Stopping: applying buffered events...")
+    server.shutdown()
+    receiver.stop()
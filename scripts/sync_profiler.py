@@ -0,0 +1,131 @@
+"""
+Profiling mode for sync runs (--profile on the sync scripts).
+
+While a run is profiled:
+- cProfile records the whole run
+- tracemalloc tracks memory; each phase (see sync_metrics.phase) records its peak
+  and net allocation over all its invocations, and the top allocation sites of
+  its first SNAPSHOT_CALLS invocations (snapshots are expensive, and per-user /
+  per-batch phases repeat the same code)
+
+Artifacts go to a timestamped directory, profiles/<source>_<YYYYmmdd_HHMMSS>/ by default:
+    cprofile.pstats       load with pstats / snakeviz
+    cprofile_top.txt      top functions by cumulative and own time
+    memory.txt            peak and net memory per phase, with top allocation sites
+    memory.json           the same, machine-readable
+    metrics.json          the run's SyncMetrics summary (phase timings, call counts)
+
+tracemalloc makes Python code noticeably slower, so profiled runs take longer
+than normal ones; compare phases within a profile, not against unprofiled runs.
+"""
+
+import os
+import io
+import json
+import pstats
+import cProfile
+import tracemalloc
+from datetime import datetime
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'profiles')
+
+# Invocations per phase that get an allocation-site snapshot diff
+SNAPSHOT_CALLS = 3
+
+# Allocation sites listed per phase
+TOP_SITES = 15
+
+# Stack depth recorded by tracemalloc
+TRACEMALLOC_FRAMES = 5
+
+class SyncProfiler:
+    """cProfile for the run plus tracemalloc statistics per phase"""
+
+    def __init__(self, source, base_dir=None):
+        self.source = source
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.output_dir = os.path.join(base_dir or DEFAULT_PROFILE_DIR, f"{source}_{stamp}")
+        self.profile = cProfile.Profile()
+        self.phases = {}
+        self.run_peak_bytes = 0
+        self._open = []
+
+    def start(self):
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.profile.enable()
+
+    def phase_started(self, name):
+        stats = self.phases.setdefault(name, {
+            'calls': 0, 'peak_bytes': 0, 'net_bytes': 0, 'top_sites': {}
+        })
+        stats['calls'] += 1
+
+        snapshot = tracemalloc.take_snapshot() if stats['calls'] <= SNAPSHOT_CALLS else None
+        current, peak = tracemalloc.get_traced_memory()
+        # Phase peaks need reset_peak(); keep the run's overall peak separately
+        self.run_peak_bytes = max(self.run_peak_bytes, peak)
+        tracemalloc.reset_peak()
+        self._open.append((name, current, snapshot))
+
+    def phase_finished(self, name):
+        if not self._open or self._open[-1][0] != name:
+            return
+        _, started_bytes, start_snapshot = self._open.pop()
+        current, peak = tracemalloc.get_traced_memory()
+        self.run_peak_bytes = max(self.run_peak_bytes, peak)
+        stats = self.phases[name]
+
+        stats['peak_bytes'] = max(stats['peak_bytes'], peak - started_bytes)
+        stats['net_bytes'] += current - started_bytes
+
+        if start_snapshot is not None:
+            diff = tracemalloc.take_snapshot().compare_to(start_snapshot, 'lineno')
+            for stat in diff[:TOP_SITES]:
+                if stat.size_diff <= 0:
+                    continue
+                frame = stat.traceback[0]
+                site = f"{frame.filename}:{frame.lineno}"
+                stats['top_sites'][site] = stats['top_sites'].get(site, 0) + stat.size_diff
+
+    def stop(self, metrics=None):
+        """Stop profiling and write the artifacts; returns the output directory"""
+        self.profile.disable()
+        self.run_peak_bytes = max(self.run_peak_bytes, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.profile.dump_stats(os.path.join(self.output_dir, 'cprofile.pstats'))
+
+        with open(os.path.join(self.output_dir, 'cprofile_top.txt'), 'w') as f:
+            for sort_key in ('cumulative', 'tottime'):
+                out = io.StringIO()
+                pstats.Stats(self.profile, stream=out).strip_dirs().sort_stats(sort_key).print_stats(40)
+                f.write(f"=== Top 40 by {sort_key} ===\n{out.getvalue()}\n")
+
+        memory = {
+            'run_peak_bytes': self.run_peak_bytes,
+            'phases': {
+                name: {
+                    **stats,
+                    'top_sites': dict(sorted(stats['top_sites'].items(), key=lambda kv: -kv[1])[:TOP_SITES])
+                }
+                for name, stats in self.phases.items()
+            }
+        }
+        with open(os.path.join(self.output_dir, 'memory.json'), 'w') as f:
+            json.dump(memory, f, indent=2)
+
+        with open(os.path.join(self.output_dir, 'memory.txt'), 'w') as f:
+            f.write(f"Run peak: {self.run_peak_bytes / 1024 / 1024:.1f} MB\n\n")
+            for name, stats in sorted(memory['phases'].items(), key=lambda kv: -kv[1]['peak_bytes']):
+                f.write(f"{name}: {stats['calls']} calls, peak {stats['peak_bytes'] / 1024 / 1024:.1f} MB, "
+                        f"net {stats['net_bytes'] / 1024 / 1024:+.1f} MB\n")
+                for site, size in stats['top_sites'].items():
+                    f.write(f"    {size / 1024:10.1f} KB  {site}\n")
+                f.write("\n")
+
+        if metrics is not None:
+            with open(os.path.join(self.output_dir, 'metrics.json'), 'w') as f:
+                json.dump(metrics.to_dict(), f, indent=2)
+
+        return self.output_dir
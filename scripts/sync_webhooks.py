@@ -0,0 +1,195 @@
+"""
+Shared parts of the webhook receivers (sync_clockify_webhooks.py,
+sync_monday_webhooks.py):
+
+- MicroBatcher buffers accepted events and applies them from one background
+  thread, every max_wait seconds or as soon as max_batch are waiting. Events
+  are keyed (e.g. by time entry id); a later event for the same key replaces
+  the buffered one, so a burst of edits to one entry is applied once.
+- token_matches() checks a request's signature header against the configured
+  secrets in constant time; verify_jwt() checks an HS256 JWT (Monday.com signs
+  app webhooks with the app's signing secret).
+- EventRecorder appends accepted requests to a JSONL file, and replay_events()
+  sends such a file to a receiver again, for testing against real payloads:
+      {"received_at": "...", "headers": {"<event type header>": "..."}, "body": {...}}
+
+The receivers serve their webhook paths through sync_exporter.serve_metrics,
+next to /status and /metrics.
+"""
+
+import hmac
+import json
+import base64
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+
+from sync_clients import get_http
+from sync_logging import get_logger
+
+log = get_logger('webhooks')
+
+def token_matches(received, secrets):
+    """True if the received signature equals one of the secrets"""
+    if not received:
+        return False
+    return any(hmac.compare_digest(received.encode('utf-8'), secret.encode('utf-8')) for secret in secrets)
+
+def _b64url_decode(part):
+    return base64.urlsafe_b64decode(part + '=' * (-len(part) % 4))
+
+def _b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def verify_jwt(token, secret):
+    """The payload of an HS256 JWT signed with secret, or None if it's malformed, forged or expired"""
+    if not token:
+        return None
+    if token.lower().startswith('bearer '):
+        token = token[7:]
+    try:
+        header, payload, signature = token.split('.')
+        if json.loads(_b64url_decode(header)).get('alg') != 'HS256':
+            return None
+        expected = hmac.new(secret.encode('utf-8'), f"{header}.{payload}".encode('ascii'), hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, _b64url_decode(signature)):
+            return None
+        claims = json.loads(_b64url_decode(payload))
+    except (ValueError, UnicodeError):
+        return None
+    if 'exp' in claims and claims['exp'] < time.time():
+        return None
+    return claims
+
+def sign_jwt(claims, secret):
+    """HS256 JWT for claims (for replaying events to a receiver that checks them)"""
+    header = _b64url_encode(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode('utf-8'))
+    payload = _b64url_encode(json.dumps(claims).encode('utf-8'))
+    signature = hmac.new(secret.encode('utf-8'), f"{header}.{payload}".encode('ascii'), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64url_encode(signature)}"
+
+class MicroBatcher:
+    """Buffers keyed events and hands them to apply(events) in batches from a background thread"""
+
+    def __init__(self, name, apply, max_batch=200, max_wait=5.0):
+        self.name = name
+        self.apply = apply
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name=f'{name}-batcher', daemon=True)
+
+        self.batches = 0
+        self.events_applied = 0
+        self.failures = 0
+        self.last_flush = None
+        self.last_error = None
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def add(self, key, event):
+        with self._lock:
+            self._pending[key] = event
+            full = len(self._pending) >= self.max_batch
+        if full:
+            self._wake.set()
+
+    def _take(self):
+        with self._lock:
+            keys = list(self._pending)[:self.max_batch]
+            return {key: self._pending.pop(key) for key in keys}
+
+    def flush(self):
+        """Apply everything buffered, max_batch at a time; returns False if a batch failed"""
+        while True:
+            batch = self._take()
+            if not batch:
+                return True
+
+            started = time.perf_counter()
+            try:
+                self.apply(list(batch.values()))
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                log.error(f"[{self.name}] Failed to apply {len(batch)} events, retrying in {self.max_wait:g}s: {e}",
+                          exc_info=True, events=len(batch), error=str(e))
+                # Put them back unless a newer event for the same key arrived meanwhile
+                with self._lock:
+                    for key, event in batch.items():
+                        self._pending.setdefault(key, event)
+                return False
+
+            self.batches += 1
+            self.events_applied += len(batch)
+            self.last_flush = datetime.now(timezone.utc)
+            log.info(f"[{self.name}] Applied {len(batch)} events in {time.perf_counter() - started:.2f}s",
+                     events=len(batch), duration_seconds=round(time.perf_counter() - started, 3))
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.max_wait)
+            self._wake.clear()
+            self.flush()
+
+    def stop(self):
+        """Stop the thread and apply what is still buffered"""
+        self._stopping = True
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+
+    def status(self):
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'batches': self.batches,
+            'events_applied': self.events_applied,
+            'failures': self.failures,
+            'last_flush': self.last_flush.isoformat() if self.last_flush else None,
+            'last_error': self.last_error,
+        }
+
+class EventRecorder:
+    """Appends accepted webhook requests to a JSONL file for replay_events()"""
+
+    def __init__(self, path, header_names):
+        self.path = path
+        self.header_names = header_names
+        self._lock = threading.Lock()
+
+    def record(self, headers, body):
+        line = json.dumps({
+            'received_at': datetime.now(timezone.utc).isoformat(),
+            'headers': {name: headers.get(name) for name in self.header_names if headers.get(name) is not None},
+            'body': body,
+        })
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(line + '\n')
+
+def read_events(path):
+    """Requests recorded by EventRecorder (blank lines and # comments skipped)"""
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+def replay_events(path, url, headers=None, delay=0.0):
+    """POST each recorded request to url, with extra headers (e.g. the signature); returns the responses' codes"""
+    codes = []
+    for event in read_events(path):
+        response = get_http().post(url, json=event['body'], headers={**event.get('headers', {}), **(headers or {})})
+        codes.append(response.status_code)
+        if response.status_code >= 400:
+            log.warning(f"Replayed event rejected: {response.status_code} {response.text}",
+                        status=response.status_code)
+        if delay:
+            time.sleep(delay)
+    return codes
@@ -33,19 +33,10 @@ interface ClockifyTimeEntry {
   };
 }
 
-interface SprintData {
-  id: string;
-  name: string;
-  start_date: string;
-  end_date: string;
-  sprint_number?: number;
-}
-
-interface ClientSprintCache {
-  first_sprint: SprintData | null;
-  last_sprint: SprintData | null;
-  campaign_start_date: string | null;
-  all_sprints: SprintData[];
+interface SprintAssignment {
+  clockify_id: string;
+  sprint_id: string | null;
+  tag: string | null;
 }
 
 // Manual project name mappings
@@ -62,9 +53,6 @@ const MANUAL_PROJECT_MAPPINGS: Record<string, string> = {
   "Pack & Send": "Pack & Send",
 };
 
-// Cache for client sprint data
-const clientSprintCache: Record<string, ClientSprintCache> = {};
-
 // Helper: Normalize name for fuzzy matching
 function normalizeName(name: string): string {
   return name.toLowerCase().replace(/[^a-z0-9]/g, "");
@@ -273,111 +261,45 @@ async function mapProjectToClient(
   return null;
 }
 
-// Get cached sprint data for a client
-async function getClientSprintData(
+// Assign sprints for a batch of entries in one query (assign_sprints RPC).
+// Same rules as find_sprint_for_date() in scripts/sync_clockify_data.py.
+async function assignSprints(
   supabase: ReturnType<typeof createClient>,
-  clientId: string
-): Promise<ClientSprintCache> {
-  if (clientSprintCache[clientId]) {
-    return clientSprintCache[clientId];
-  }
-
-  // Fetch client's campaign_start_date
-  const { data: clientData } = await supabase
-    .from("clients")
-    .select("campaign_start_date")
-    .eq("id", clientId)
-    .single();
-
-  // Fetch all sprints for this client
-  const { data: sprints } = await supabase
-    .from("sprints")
-    .select("id, name, start_date, end_date, sprint_number")
-    .eq("client_id", clientId)
-    .order("start_date");
-
-  const allSprints = (sprints || []) as SprintData[];
+  entries: { clockify_id: string; client_id: string; entry_date: string }[]
+): Promise<Record<string, SprintAssignment>> {
+  if (entries.length === 0) return {};
 
-  const cacheData: ClientSprintCache = {
-    first_sprint: allSprints[0] || null,
-    last_sprint: allSprints[allSprints.length - 1] || null,
-    campaign_start_date: clientData?.campaign_start_date || null,
-    all_sprints: allSprints,
-  };
-
-  clientSprintCache[clientId] = cacheData;
-  return cacheData;
-}
+  const { data, error } = await supabase.rpc("assign_sprints", {
+    p_entries: entries,
+    p_lookback_days: PRE_SPRINT_LOOKBACK_DAYS,
+  });
 
-// Find sprint for a date with pre-sprint lookback
-async function findSprintForDate(
-  supabase: ReturnType<typeof createClient>,
-  clientId: string,
-  entryDate: string
-): Promise<{ sprintId: string | null; tag: string | null }> {
-  // Query for exact match - may return multiple if on boundary date
-  const { data: exactMatches } = await supabase
-    .from("sprints")
-    .select("id, name, start_date, end_date")
-    .eq("client_id", clientId)
-    .lte("start_date", entryDate)
-    .gte("end_date", entryDate)
-    .order("start_date", { ascending: true });
-
-  if (exactMatches && exactMatches.length > 0) {
-    // If multiple sprints match (boundary overlap), prefer the one ending on this date
-    let selectedSprint = exactMatches[0];
-    
-    if (exactMatches.length > 1) {
-      const endingOnDate = exactMatches.find(s => s.end_date === entryDate);
-      if (endingOnDate) {
-        selectedSprint = endingOnDate;
-      }
-    }
-    
-    return { sprintId: selectedSprint.id, tag: null };
+  if (error) {
+    throw new Error(`assign_sprints failed: ${error.message}`);
   }
 
-  // No exact match - check for pre-sprint or post-sprint work
-  const clientData = await getClientSprintData(supabase, clientId);
-
-  if (!clientData.first_sprint) {
-    return { sprintId: null, tag: "no_sprints" };
+  const assignments: Record<string, SprintAssignment> = {};
+  for (const row of (data || []) as SprintAssignment[]) {
+    assignments[row.clockify_id] = row;
   }
+  return assignments;
+}
 
-  const entryDateObj = new Date(entryDate);
-  const firstSprintStart = new Date(clientData.first_sprint.start_date);
-  const lastSprintEnd = new Date(clientData.last_sprint!.end_date);
-
-  // Check if entry is BEFORE first sprint
-  if (entryDateObj < firstSprintStart) {
-    // Calculate lookback window
-    const lookbackStart = new Date(firstSprintStart);
-    lookbackStart.setDate(lookbackStart.getDate() - PRE_SPRINT_LOOKBACK_DAYS);
-
-    // If campaign_start_date exists, use whichever is later
-    if (clientData.campaign_start_date) {
-      const campaignStart = new Date(clientData.campaign_start_date);
-      if (campaignStart > lookbackStart) {
-        lookbackStart.setTime(campaignStart.getTime());
-      }
-    }
-
-    // Entry falls within pre-sprint lookback window
-    if (entryDateObj >= lookbackStart) {
-      return { sprintId: clientData.first_sprint.id, tag: "pre_sprint_prep" };
-    }
+// Recompute time_entries_daily for the entry dates this run wrote
+// (refresh_time_entries_daily RPC, as refresh_daily_rollup() in scripts/sync_clockify_data.py)
+async function refreshDailyRollup(
+  supabase: ReturnType<typeof createClient>,
+  entryDates: Set<string>
+) {
+  if (entryDates.size === 0) return;
 
-    return { sprintId: null, tag: "before_campaign" };
-  }
+  const { error } = await supabase.rpc("refresh_time_entries_daily", {
+    p_dates: [...entryDates].sort(),
+  });
 
-  // Check if entry is AFTER last sprint
-  if (entryDateObj > lastSprintEnd) {
-    return { sprintId: null, tag: "post_sprint_work" };
+  if (error) {
+    console.warn(`Failed to refresh daily rollup: ${error.message}`);
   }
-
-  // Entry falls in a gap between sprints
-  return { sprintId: null, tag: "gap_between_sprints" };
 }
 
 // Log sync status
@@ -447,6 +369,7 @@ Deno.serve(async (req) => {
 
     let entriesSynced = 0;
     let entriesSkipped = 0;
+    const touchedDates = new Set<string>();
     const stats = {
       no_hours: 0,
       pre_sprint_prep: 0,
@@ -474,6 +397,14 @@ Deno.serve(async (req) => {
         endDate
       );
 
+      // First pass: shape entries and resolve clients
+      const pending: {
+        entry: ClockifyTimeEntry;
+        hours: number;
+        entryDate: string;
+        clientId: string | null;
+      }[] = [];
+
       for (const entry of timeEntries) {
         const hours = parseDurationToHours(entry.timeInterval.duration || "");
         if (hours === 0) {
@@ -483,7 +414,6 @@ Deno.serve(async (req) => {
         }
 
         const entryDate = getDateString(entry.timeInterval.start);
-        const projectName = clockifyProjects.find((p) => p.id === entry.projectId)?.name || null;
         let clientId = entry.projectId ? projectClientMap[entry.projectId] : null;
 
         // If no project in Clockify, check if entry already exists with a client_id
@@ -499,19 +429,30 @@ Deno.serve(async (req) => {
           }
         }
 
+        pending.push({ entry, hours, entryDate, clientId });
+      }
+
+      // Assign sprints for all of this user's client entries in one call
+      const assignments = await assignSprints(
+        supabase,
+        pending
+          .filter((p) => p.clientId)
+          .map((p) => ({ clockify_id: p.entry.id, client_id: p.clientId!, entry_date: p.entryDate }))
+      );
+
+      const rows: Record<string, unknown>[] = [];
+      for (const { entry, hours, entryDate, clientId } of pending) {
+        const projectName = clockifyProjects.find((p) => p.id === entry.projectId)?.name || null;
+
         let sprintId: string | null = null;
         const tags: string[] = [];
 
         if (clientId) {
-          const { sprintId: foundSprintId, tag } = await findSprintForDate(
-            supabase,
-            clientId,
-            entryDate
-          );
-          sprintId = foundSprintId;
-
-          if (tag) {
-            tags.push(tag);
+          const assignment = assignments[entry.id];
+          sprintId = assignment?.sprint_id ?? null;
+
+          if (assignment?.tag) {
+            tags.push(assignment.tag);
             if (sprintId) {
               stats.pre_sprint_prep++;
             } else {
@@ -522,28 +463,37 @@ Deno.serve(async (req) => {
           stats.non_client_work++;
         }
 
-        // Upsert time entry
-        await supabase.from("time_entries").upsert(
-          {
-            clockify_id: entry.id,
-            sprint_id: sprintId,
-            client_id: clientId,
-            user_id: internalUserId,
-            entry_date: entryDate,
-            hours,
-            description: entry.description || "",
-            task_category: entry.task?.name || null,
-            project_name: projectName,
-            tags,
-            updated_at: new Date().toISOString(),
-          },
-          { onConflict: "clockify_id" }
-        );
-
-        entriesSynced++;
+        rows.push({
+          clockify_id: entry.id,
+          sprint_id: sprintId,
+          client_id: clientId,
+          user_id: internalUserId,
+          entry_date: entryDate,
+          hours,
+          description: entry.description || "",
+          task_category: entry.task?.name || null,
+          project_name: projectName,
+          tags,
+          updated_at: new Date().toISOString(),
+        });
+      }
+
+      // Upsert this user's entries. time_entries is partitioned by entry_date, so
+      // writes go through the upsert_time_entries RPC instead of onConflict: "clockify_id"
+      if (rows.length > 0) {
+        const { error } = await supabase.rpc("upsert_time_entries", { p_rows: rows });
+        if (error) {
+          throw new Error(`upsert_time_entries failed: ${error.message}`);
+        }
+        entriesSynced += rows.length;
+        for (const row of rows) touchedDates.add(row.entry_date as string);
       }
     }
 
+    // Refresh the daily rollup once, for every date written
+    console.log(`Refreshing daily rollup for ${touchedDates.size} dates...`);
+    await refreshDailyRollup(supabase, touchedDates);
+
     // Log success
     await logSync(supabase, "clockify", "success", entriesSynced);
 